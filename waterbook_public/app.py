@@ -33,6 +33,9 @@ from phoneme_visualizer import PhonemeVisualizer
 from onomatopoeia_generator import CanalOnomatopoeiaGenerator
 from onomatopoeia_visualizer import OnomatopoeiaVisualizer
 from performance_optimizer import get_optimizer, profile_function
+from text_cache import get_text_cache_stats
+from paper_texture import CALLIGRAPHY_PAPER, INK_WASH_PAPER, get_paper_service
+from font_service import get_font_service
 
 class AppState(Enum):
     """应用状态枚举"""
@@ -84,6 +87,12 @@ class CanalInkWashApp:
             print(f"Pygame窗口已创建: {self.width}x{self.height}")
             print(f"视频驱动: {pygame.display.get_driver()}")
             
+            # 宣纸纹理块：已缓存时内存映射加载，首次运行时生成并写盘，供各渲染器共用
+            get_paper_service().prewarm([(INK_WASH_PAPER, 0), (CALLIGRAPHY_PAPER, 0)])
+            
+            # 子集字体：已缓存时直接使用，首次运行时由完整字体生成，供各组件共用
+            get_font_service().font_path()
+            
             # 初始化组件
             print("[DEBUG] 初始化音频录制器...")
             self.audio_recorder = AudioRecorder(self.config['audio'])
@@ -139,6 +148,12 @@ class CanalInkWashApp:
             try:
                 self.performance_optimizer = get_optimizer()
                 self.performance_optimizer.target_fps = 60
+                
+                # 各可视化器接收质量等级设置
+                for target in (self.canal_visualizer, self.phoneme_visualizer,
+                               self.onomatopoeia_visualizer,
+                               getattr(self.ui_renderer, 'local_calligraphy_generator', None)):
+                    self.performance_optimizer.register_quality_target(target)
                 print("[DEBUG] 性能优化器初始化完成")
             except Exception as e:
                 print(f"[WARNING] 性能优化器初始化失败: {e}")
@@ -146,7 +161,8 @@ class CanalInkWashApp:
             
             # 初始化Web服务器
             print("[DEBUG] 初始化Web服务器...")
-            self.web_server = WebServer(self.config.get('server', {}).get('port', 8000))
+            self.web_server = WebServer(self.config.get('server', {}).get('port', 8000), self.config.get('server', {}),
+                                        self.config.get('generation', {}))
             self.web_server.set_app_instance(self)
             print("[DEBUG] Web服务器初始化完成")
             
@@ -160,6 +176,11 @@ class CanalInkWashApp:
             self.selected_style = "行书"  # 默认风格
             self.generated_art = None
             
+            # 上一帧推送到显示器时的状态（状态切换后需整屏刷新）
+            self._last_presented_state = None
+            # 本帧绘制了错误界面时需整屏刷新（局部刷新无法覆盖错误界面）
+            self._force_full_flip = False
+            
             print(f"水上书应用初始化完成 - {self.width}x{self.height}")
             print("[DEBUG] 应用程序初始化完成")
             
@@ -390,6 +411,9 @@ class CanalInkWashApp:
                 self.ui_renderer.start_style_switch_animation(old_style, self.selected_style)
                 print(f"风格切换: {old_style} -> {self.selected_style}")
                 
+                # 预渲染队列中新选风格优先
+                self.art_generator.prioritize_style(self.selected_style)
+                
             elif long_press:
                 # 确认选择，生成最终艺术作品
                 try:
@@ -412,8 +436,7 @@ class CanalInkWashApp:
                                 self.generated_art = generated_art
                                 print("最终艺术作品生成成功")
                                 # 更新Web服务器内容
-                                if hasattr(self, 'web_server') and self.web_server:
-                                    self.web_server.update_content(self.generated_art)
+                                self._publish_generated_art(self.generated_art)
                                 self._transition_to(AppState.E5_DISPLAY)
                             else:
                                 print("最终艺术作品生成失败，进入重置状态")
@@ -456,8 +479,7 @@ class CanalInkWashApp:
                                 self.generated_art = generated_art
                                 print("超时生成艺术作品成功")
                                 # 更新Web服务器内容
-                                if hasattr(self, 'web_server') and self.web_server:
-                                    self.web_server.update_content(self.generated_art)
+                                self._publish_generated_art(self.generated_art)
                                 self._transition_to(AppState.E5_DISPLAY)
                             else:
                                 print("超时生成艺术作品失败，进入重置状态")
@@ -495,6 +517,20 @@ class CanalInkWashApp:
                 self._reset_app_state()
                 self._transition_to(AppState.E0_ATTRACT)
     
+    def _publish_generated_art(self, generated_art):
+        """更新Web服务器内容；封面在后台细化为完整分辨率后再刷新一次"""
+        if not (hasattr(self, 'web_server') and self.web_server):
+            return
+        
+        self.web_server.update_content(generated_art)
+        
+        def refresh_cover(_cover_path):
+            # 访客已离开（作品被重置或替换）时不再刷新
+            if self.generated_art is generated_art:
+                self.web_server.update_content(generated_art)
+        
+        self.art_generator.cover_renderer.on_refined(generated_art.cover_image_path, refresh_cover)
+    
     def _transition_to(self, new_state: AppState):
         """状态转换"""
         print(f"状态转换: {self.current_state.value} -> {new_state.value}")
@@ -519,6 +555,12 @@ class CanalInkWashApp:
         self.generated_art = None
         self.audio_recorder.reset()
         self.art_generator.reset()
+        
+        # 为下一位访客轮换运河场景布局（已烘焙的布局直接从缓存加载）
+        try:
+            self.canal_visualizer.next_layout()
+        except Exception as e:
+            print(f"场景布局切换失败: {e}")
     
     def render(self):
         """渲染当前状态"""
@@ -567,6 +609,7 @@ class CanalInkWashApp:
                 except Exception as e:
                     print(f"运河可视化渲染异常: {e}")
                     # 回退到简单界面
+                    self._force_full_flip = True
                     self.screen.fill((245, 245, 240))
                     self.ui_renderer.render_error_screen("运河场景渲染异常，请重试")
             
@@ -619,12 +662,51 @@ class CanalInkWashApp:
             import traceback
             traceback.print_exc()
             # 尝试显示错误界面
+            self._force_full_flip = True
             try:
                 self.screen.fill((245, 245, 240))
                 self.ui_renderer.render_error_screen("系统渲染异常")
             except:
                 print("无法显示错误界面，系统可能需要重启")
     
+    def _collect_dirty_rects(self) -> Optional[list]:
+        """收集E2场景各图层的脏矩形，返回None表示需要整屏刷新"""
+        if (self.current_state != AppState.E2_RECORD or
+                self._last_presented_state != AppState.E2_RECORD):
+            # 运河场景下一帧需整屏重绘
+            self.canal_visualizer.set_overlay_rects(None)
+            return None
+        
+        overlay_rects = []
+        for layer in (self.phoneme_visualizer, self.onomatopoeia_visualizer, self.ui_renderer):
+            if layer is None:
+                continue
+            layer_rects = getattr(layer, 'dirty_rects', None)
+            if layer_rects is None:
+                # 图层未提供绘制区域时无法局部刷新
+                self.canal_visualizer.set_overlay_rects(None)
+                return None
+            overlay_rects.extend(layer_rects)
+        
+        # 运河场景离屏渲染时需在下一帧重绘覆盖层区域
+        self.canal_visualizer.set_overlay_rects(overlay_rects)
+        return list(self.canal_visualizer.dirty_rects) + overlay_rects
+    
+    def _present_frame(self):
+        """将当前帧推送到显示器：E2场景仅更新脏矩形，其余状态整屏翻转"""
+        if self._force_full_flip:
+            # 错误界面整屏推送，并视为未知状态使恢复后的首帧同样整屏刷新
+            self._force_full_flip = False
+            pygame.display.flip()
+            self._last_presented_state = None
+            return
+        dirty_rects = self._collect_dirty_rects()
+        if dirty_rects is None:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        self._last_presented_state = self.current_state
+    
     def run(self):
         """主运行循环"""
         print("水上书应用启动")
@@ -674,13 +756,17 @@ class CanalInkWashApp:
                 # 控制帧率和显示更新
                 try:
                     # 确保显示更新
-                    pygame.display.flip()
+                    self._present_frame()
                     # 控制帧率并应用性能优化
                     fps = clock.get_fps()
                     if self.performance_optimizer:
-                        optimizations = self.performance_optimizer.apply_optimizations(fps)
+                        # 使用本帧实际工作耗时（不含帧率限制的等待）驱动质量调节
+                        frame_time_ms = clock.get_rawtime() or None
+                        optimizations = self.performance_optimizer.apply_optimizations(fps, frame_time_ms)
                         if optimizations and loop_count % 300 == 0:  # 每5秒输出一次优化信息
                             print(f"[PERF] 应用优化: {optimizations}")
+                    if loop_count % 300 == 0:
+                        print(f"[PERF] 文字缓存: {get_text_cache_stats()}")
                     
                     clock.tick(60)
                 except Exception as e:
@@ -713,6 +799,13 @@ class CanalInkWashApp:
             except Exception as e:
                 print(f"停止Web服务器时出错: {e}")
         
+        # 停止艺术渲染后端（工作进程）
+        if hasattr(self, 'art_generator') and self.art_generator:
+            try:
+                self.art_generator.shutdown()
+            except Exception as e:
+                print(f"停止艺术渲染后端时出错: {e}")
+        
         # 清理GPIO
         if self.gpio_enabled:
             try:
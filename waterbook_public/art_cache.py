@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+作品内容寻址缓存
+以量化后的艺术参数、风格、文字、画布大小与渲染器版本的哈希为键，在磁盘上保存已渲染的封面、
+动画基础图层（完成态画面）与各格式动画。渲染随机种子由缓存键派生，同一键的渲染结果一致，
+命中时直接复用文件；同一键只缺部分文件时（如新增动画格式）可由该键已缓存的基础图层重新合成，
+无需再渲染书法（不同键之间不复用）。缓存按总字节数以最近使用时间淘汰。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+# 参与渲染、需要量化的参数
+RENDER_FIELDS = ('brush_thickness', 'ink_density', 'flywhite_intensity', 'ink_blur', 'ink_spread')
+
+# 默认量化步长（参数范围0-1时约20档）
+DEFAULT_QUANTUM = 0.05
+
+# 默认缓存容量（字节）
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+# 缓存条目中的文件名
+COVER_FILE = "cover.png"
+FINAL_LAYER_FILE = "final.png"
+
+def animation_file(extension: str) -> str:
+    """缓存条目中动画文件的文件名"""
+    return f"animation{extension}"
+
+def quantize_parameters(params: Any, quantum: float = DEFAULT_QUANTUM):
+    """将渲染参数吸附到量化网格（原地修改），保证同一缓存键对应的渲染结果一致"""
+    for name in RENDER_FIELDS:
+        value = getattr(params, name)
+        setattr(params, name, round(round(value / quantum) * quantum, 6))
+
+class ArtworkCache:
+    """磁盘作品缓存 - 每个键一个目录，目录内为该作品的各个文件"""
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = DEFAULT_CACHE_BYTES,
+                 quantum: float = DEFAULT_QUANTUM, version: Optional[str] = None):
+        if version is None:
+            from ink_wash_pygame import RENDERER_VERSION
+            version = RENDERER_VERSION
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.quantum = quantum
+        self.version = str(version)
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, int]] = {}  # 键 -> (最近使用时间, 字节数)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """启动时扫描已有条目"""
+        for entry_dir in self.root.iterdir():
+            try:
+                if not entry_dir.is_dir():
+                    continue
+                # 中断写入遗留的临时文件不计入条目
+                files = [path for path in entry_dir.iterdir() if path.is_file() and path.suffix != ".tmp"]
+                if not files:
+                    continue
+                stats = [path.stat() for path in files]
+            except OSError:
+                # 条目在扫描期间被删除或不可读时跳过
+                continue
+            size = sum(stat.st_size for stat in stats)
+            self._entries[entry_dir.name] = (max(stat.st_mtime for stat in stats), size)
+            self.current_bytes += size
+        print(f"作品缓存: {len(self._entries)} 个条目，{self.current_bytes / 1024 / 1024:.1f} MB")
+
+    def key_for(self, params: Any, canvas_size: Tuple[int, int]) -> str:
+        """计算缓存键（参数按量化档位参与哈希）"""
+        vector = [int(round(getattr(params, name) / self.quantum)) for name in RENDER_FIELDS]
+        payload = json.dumps([self.version, params.content_text, params.style, list(canvas_size), vector],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+    def path_for(self, key: str, name: str) -> Path:
+        """条目中文件的路径（供渲染进程直接写入，写入后调用record登记）"""
+        return self.root / key / name
+
+    def get(self, key: str, name: str, count: bool = True) -> Optional[Path]:
+        """查找缓存文件，命中时更新最近使用时间
+        
+        count为False时不计入命中统计（如预渲染的查找），结果交给访客时再由count_lookup补记
+        """
+        path = self.path_for(key, name)
+        with self._lock:
+            if key in self._entries and path.exists():
+                self._entries[key] = (time.time(), self._entries[key][1])
+                if count:
+                    self.hits += 1
+                    self.bytes_saved += path.stat().st_size
+                _touch(path)
+                return path
+            if count:
+                self.misses += 1
+            return None
+    
+    def count_lookup(self, hit: bool, size: int = 0):
+        """补记一次查找（hit为True时size为节省的字节数）"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.bytes_saved += size
+            else:
+                self.misses += 1
+
+    def put(self, key: str, name: str, source: Union[str, Path]) -> Optional[Path]:
+        """复制文件到缓存（先写临时文件再替换），返回缓存路径"""
+        path = self.path_for(key, name)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(path.name + ".tmp")
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"作品缓存写入失败 {name}: {e}")
+            return None
+        self.record(key, name)
+        return path
+
+    def record(self, key: str, name: str):
+        """登记已写入条目目录的文件并按容量淘汰"""
+        path = self.path_for(key, name)
+        if not path.exists():
+            return
+        with self._lock:
+            size = sum(file.stat().st_size for file in path.parent.iterdir()
+                       if file.is_file() and file.suffix != ".tmp")
+            _, old_size = self._entries.get(key, (0.0, 0))
+            self._entries[key] = (time.time(), size)
+            self.current_bytes += size - old_size
+            self._evict_locked(keep=key)
+
+    def _evict_locked(self, keep: str):
+        """按最近使用时间淘汰，直到总字节数不超过上限（刚写入的条目不淘汰）"""
+        if self.current_bytes <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            if self.current_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            del self._entries[key]
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'evictions': self.evictions
+        }
+
+def _touch(path: Path):
+    """更新文件修改时间，重启后扫描时据此恢复最近使用顺序"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def copy_from_cache(cached_path: Path, output_path: Union[str, Path]) -> str:
+    """将缓存文件复制到输出路径（缓存条目可能被淘汰，不直接引用缓存内的文件）"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(cached_path, output_path)
+    return str(output_path)
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+    from types import SimpleNamespace
+
+    # 模拟同一地点的多次录音：参数只有细微差别，文字取自少量候选
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = ArtworkCache(Path(temp_dir) / "cache", max_bytes=64 * 1024, version="test")
+        payload = Path(temp_dir) / "payload.bin"
+        payload.write_bytes(os.urandom(4096))
+
+        for _ in range(200):
+            params = SimpleNamespace(
+                content_text=random.choice("水流波涛静"), style=random.choice(["行书", "篆书", "水墨晕染"]),
+                brush_thickness=0.6 + random.gauss(0, 0.01), ink_density=0.8 + random.gauss(0, 0.01),
+                flywhite_intensity=0.4, ink_blur=0.3, ink_spread=0.2
+            )
+            quantize_parameters(params, cache.quantum)
+            key = cache.key_for(params, (960, 540))
+            if cache.get(key, COVER_FILE) is None:
+                cache.put(key, COVER_FILE, payload)
+
+        print(f"缓存统计: {cache.get_stats()}")
@@ -6,10 +6,17 @@ Rice Paper Texture Generator for Waterbook Ink Wash Style
 采用传统水墨配色方案和视觉美学
 """
 
-import numpy as np
 from PIL import Image, ImageFilter, ImageEnhance, ImageDraw
 import random
-import math
+import sys
+from pathlib import Path
+
+try:
+    from paper_texture import PaperParams, get_paper_service
+except ImportError:
+    # 直接运行本脚本时项目根目录不在模块搜索路径中
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from paper_texture import PaperParams, get_paper_service
 
 # 水上书传统水墨配色方案
 class WaterbookColors:
@@ -40,7 +47,8 @@ def create_waterbook_rice_paper(width: int, height: int,
                                base_color: tuple = None,
                                noise_intensity: float = 0.12,
                                fiber_density: float = 0.25,
-                               ink_wash_spots: int = 3) -> Image.Image:
+                               ink_wash_spots: int = 3,
+                               seed: int = 0) -> Image.Image:
     """
     创建水上书风格的宣纸纹理
     
@@ -51,6 +59,7 @@ def create_waterbook_rice_paper(width: int, height: int,
         noise_intensity: 噪点强度
         fiber_density: 纤维密度
         ink_wash_spots: 水墨渍数量
+        seed: 纹理块种子（噪点与纤维取自宣纸纹理服务的缓存纹理块）
     
     Returns:
         PIL Image对象
@@ -58,49 +67,17 @@ def create_waterbook_rice_paper(width: int, height: int,
     if base_color is None:
         base_color = WaterbookColors.PAPER_WHITE
     
-    # 创建基础画布
-    img = Image.new('RGB', (width, height), base_color)
-    pixels = np.array(img)
-    
-    # 添加细腻的宣纸纹理噪点
-    noise = np.random.normal(0, noise_intensity * 255, (height, width, 3))
-    # 使用更自然的噪点分布
-    noise = noise * (0.8 + 0.4 * np.random.random((height, width, 3)))
-    pixels = pixels.astype(np.float32) + noise
-    pixels = np.clip(pixels, 0, 255).astype(np.uint8)
-    
-    # 创建纤维纹理层
-    fiber_img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    fiber_draw = ImageDraw.Draw(fiber_img)
-    
-    # 添加更自然的纤维线条
-    num_fibers = int(width * height * fiber_density / 8000)
-    for _ in range(num_fibers):
-        # 随机起点和方向
-        x = random.randint(0, width - 1)
-        y = random.randint(0, height - 1)
-        length = random.randint(8, 40)
-        angle = random.uniform(0, 2 * np.pi)
-        thickness = random.uniform(0.5, 1.5)
-        
-        # 计算终点
-        end_x = x + length * math.cos(angle)
-        end_y = y + length * math.sin(angle)
-        
-        # 纤维颜色 - 使用淡墨色
-        fiber_alpha = random.randint(10, 30)
-        fiber_color = (*WaterbookColors.INK_FAINT, fiber_alpha)
-        
-        # 绘制纤维线
-        fiber_draw.line([(x, y), (end_x, end_y)], 
-                       fill=fiber_color, width=int(thickness))
-    
-    # 应用高斯模糊使纤维更自然
-    fiber_img = fiber_img.filter(ImageFilter.GaussianBlur(radius=0.3))
-    
-    # 将纤维纹理混合到主图像
+    # 噪点与纤维：可平铺纹理块，首次生成后缓存到磁盘
+    # 纤维为淡墨色(INK_FAINT)以10-30的透明度叠加，在宣纸白上约加深6个灰度
+    params = PaperParams(
+        grain=noise_intensity * 255,
+        cloud=noise_intensity * 40,
+        fibers_per_mpx=fiber_density * 125,
+        fiber_strength=6.0,
+        fiber_blur=0.3
+    )
+    pixels = get_paper_service().paper_rgb(width, height, base_color, params, seed)
     img = Image.fromarray(pixels).convert('RGBA')
-    img = Image.alpha_composite(img, fiber_img)
     
     # 添加水墨渍效果
     if ink_wash_spots > 0:
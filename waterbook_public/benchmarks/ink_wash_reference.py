@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+水墨渲染逐像素参考实现
+保留InkWashRenderer改为整块运算之前的笔触与扩散算法，仅用于基准对比与效果核对（不属于运行时代码）
+参考实现沿用原有的random调用，渲染器传入的随机源不使用
+"""
+
+import numpy as np
+from PIL import Image, ImageFilter
+import math
+import random
+
+from ink_wash_pygame import InkWashRenderer
+
+class ReferenceInkWashRenderer(InkWashRenderer):
+    """逐像素参考渲染器（与InkWashRenderer输出统计一致，速度慢）"""
+    
+    def _apply_running_script_effects(self, canvas: Image.Image, text_mask: Image.Image, thickness: float,
+                                     density: float, flywhite: float, blur: float, rng=None):
+        """应用行书效果"""
+        
+        # 创建墨迹层
+        ink_layer = Image.new('RGBA', self.canvas_size, (0, 0, 0, 0))
+        
+        # 转换蒙版为numpy数组进行处理
+        mask_array = np.array(text_mask)
+        
+        # 找到文字区域
+        text_pixels = np.where(mask_array > 0)
+        
+        if len(text_pixels[0]) > 0:
+            # 为每个文字像素添加墨迹效果
+            ink_pixels = []
+            
+            for i in range(len(text_pixels[0])):
+                y, x = text_pixels[0][i], text_pixels[1][i]
+                
+                # 基础墨迹强度
+                base_intensity = mask_array[y, x] / 255.0
+                
+                # 添加随机变化（模拟笔触不均匀）
+                variation = random.uniform(0.7, 1.3)
+                intensity = base_intensity * density * variation
+                
+                # 飞白效果（随机跳过一些像素）
+                if random.random() < flywhite:
+                    intensity *= 0.3
+                
+                # 笔触粗细效果（扩展像素）
+                brush_size = int(thickness * 3) + 1
+                for dy in range(-brush_size, brush_size + 1):
+                    for dx in range(-brush_size, brush_size + 1):
+                        nx, ny = x + dx, y + dy
+                        if 0 <= nx < self.canvas_size[0] and 0 <= ny < self.canvas_size[1]:
+                            distance = math.sqrt(dx*dx + dy*dy)
+                            if distance <= brush_size:
+                                # 距离越远，强度越低
+                                pixel_intensity = intensity * (1 - distance / brush_size)
+                                alpha = int(pixel_intensity * 255)
+                                if alpha > 0:
+                                    ink_pixels.append((nx, ny, alpha))
+            
+            # 将墨迹像素绘制到层上
+            ink_array = np.zeros((*self.canvas_size[::-1], 4), dtype=np.uint8)
+            
+            for x, y, alpha in ink_pixels:
+                if 0 <= x < self.canvas_size[0] and 0 <= y < self.canvas_size[1]:
+                    ink_array[y, x] = [*self.ink_color, min(alpha, 255)]
+            
+            ink_layer = Image.fromarray(ink_array, 'RGBA')
+            
+            # 应用模糊效果
+            if blur > 0:
+                ink_layer = ink_layer.filter(ImageFilter.GaussianBlur(radius=blur * 2))
+            
+            # 合并到画布
+            canvas.paste(ink_layer, (0, 0), ink_layer)
+    
+    def _apply_seal_script_effects(self, canvas: Image.Image, text_mask: Image.Image, thickness: float,
+                                  density: float, flywhite: float, blur: float, rng=None):
+        """应用篆书效果（更规整）"""
+        
+        # 篆书效果类似行书，但变化更小，更规整
+        ink_layer = Image.new('RGBA', self.canvas_size, (0, 0, 0, 0))
+        
+        mask_array = np.array(text_mask)
+        text_pixels = np.where(mask_array > 0)
+        
+        if len(text_pixels[0]) > 0:
+            ink_pixels = []
+            
+            for i in range(len(text_pixels[0])):
+                y, x = text_pixels[0][i], text_pixels[1][i]
+                
+                base_intensity = mask_array[y, x] / 255.0
+                
+                # 篆书变化较小
+                variation = random.uniform(0.85, 1.15)
+                intensity = base_intensity * density * variation
+                
+                # 飞白效果较少
+                if random.random() < flywhite:
+                    intensity *= 0.5
+                
+                # 笔触更均匀
+                brush_size = int(thickness * 2) + 1
+                for dy in range(-brush_size, brush_size + 1):
+                    for dx in range(-brush_size, brush_size + 1):
+                        nx, ny = x + dx, y + dy
+                        if 0 <= nx < self.canvas_size[0] and 0 <= ny < self.canvas_size[1]:
+                            distance = math.sqrt(dx*dx + dy*dy)
+                            if distance <= brush_size:
+                                pixel_intensity = intensity * (1 - distance / brush_size * 0.5)  # 更均匀
+                                alpha = int(pixel_intensity * 255)
+                                if alpha > 0:
+                                    ink_pixels.append((nx, ny, alpha))
+            
+            # 绘制墨迹
+            ink_array = np.zeros((*self.canvas_size[::-1], 4), dtype=np.uint8)
+            
+            for x, y, alpha in ink_pixels:
+                if 0 <= x < self.canvas_size[0] and 0 <= y < self.canvas_size[1]:
+                    ink_array[y, x] = [*self.ink_color, min(alpha, 255)]
+            
+            ink_layer = Image.fromarray(ink_array, 'RGBA')
+            
+            # 轻微模糊
+            if blur > 0:
+                ink_layer = ink_layer.filter(ImageFilter.GaussianBlur(radius=blur))
+            
+            canvas.paste(ink_layer, (0, 0), ink_layer)
+    
+    def _apply_ink_diffusion(self, canvas: Image.Image, spread: float, rng=None):
+        """应用水墨扩散效果"""
+        if spread <= 0:
+            return
+        
+        # 创建扩散效果
+        diffusion_layer = Image.new('RGBA', self.canvas_size, (0, 0, 0, 0))
+        
+        # 在文字周围添加淡墨扩散
+        canvas_array = np.array(canvas)
+        
+        # 找到有墨迹的区域
+        gray = np.mean(canvas_array, axis=2)
+        ink_regions = gray < 200  # 找到比宣纸色深的区域
+        
+        if np.any(ink_regions):
+            # 创建扩散蒙版
+            diffusion_mask = np.zeros(self.canvas_size[::-1], dtype=np.uint8)
+            
+            # 在墨迹周围添加扩散
+            for _ in range(int(spread * 100)):
+                # 随机选择墨迹点
+                ink_points = np.where(ink_regions)
+                if len(ink_points[0]) > 0:
+                    idx = random.randint(0, len(ink_points[0]) - 1)
+                    y, x = ink_points[0][idx], ink_points[1][idx]
+                    
+                    # 在周围添加扩散点
+                    for _ in range(10):
+                        dx = random.randint(-20, 20)
+                        dy = random.randint(-20, 20)
+                        nx, ny = x + dx, y + dy
+                        
+                        if 0 <= nx < self.canvas_size[0] and 0 <= ny < self.canvas_size[1]:
+                            distance = math.sqrt(dx*dx + dy*dy)
+                            if distance > 0:
+                                alpha = int(50 * spread / distance * 10)
+                                if alpha > 0:
+                                    diffusion_mask[ny, nx] = min(alpha, 255)
+            
+            # 创建扩散层
+            diffusion_array = np.zeros((*self.canvas_size[::-1], 4), dtype=np.uint8)
+            diffusion_array[:, :, :3] = self.ink_color
+            diffusion_array[:, :, 3] = diffusion_mask
+            
+            diffusion_layer = Image.fromarray(diffusion_array, 'RGBA')
+            
+            # 模糊扩散层
+            diffusion_layer = diffusion_layer.filter(ImageFilter.GaussianBlur(radius=5))
+            
+            # 合并到画布
+            canvas.paste(diffusion_layer, (0, 0), diffusion_layer)
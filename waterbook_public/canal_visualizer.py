@@ -5,16 +5,27 @@ import pygame
 import numpy as np
 import math
 import time
-from typing import Optional, List, Tuple, Dict
-from dataclasses import dataclass
+from contextlib import contextmanager
+from typing import Optional, List, Tuple, Dict, Sequence
+from dataclasses import dataclass, field, replace
 
 # 导入结构化点云生成器
 from structured_pointcloud_generator import (
     StructuredPointCloudGenerator, 
-    StructuredParticle, 
-    StructureType
+    StructuredPointCloud, 
+    StructureType,
+    STRUCTURE_TEMPLATE_VERSION
 )
 
+# 场景点云磁盘缓存
+from scene_cache import SceneCache
+
+# 渲染质量等级约定
+from quality_settings import QualitySettings, DEFAULT_QUALITY, scaled_count
+
+# 共享字体与文字表面缓存
+from text_cache import get_font, render_text
+
 # 导入声音分类器
 try:
     from enhanced_sound_classifier import EnhancedSoundClassifier
@@ -39,6 +50,46 @@ try:
 except ImportError:
     MEMORY_ANALYSIS_ENABLED = False
 
+# 深度层数量 - 粒子在生成时按z值分配到固定深度层，渲染时由远及近逐层绘制
+DEPTH_LAYER_COUNT = 8
+
+def depth_layer_index(z: float) -> int:
+    """将深度值(0-1)映射为深度层索引"""
+    return min(DEPTH_LAYER_COUNT - 1, max(0, int(z * DEPTH_LAYER_COUNT)))
+
+# 预置场景布局种子 - 每位访客轮换一个布局，均可预先烘焙到磁盘缓存
+DEFAULT_LAYOUT_SEEDS = (0, 1, 2, 3)
+
+# 固定步长模拟 - 模拟频率与渲染帧率解耦
+SIMULATION_HZ = 30
+SIMULATION_DT = 1.0 / SIMULATION_HZ
+MAX_SIMULATION_STEPS = 4        # 每帧最多执行的模拟步数，防止掉帧后追赶导致雪崩
+MAX_FRAME_TIME = 0.25           # 单帧时间上限（秒），长时间停顿后不追赶
+REFERENCE_UPDATE_HZ = 60        # 粒子速度等参数按每秒60次更新调校
+
+# 水面由若干正弦分量叠加而成，按列向量化计算水面高度
+WATER_WAVE_COMPONENTS = 6
+WATER_AUDIO_GAIN = 3.0          # 音频能量对波幅的放大系数
+WATER_MAX_GAIN = 2.5            # 波幅放大上限
+REFLECTION_HEIGHT = 40          # 频谱倒影带高度（原生分辨率像素）
+REFLECTION_THRESHOLD = 0.08     # 低于该归一化幅度的频段不显示倒影
+
+# 可缓存的静态粒子系统（水滴在运行时动态生成，不缓存）
+CACHED_PARTICLE_SYSTEMS = ('buildings', 'trees', 'sky')
+
+@contextmanager
+def seeded_random(seed: Optional[int]):
+    """在固定种子下执行随机生成，结束后恢复全局随机状态"""
+    if seed is None:
+        yield
+        return
+    state = np.random.get_state()
+    np.random.seed(seed)
+    try:
+        yield
+    finally:
+        np.random.set_state(state)
+
 class CanalColors:
     """运河场景颜色定义 - 水墨风格"""
     # 基础墨色 - 调整为更淡雅的古风配色
@@ -82,16 +133,6 @@ class CanalColors:
     TRADITIONAL_GRAY = (140, 140, 145)   # 传统灰（淡雅）
     SEAL_RED = (160, 65, 55)             # 印章红（降低饱和度，保持古风韵味）
 
-@dataclass
-class WavePoint:
-    """水波点数据结构"""
-    x: float
-    y: float
-    amplitude: float
-    frequency: float
-    phase: float
-    speed: float
-
 @dataclass
 class Boat:
     """船只数据结构"""
@@ -102,6 +143,8 @@ class Boat:
     direction: float
     boat_type: str  # "货船", "客船", "小船"
     color: Tuple[int, int, int]
+    prev_x: float = 0.0  # 上一模拟步位置（用于渲染插值）
+    prev_y: float = 0.0
 
 @dataclass
 class Bridge:
@@ -127,6 +170,9 @@ class Particle:
     life: float  # 生命周期 (0-1)
     particle_type: str  # "building", "tree", "sky", "water_drop"
     intensity: float  # 音频响应强度
+    layer: int = 0  # 深度层索引（生成时分配）
+    prev_x: float = 0.0  # 上一模拟步位置（用于渲染插值）
+    prev_y: float = 0.0
 
 @dataclass
 class ParticleSystem:
@@ -135,29 +181,62 @@ class ParticleSystem:
     max_particles: int
     emission_rate: float
     audio_responsiveness: float
+    # 按深度层分桶的粒子（与particles引用同一批粒子对象）
+    layers: List[List[Particle]] = field(
+        default_factory=lambda: [[] for _ in range(DEPTH_LAYER_COUNT)]
+    )
 
 class CanalVisualizer:
     """运河场景可视化器 - 粒子点云版本"""
     
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, layout_seed: Optional[int] = None,
+                 layout_seeds: Sequence[int] = DEFAULT_LAYOUT_SEEDS,
+                 scene_cache: Optional[SceneCache] = None):
         self.width = width
         self.height = height
         self.water_surface_y = height * 0.6
         
+        # 场景布局与磁盘缓存
+        self.layout_seeds = tuple(layout_seeds)
+        self.layout_seed = layout_seed if layout_seed is not None else self.layout_seeds[0]
+        self.scene_cache = scene_cache if scene_cache is not None else SceneCache()
+        
         # 初始化结构化点云生成器
         self.structured_pointcloud_generator = StructuredPointCloudGenerator(width, height)
-        self.structured_particles = []
+        self.structured_particles = StructuredPointCloud.from_particles([])
+        
+        # 结构化点云烘焙图层（仅在音频调制后重新烘焙）
+        self._structured_layer_cache = None
+        self._structured_layer_dirty = True
+        self._structured_layer_bounds = None
+        
+        # 分层合成：不变图层只渲染一次，动态图层跟踪脏矩形
+        self._static_sky_layer = None
+        self._static_overlay_layer = None
+        self.dirty_rects: List[pygame.Rect] = []
+        self._previous_frame_rects: List[pygame.Rect] = []
+        self._full_redraw = True
         
-        # 生成初始结构化场景
-        self._generate_structured_scene()
+        # 渲染质量设置（由性能优化器通过apply_quality下发）
+        self.quality: QualitySettings = DEFAULT_QUALITY
         
-        # 初始化粒子系统（保留原有系统作为补充）
-        self._init_particle_systems()
+        # 离屏渲染：render_scale<1时场景先绘制到低分辨率表面，再放大到屏幕
+        self.render_scale = 1.0
+        self._offscreen_surface = None
+        self._reflection_surface = None
+        self._overlay_rects = None  # 上层覆盖层上一帧的绘制区域，None表示未知（需整屏放大）
         
-        # 初始化传统元素
-        self._init_water_waves()
-        self._init_boats()
-        self._init_bridges()
+        # 固定步长模拟时钟：累加器 + 渲染插值
+        self.sim_time = 0.0
+        self.simulation_dt = SIMULATION_DT
+        self.sim_step_scale = self.simulation_dt * REFERENCE_UPDATE_HZ
+        self.interpolation_alpha = 1.0
+        self._sim_accumulator = 0.0
+        self._drop_spawn_carry = 0.0  # 水滴生成数的小数部分，跨步累计
+        self._last_clock_time = None
+        
+        # 加载场景布局（结构化点云、粒子系统与传统元素）
+        self._load_layout(self.layout_seed)
         
         # 音频相关属性
         self.audio_energy = 0.0
@@ -175,7 +254,6 @@ class CanalVisualizer:
         
         # 性能监控
         self.render_times = []
-        self.last_update_time = 0.0
         
         # 初始化声音分类器
         self.sound_classifier = None
@@ -191,8 +269,86 @@ class CanalVisualizer:
                 print(f"声音分类器初始化失败: {e}")
                 self.sound_classifier = None
 
-    def _init_particle_systems(self):
-        """初始化粒子系统"""
+    def _load_layout(self, seed: int):
+        """加载场景布局：优先内存映射磁盘缓存，未命中时按种子生成并写入缓存"""
+        self.layout_seed = seed
+        key = SceneCache.make_key(self.width, self.height, STRUCTURE_TEMPLATE_VERSION, seed)
+        
+        load_start = time.time()
+        arrays = self.scene_cache.load(key)
+        if arrays is not None:
+            self.structured_particles = StructuredPointCloud.from_arrays(arrays)
+            self._init_particle_systems(arrays)
+            print(f"从缓存加载场景布局 {seed}: {len(self.structured_particles)} 个结构化粒子，"
+                  f"耗时 {(time.time() - load_start) * 1000:.1f} ms")
+        else:
+            with seeded_random(seed):
+                # 生成结构化场景
+                self._generate_structured_scene()
+                
+                # 初始化粒子系统（保留原有系统作为补充）
+                self._init_particle_systems()
+            
+            arrays = self.structured_particles.to_arrays()
+            arrays.update(self._particle_systems_to_arrays())
+            if self.scene_cache.save(key, arrays):
+                print(f"场景布局 {seed} 已写入缓存: {key}")
+        
+        # 初始化传统元素（开销很小，按同一种子生成以保持布局一致）
+        with seeded_random(seed):
+            self._init_water_waves()
+            self._init_boats()
+            self._init_bridges()
+        
+        for boat in self.boats:
+            boat.prev_x, boat.prev_y = boat.x, boat.y
+        
+        # 布局变化后所有缓存图层失效
+        self.invalidate_static_layers()
+
+    def next_layout(self):
+        """轮换到下一个预置场景布局（每位访客调用一次）"""
+        if self.layout_seed in self.layout_seeds:
+            index = (self.layout_seeds.index(self.layout_seed) + 1) % len(self.layout_seeds)
+        else:
+            index = 0
+        self._load_layout(self.layout_seeds[index])
+
+    def _particle_systems_to_arrays(self) -> Dict[str, np.ndarray]:
+        """将静态粒子系统导出为命名数组（用于磁盘缓存）"""
+        arrays = {}
+        for system_name in CACHED_PARTICLE_SYSTEMS:
+            particles = self.particle_systems[system_name].particles
+            arrays[f"{system_name}_position"] = np.array(
+                [(p.x, p.y, p.z, p.size, p.velocity_x, p.velocity_y) for p in particles],
+                dtype=np.float32
+            ).reshape(-1, 6)
+            arrays[f"{system_name}_color"] = np.array(
+                [p.color[:3] for p in particles], dtype=np.uint8
+            ).reshape(-1, 3)
+        return arrays
+
+    def _restore_particle_systems(self, arrays: Dict[str, np.ndarray]):
+        """由缓存数组恢复静态粒子系统"""
+        particle_types = {'buildings': "building", 'trees': "tree", 'sky': "sky"}
+        for system_name in CACHED_PARTICLE_SYSTEMS:
+            system = self.particle_systems[system_name]
+            positions = arrays[f"{system_name}_position"].tolist()
+            colors = arrays[f"{system_name}_color"].tolist()
+            for (x, y, z, size, velocity_x, velocity_y), color in zip(positions, colors):
+                self._spawn_particle(system, Particle(
+                    x=x, y=y, z=z,
+                    size=size,
+                    color=tuple(color),
+                    velocity_x=velocity_x,
+                    velocity_y=velocity_y,
+                    life=1.0,
+                    particle_type=particle_types[system_name],
+                    intensity=0.0
+                ))
+
+    def _init_particle_systems(self, cached_arrays: Optional[Dict[str, np.ndarray]] = None):
+        """初始化粒子系统，提供缓存数组时直接恢复"""
         self.particle_systems = {
             'buildings': ParticleSystem([], 200, 10.0, 1.0),
             'trees': ParticleSystem([], 150, 15.0, 1.5),
@@ -200,12 +356,23 @@ class CanalVisualizer:
             'water_drops': ParticleSystem([], 80, 20.0, 2.0)
         }
         
+        if cached_arrays is not None:
+            self._restore_particle_systems(cached_arrays)
+            return
+        
         # 初始化各类粒子
         self._init_building_particles()
         self._init_tree_particles()
         self._init_sky_particles()
         self._init_water_drop_particles()
     
+    def _spawn_particle(self, system: ParticleSystem, particle: Particle):
+        """将新粒子加入粒子系统，并按深度分配到固定深度层"""
+        particle.prev_x, particle.prev_y = particle.x, particle.y
+        particle.layer = depth_layer_index(particle.z)
+        system.particles.append(particle)
+        system.layers[particle.layer].append(particle)
+
     def _generate_structured_scene(self):
         """生成结构化场景点云"""
         # 生成完整的运河场景结构化点云
@@ -240,7 +407,7 @@ class CanalVisualizer:
                 particle_type="building",
                 intensity=0.0
             )
-            building_system.particles.append(particle)
+            self._spawn_particle(building_system, particle)
         
         # 右岸建筑群
         for i in range(60):
@@ -266,7 +433,7 @@ class CanalVisualizer:
                 particle_type="building",
                 intensity=0.0
             )
-            building_system.particles.append(particle)
+            self._spawn_particle(building_system, particle)
 
     def _init_tree_particles(self):
         """初始化树木粒子"""
@@ -306,7 +473,7 @@ class CanalVisualizer:
                     particle_type="tree",
                     intensity=0.0
                 )
-                tree_system.particles.append(particle)
+                self._spawn_particle(tree_system, particle)
 
     def _init_sky_particles(self):
         """初始化天空粒子"""
@@ -326,7 +493,7 @@ class CanalVisualizer:
                 particle_type="sky",
                 intensity=0.0
             )
-            sky_system.particles.append(particle)
+            self._spawn_particle(sky_system, particle)
 
     def _init_water_drop_particles(self):
         """初始化水滴粒子"""
@@ -359,8 +526,10 @@ class CanalVisualizer:
                 particle.size = base_size * (1 + particle.intensity * 0.3)
             
             # 轻微的随机移动
-            particle.x += particle.velocity_x * (1 + particle.intensity * 0.5)
-            particle.y += particle.velocity_y * (1 + particle.intensity * 0.5)
+            particle.prev_x, particle.prev_y = particle.x, particle.y
+            motion_scale = (1 + particle.intensity * 0.5) * self.sim_step_scale
+            particle.x += particle.velocity_x * motion_scale
+            particle.y += particle.velocity_y * motion_scale
 
     def _update_tree_particles(self):
         """更新树木粒子"""
@@ -369,8 +538,10 @@ class CanalVisualizer:
         for particle in tree_system.particles:
             # 风吹效果
             wind_strength = 0.1 + (self.audio_energy if hasattr(self, 'audio_energy') else 0) * 0.2
-            particle.x += math.sin(time.time() * 2 + particle.y * 0.01) * wind_strength
-            particle.y += math.cos(time.time() * 1.5 + particle.x * 0.01) * wind_strength * 0.5
+            wind_strength *= self.sim_step_scale
+            particle.prev_x, particle.prev_y = particle.x, particle.y
+            particle.x += math.sin(self.sim_time * 2 + particle.y * 0.01) * wind_strength
+            particle.y += math.cos(self.sim_time * 1.5 + particle.x * 0.01) * wind_strength * 0.5
             
             # 音频响应
             if hasattr(self, 'audio_energy'):
@@ -387,14 +558,15 @@ class CanalVisualizer:
         
         for particle in sky_system.particles:
             # 缓慢漂移
-            particle.x += particle.velocity_x
-            particle.y += particle.velocity_y
+            particle.prev_x, particle.prev_y = particle.x, particle.y
+            particle.x += particle.velocity_x * self.sim_step_scale
+            particle.y += particle.velocity_y * self.sim_step_scale
             
-            # 边界循环
+            # 边界循环（跳变时不插值）
             if particle.x > self.width + 20:
-                particle.x = -20
+                particle.x = particle.prev_x = -20
             elif particle.x < -20:
-                particle.x = self.width + 20
+                particle.x = particle.prev_x = self.width + 20
                 
             # 音频响应 - 云雾密度变化
             if hasattr(self, 'audio_energy'):
@@ -409,10 +581,14 @@ class CanalVisualizer:
         
         # 根据音频强度生成新的水滴
         if hasattr(self, 'audio_energy') and self.audio_energy > 0.1:
-            if len(water_system.particles) < water_system.max_particles:
-                # 生成新水滴
-                for _ in range(int(self.audio_energy * 10)):
-                    if len(water_system.particles) >= water_system.max_particles:
+            max_drops = scaled_count(water_system.max_particles, self.quality)
+            if len(water_system.particles) < max_drops:
+                # 生成新水滴：生成速率按步长折算，不足一个的部分累计到后续步
+                self._drop_spawn_carry += self.audio_energy * 10 * self.sim_step_scale
+                spawn_count = int(self._drop_spawn_carry)
+                self._drop_spawn_carry -= spawn_count
+                for _ in range(spawn_count):
+                    if len(water_system.particles) >= max_drops:
                         break
                         
                     particle = Particle(
@@ -427,45 +603,51 @@ class CanalVisualizer:
                         particle_type="water_drop",
                         intensity=self.audio_energy
                     )
-                    water_system.particles.append(particle)
+                    self._spawn_particle(water_system, particle)
         
         # 更新现有水滴
         particles_to_remove = []
         for i, particle in enumerate(water_system.particles):
-            particle.x += particle.velocity_x
-            particle.y += particle.velocity_y
-            particle.life -= 0.02
+            particle.prev_x, particle.prev_y = particle.x, particle.y
+            particle.x += particle.velocity_x * self.sim_step_scale
+            particle.y += particle.velocity_y * self.sim_step_scale
+            particle.life -= 0.02 * self.sim_step_scale
             
             # 重力效果
-            particle.velocity_y += 0.1
+            particle.velocity_y += 0.1 * self.sim_step_scale
             
             # 移除生命周期结束的粒子
             if particle.life <= 0 or particle.y > self.height:
                 particles_to_remove.append(i)
         
-        # 移除过期粒子
+        # 移除过期粒子（同时从所在深度层移除）
         for i in reversed(particles_to_remove):
-            water_system.particles.pop(i)
+            expired = water_system.particles.pop(i)
+            water_system.layers[expired.layer].remove(expired)
 
-    def _render_particle_systems(self, screen: pygame.Surface):
-        """渲染所有粒子系统"""
-        # 按深度排序渲染
-        all_particles = []
-        for system in self.particle_systems.values():
-            all_particles.extend(system.particles)
+    def _render_particle_systems(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """渲染所有粒子系统 - 按深度层由远及近绘制，无需逐帧全局排序"""
+        systems = list(self.particle_systems.values())
+        rects = []
         
-        # 按z值排序（远到近）
-        all_particles.sort(key=lambda p: p.z)
+        for layer_index in range(DEPTH_LAYER_COUNT):
+            for system in systems:
+                layer = system.layers[layer_index]
+                # 按粒子预算只绘制每层的前一部分（粒子按随机位置生成，子集分布均匀）
+                if self.quality.particle_budget < 1.0:
+                    layer = layer[:scaled_count(len(layer), self.quality)]
+                for particle in layer:
+                    rects.append(self._render_particle(screen, particle))
         
-        for particle in all_particles:
-            self._render_particle(screen, particle)
+        return rects
 
-    def _render_particle(self, screen: pygame.Surface, particle: Particle):
-        """渲染单个粒子 - 增强E2场景的古风粒子效果"""
+    def _render_particle(self, screen: pygame.Surface, particle: Particle) -> Optional[pygame.Rect]:
+        """渲染单个粒子 - 增强E2场景的古风粒子效果，返回绘制区域"""
         try:
             # 深度调整
             depth_factor = particle.z
-            adjusted_size = max(1, int(particle.size * depth_factor))
+            adjusted_size = max(1, int(particle.size * depth_factor * self.quality.sprite_scale * self.render_scale))
+            glow = self.quality.glow_effects
             
             # 颜色深度调整 - 增强古风效果
             color = particle.color
@@ -483,7 +665,7 @@ class CanalVisualizer:
                     pygame.draw.rect(particle_surface, color[:3], 
                                    (0, 0, adjusted_size * 2, adjusted_size * 2))
                     # 添加边缘模糊效果
-                    for i in range(1, 3):
+                    for i in (range(1, 3) if glow else ()):
                         edge_alpha = int(color[3] * 0.3 / i) if len(color) > 3 else 30
                         edge_color = (*color[:3], edge_alpha)
                         pygame.draw.rect(particle_surface, edge_color[:3], 
@@ -494,7 +676,7 @@ class CanalVisualizer:
                     pygame.draw.circle(particle_surface, color[:3], 
                                      (adjusted_size, adjusted_size), adjusted_size)
                     # 添加晕染效果
-                    for r in range(adjusted_size + 1, adjusted_size + 3):
+                    for r in (range(adjusted_size + 1, adjusted_size + 3) if glow else ()):
                         fade_alpha = int((color[3] if len(color) > 3 else 255) * 0.2)
                         fade_color = (*color[:3], fade_alpha)
                         pygame.draw.circle(particle_surface, fade_color[:3], 
@@ -502,7 +684,8 @@ class CanalVisualizer:
                         
                 elif particle.particle_type == "sky":
                     # 天空粒子 - 模糊圆形，增强古风云雾效果
-                    for r in range(adjusted_size, 0, -1):
+                    # 关闭光晕效果时只绘制最外层
+                    for r in (range(adjusted_size, 0, -1) if glow else (adjusted_size,)):
                         alpha = int((color[3] if len(color) > 3 else 255) * (r / adjusted_size) * 0.2)  # 更淡
                         fade_color = (*color[:3], alpha)
                         pygame.draw.circle(particle_surface, fade_color[:3], 
@@ -513,7 +696,7 @@ class CanalVisualizer:
                     pygame.draw.circle(particle_surface, color[:3], 
                                      (adjusted_size, adjusted_size), adjusted_size)
                     # 添加水墨晕染
-                    for r in range(adjusted_size + 1, adjusted_size + 4):
+                    for r in (range(adjusted_size + 1, adjusted_size + 4) if glow else ()):
                         ripple_alpha = int((color[3] if len(color) > 3 else 255) * 0.15)
                         ripple_color = (*CanalColors.CANAL_BLUE_MIST, ripple_alpha)
                         pygame.draw.circle(particle_surface, ripple_color[:3], 
@@ -527,12 +710,15 @@ class CanalVisualizer:
                 if len(color) > 3:
                     particle_surface.set_alpha(color[3])
                 
-                # 绘制到屏幕
-                screen.blit(particle_surface, 
-                          (int(particle.x - adjusted_size), int(particle.y - adjusted_size)))
+                # 绘制到屏幕（在两个模拟状态之间插值）
+                x = self._interpolate(particle.prev_x, particle.x) * self.render_scale
+                y = self._interpolate(particle.prev_y, particle.y) * self.render_scale
+                return screen.blit(particle_surface, 
+                                   (int(x - adjusted_size), int(y - adjusted_size)))
                 
         except Exception as e:
             print(f"粒子渲染错误: {e}")
+        return None
 
     def _render_sky(self, screen: pygame.Surface):
         """渲染天空 - E2场景使用纯白背景"""
@@ -664,81 +850,133 @@ class CanalVisualizer:
         ]
         pygame.draw.polygon(screen, CanalColors.SHORE_STONE, shore_points_right)
 
-    def _render_water(self, screen: pygame.Surface):
-        """渲染水面"""
-        # 基础水面
+    def _render_water_base(self, surface: pygame.Surface):
+        """渲染基础水面（不变图层）"""
         water_rect = pygame.Rect(
             0,
             self.water_surface_y,
             self.width,
             self.height - self.water_surface_y
         )
-        pygame.draw.rect(screen, CanalColors.CANAL_BLUE, water_rect)
+        pygame.draw.rect(surface, CanalColors.CANAL_BLUE, water_rect)
+
+    def _render_water(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """渲染水面动态部分（水波与频谱反射），基础水面位于静态图层"""
+        rects = []
         
         # 水波纹理
-        if hasattr(self, 'wave_points'):
-            wave_points = []
-            for wave in self.wave_points:
-                wave_points.append((wave.x, wave.y))
-            
-            if len(wave_points) > 2:
-                pygame.draw.lines(screen, CanalColors.CANAL_BLUE_LIGHT, False, wave_points, 2)
+        if hasattr(self, 'wave_wavenumber'):
+            rects.append(self._render_wave_line(screen))
         
         # 渲染频谱反射（水面光影效果）
-        self._render_spectrum_reflection(screen)
+        if self.quality.reflections:
+            rects.append(self._render_spectrum_reflection(screen))
+        return rects
+
+    def _water_heights(self, xs: np.ndarray, t: float, gain: float) -> np.ndarray:
+        """计算水面在各x处的高度（原生分辨率坐标）：各正弦分量叠加"""
+        phases = (np.outer(self.wave_wavenumber, xs)
+                  - (self.wave_angular_speed * t)[:, None]
+                  + self.wave_phase[:, None])
+        offsets = self.wave_amplitude @ np.sin(phases)
+        return self.water_surface_y + offsets * gain
+
+    def _render_wave_line(self, screen: pygame.Surface) -> Optional[pygame.Rect]:
+        """将水波线直接写入像素缓冲区，返回绘制区域"""
+        scale = self.render_scale
+        width, height = screen.get_size()
+        columns = np.arange(width)
+        
+        # 在两个模拟状态之间插值：按插值时刻求水面高度
+        t = self.sim_time - (1.0 - self.interpolation_alpha) * self.simulation_dt
+        gain = self._interpolate(self._previous_wave_gain, self.wave_gain)
+        rows = np.rint(self._water_heights(columns / scale, t, gain) * scale).astype(np.int32)
+        
+        # 相邻列高度差较大时补齐竖直段，保证线条连续
+        previous_rows = np.concatenate((rows[:1], rows[:-1]))
+        top = np.minimum(rows, previous_rows)
+        span = np.maximum(rows, previous_rows) - top
+        thickness = max(1, int(round(2 * scale)))
+        
+        pixels = pygame.surfarray.pixels3d(screen)
+        try:
+            for offset in range(int(span.max()) + thickness):
+                mask = offset <= span + thickness - 1
+                ys = top[mask] + offset
+                valid = (ys >= 0) & (ys < height)
+                pixels[columns[mask][valid], ys[valid]] = CanalColors.CANAL_BLUE_LIGHT
+        finally:
+            del pixels
+        
+        top_row = int(top.min())
+        return pygame.Rect(0, top_row, width, int((top + span).max()) - top_row + thickness)
 
-    def _render_spectrum_reflection(self, screen: pygame.Surface):
-        """渲染频谱反射 - 全屏长度的水面光影效果"""
+    def _render_spectrum_reflection(self, screen: pygame.Surface) -> Optional[pygame.Rect]:
+        """渲染频谱反射 - 全屏长度的水面光影效果，倒影渐变直接写入alpha缓冲区"""
         if not hasattr(self, 'spectrum_data') or self.spectrum_data is None or len(self.spectrum_data) == 0:
-            return
+            return None
         
-        # 在水面下方绘制频谱反射，覆盖全屏宽度
-        reflection_y_start = self.water_surface_y + 15
-        reflection_height = 40  # 增加高度以增强视觉效果
+        scale = self.render_scale
+        width = screen.get_width()
+        reflection_height = max(1, int(REFLECTION_HEIGHT * scale))
+        reflection_y = int((self.water_surface_y + 15) * scale)
         
-        # 确保频谱条覆盖全屏宽度
-        bar_width = max(1, self.width / len(self.spectrum_data))
+        # 倒影表面颜色固定，每帧只重写alpha通道
+        surface = self._reflection_surface
+        if surface is None or surface.get_size() != (width, reflection_height):
+            surface = pygame.Surface((width, reflection_height), pygame.SRCALPHA)
+            surface.fill((*CanalColors.CANAL_BLUE_MIST, 0))
+            self._reflection_surface = surface
         
-        for i, magnitude in enumerate(self.spectrum_data):
-            # 归一化幅度
-            normalized_mag = min(magnitude / (np.max(self.spectrum_data) + 1e-8), 1.0)
-            
-            # 只渲染有意义的频谱数据
-            if normalized_mag < 0.08:  # 降低阈值以显示更多细节
-                continue
-            
-            # 计算反射条高度
-            bar_height = max(1, int(normalized_mag * reflection_height * 0.8))
-            
-            # 反射条位置 - 确保覆盖全屏宽度
-            bar_x = int(i * bar_width)
-            bar_y = reflection_y_start
-            
-            # 更柔和的透明度和颜色
-            alpha = int(100 * (0.8 + normalized_mag * 0.4))  # 调整透明度
-            
-            # 使用水墨蓝色系
-            base_color = CanalColors.CANAL_BLUE_MIST
-            color = (*base_color, alpha)
-            
-            # 创建带透明度的表面
-            bar_width_int = max(1, int(bar_width))
-            reflection_surf = pygame.Surface((bar_width_int, bar_height), pygame.SRCALPHA)
-            reflection_surf.fill(color)
-            
-            # 确保不超出屏幕边界
-            if bar_x + bar_width_int <= self.width:
-                screen.blit(reflection_surf, (bar_x, bar_y))
+        # 每列对应的频段与归一化幅度
+        spectrum = np.asarray(self.spectrum_data, dtype=np.float32)
+        bins = np.minimum((np.arange(width) * len(spectrum)) // width, len(spectrum) - 1)
+        magnitude = np.minimum(spectrum[bins] / (spectrum.max() + 1e-8), 1.0)
+        magnitude[magnitude < REFLECTION_THRESHOLD] = 0.0
+        
+        # 倒影条高度与透明度，条内自上而下渐隐
+        bar_height = np.where(magnitude > 0,
+                              np.maximum(1, (magnitude * reflection_height * 0.8).astype(np.int32)), 0)
+        column_alpha = 100 * (0.8 + magnitude * 0.4)
+        depth = np.arange(reflection_height, dtype=np.float32)
+        fade = 1.0 - 0.5 * depth / reflection_height
+        alpha = np.where(depth[None, :] < bar_height[:, None],
+                         column_alpha[:, None] * fade[None, :], 0)
+        
+        alpha_pixels = pygame.surfarray.pixels_alpha(surface)
+        try:
+            alpha_pixels[:] = alpha.astype(np.uint8)
+        finally:
+            del alpha_pixels
+        
+        return screen.blit(surface, (0, reflection_y))
 
-    def _render_boats(self, screen: pygame.Surface):
-        """渲染船只"""
+    def _render_boats(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """渲染船只，返回各船只的绘制区域"""
+        rects = []
         for boat in self.boats:
+            # 按插值位置与渲染比例绘制（不修改模拟状态）
+            boat = replace(boat,
+                           x=self._interpolate(boat.prev_x, boat.x) * self.render_scale,
+                           y=self._interpolate(boat.prev_y, boat.y) * self.render_scale,
+                           size=boat.size * self.render_scale)
             if boat.boat_type == "货船":
                 self._render_cargo_boat(screen, boat)
             elif boat.boat_type == "客船":
                 self._render_passenger_boat(screen, boat)
             else:
                 self._render_small_boat(screen, boat)
+            rects.append(self._boat_bounds(boat))
+        return rects
+
+    def _boat_bounds(self, boat: Boat) -> pygame.Rect:
+        """船只绘制范围（覆盖船体、船帆、烟囱与船桨）"""
+        return pygame.Rect(
+            int(boat.x - boat.size * 0.6) - 2,
+            int(boat.y - boat.size * 0.55) - 2,
+            int(boat.size * 1.2) + 4,
+            int(boat.size * 0.85) + 4
+        )
 
     def _render_cargo_boat(self, screen: pygame.Surface, boat: Boat):
         """渲染货船"""
@@ -833,21 +1071,16 @@ class CanalVisualizer:
         )
 
     def _init_water_waves(self):
-        """初始化水波系统"""
-        self.wave_points = []
-        
-        # 创建多层水波
-        wave_count = 50
-        for i in range(wave_count):
-            wave = WavePoint(
-                x=i * (self.width / wave_count),
-                y=self.height * 0.6,  # 水面位置
-                amplitude=np.random.uniform(5, 15),
-                frequency=np.random.uniform(0.01, 0.03),
-                phase=np.random.uniform(0, 2 * math.pi),
-                speed=np.random.uniform(0.5, 1.5)
-            )
-            self.wave_points.append(wave)
+        """初始化水波系统 - 水面高度为若干向右传播的正弦分量之和"""
+        wavelength = np.random.uniform(80, 400, WATER_WAVE_COMPONENTS)
+        self.wave_wavenumber = 2 * math.pi / wavelength
+        self.wave_amplitude = np.random.uniform(2, 6, WATER_WAVE_COMPONENTS)
+        self.wave_angular_speed = self.wave_wavenumber * np.random.uniform(30, 90, WATER_WAVE_COMPONENTS)
+        self.wave_phase = np.random.uniform(0, 2 * math.pi, WATER_WAVE_COMPONENTS)
+        
+        # 音频调制的波幅增益（模拟状态，渲染时插值）
+        self.wave_gain = 1.0
+        self._previous_wave_gain = 1.0
         
         # 水面反射区域
         self.water_depth = self.height - self.water_surface_y
@@ -899,17 +1132,16 @@ class CanalVisualizer:
 
     @profile_function
     def update(self, audio_data: Optional[np.ndarray] = None):
-        """更新场景状态"""
+        """更新场景状态 - 按固定步长推进模拟，与渲染帧率无关"""
         try:
-            current_time = time.time()
-            
-            # 限制更新频率以提升性能
-            if hasattr(self, 'last_update_time'):
-                if current_time - self.last_update_time < 1.0 / 60:  # 限制为60FPS
-                    return
-            self.last_update_time = current_time
+            current_time = time.perf_counter()
+            if self._last_clock_time is None:
+                self._last_clock_time = current_time
+            frame_time = min(current_time - self._last_clock_time, MAX_FRAME_TIME)
+            self._last_clock_time = current_time
+            self._sim_accumulator += frame_time
             
-            # 处理音频数据
+            # 处理音频数据（每帧一次，供本帧所有模拟步使用）
             if audio_data is not None:
                 # 降采样音频数据以提升性能
                 if len(audio_data) > 512:
@@ -917,24 +1149,69 @@ class CanalVisualizer:
                 
                 self._process_audio_data(audio_data)
             
-            # 更新粒子系统（E2状态的核心功能）
-            self._update_particle_systems()
+            steps = 0
+            while self._sim_accumulator >= self.simulation_dt and steps < MAX_SIMULATION_STEPS:
+                self._step_simulation(audio_data)
+                self._sim_accumulator -= self.simulation_dt
+                steps += 1
             
-            # 更新结构化粒子（新增）
-            self._update_structured_particles(audio_data)
+            # 超出单帧步数上限时丢弃积压时间，场景宁可变慢也不卡死
+            if self._sim_accumulator >= self.simulation_dt:
+                self._sim_accumulator %= self.simulation_dt
             
-            # 更新水波（优化版本）
-            self._update_water_waves_optimized()
-            
-            # 更新船只
-            self._update_boats()
-            
-            # 更新时间相关的动画
-            self.time_offset = current_time * 0.5
+            # 渲染插值系数：当前时刻位于上一模拟状态与当前模拟状态之间的位置
+            self.interpolation_alpha = min(1.0, self._sim_accumulator / self.simulation_dt)
             
         except Exception as e:
             print(f"更新场景时出错: {e}")
     
+    def _step_simulation(self, audio_data: Optional[np.ndarray] = None):
+        """推进一个固定模拟步"""
+        self.sim_time += self.simulation_dt
+        
+        # 更新粒子系统（E2状态的核心功能）
+        self._update_particle_systems()
+        
+        # 更新结构化粒子（新增）
+        self._update_structured_particles(audio_data)
+        
+        # 更新水波（优化版本）
+        self._update_water_waves_optimized()
+        
+        # 更新船只
+        self._update_boats()
+        
+        # 更新时间相关的动画
+        self.time_offset = self.sim_time * 0.5
+    
+    def apply_quality(self, settings: QualitySettings):
+        """应用质量设置：粒子预算、粒子尺寸、模拟频率与效果开关"""
+        self.quality = settings
+        self.set_render_scale(settings.render_scale)
+        
+        # 降低模拟频率时按步长缩放运动量，场景速度保持不变
+        self.simulation_dt = SIMULATION_DT * settings.update_interval_scale
+        self.sim_step_scale = self.simulation_dt * REFERENCE_UPDATE_HZ
+    
+    def set_render_scale(self, scale: float):
+        """设置场景离屏渲染比例（1.0为原生分辨率）"""
+        scale = min(1.0, max(0.25, scale))
+        if scale == self.render_scale:
+            return
+        self.render_scale = scale
+        self._offscreen_surface = None
+        self._reflection_surface = None
+        self._structured_layer_cache = None
+        self.invalidate_static_layers()
+    
+    def set_overlay_rects(self, rects: Optional[List[pygame.Rect]]):
+        """记录上层覆盖层的绘制区域，离屏渲染时需一并放大以擦除旧内容；None表示整屏"""
+        self._overlay_rects = rects
+    
+    def _interpolate(self, previous: float, current: float) -> float:
+        """在上一模拟状态与当前模拟状态之间线性插值"""
+        return previous + (current - previous) * self.interpolation_alpha
+    
     def _update_structured_particles(self, audio_data: Optional[np.ndarray] = None):
         """更新结构化粒子"""
         if audio_data is not None and len(self.structured_particles) > 0:
@@ -952,83 +1229,77 @@ class CanalVisualizer:
             
             frequency_bands = np.array([low_freq, mid_freq, high_freq])
             
-            # 更新结构化粒子
-            self.structured_pointcloud_generator.update_particles_with_audio(
-                self.structured_particles, audio_energy, frequency_bands
+            # 更新结构化粒子，发生音频调制时标记烘焙图层失效
+            modulated = self.structured_pointcloud_generator.update_particles_with_audio(
+                self.structured_particles, audio_energy, frequency_bands, self.sim_step_scale
             )
+            if modulated:
+                self._structured_layer_dirty = True
 
     def _update_water_waves_optimized(self):
-        """优化的水波更新"""
-        try:
-            current_time = time.time()
-            
-            # 只更新可见的水波点
-            for wave in self.wave_points:
-                if 0 <= wave.x <= self.width:  # 只更新屏幕内的波点
-                    wave.y = self.water_surface_y + wave.amplitude * math.sin(
-                        current_time * wave.frequency + wave.phase
-                    )
-                    wave.x += wave.speed
-                    
-                    # 循环边界
-                    if wave.x > self.width:
-                        wave.x = -10
-                        
-        except Exception as e:
-            print(f"水波更新错误: {e}")
+        """更新水波：波形由模拟时钟解析求得，每步只平滑音频调制的波幅增益"""
+        target_gain = 1.0 + min(self.audio_energy * WATER_AUDIO_GAIN, WATER_MAX_GAIN - 1.0)
+        self._previous_wave_gain = self.wave_gain
+        self.wave_gain += (target_gain - self.wave_gain) * min(1.0, 0.2 * self.sim_step_scale)
 
     def _update_boats(self):
         """更新船只位置"""
         try:
             for boat in self.boats:
-                boat.x += boat.speed * boat.direction
+                boat.prev_x, boat.prev_y = boat.x, boat.y
+                boat.x += boat.speed * boat.direction * self.sim_step_scale
                 
-                # 边界处理
+                # 边界处理（跳变时不插值）
                 if boat.x > self.width + 50:
-                    boat.x = -50
+                    boat.x = boat.prev_x = -50
                 elif boat.x < -50:
-                    boat.x = self.width + 50
+                    boat.x = boat.prev_x = self.width + 50
                     
                 # 轻微的垂直摆动
-                boat.y = self.water_surface_y + 5 * math.sin(time.time() * 2 + boat.x * 0.01)
+                boat.y = self.water_surface_y + 5 * math.sin(self.sim_time * 2 + boat.x * 0.01)
                 
         except Exception as e:
             print(f"船只更新错误: {e}")
 
     @profile_function
     def render(self, screen: pygame.Surface):
-        """渲染场景"""
+        """渲染场景 - 由缓存的不变图层与动态图层合成，并记录本帧脏矩形"""
         try:
             # 性能计时
             render_start = time.time()
             
-            # 渲染天空
-            self._render_sky(screen)
+            if self._static_sky_layer is None or self._static_overlay_layer is None:
+                self._build_static_layers()
+            
+            # 降低渲染比例时先绘制到低分辨率离屏表面
+            target = screen if self.render_scale >= 1.0 else self._get_offscreen_surface()
+            
+            frame_rects = []
+            
+            # 天空（不变图层）
+            target.blit(self._static_sky_layer, (0, 0))
             
             # 渲染背景（使用粒子系统替代色块）
             if hasattr(self, 'particle_systems'):
-                self._render_particle_systems(screen)
+                frame_rects.append(self._union_rects(self._render_particle_systems(target)))
             else:
                 # 回退到传统渲染
-                self._render_background(screen)
-            
-            # 渲染结构化粒子（新增）
-            self._render_structured_particles(screen)
-            
-            # 渲染桥梁
-            self._render_bridges(screen)
+                self._render_background(target)
             
-            # 渲染岸边
-            self._render_shore(screen)
+            # 渲染结构化粒子（烘焙图层）
+            frame_rects.append(self._render_structured_particles(target))
             
-            # 渲染水面
-            self._render_water(screen)
+            # 桥梁、岸边与基础水面（不变图层）
+            target.blit(self._static_overlay_layer, (0, 0))
             
-            # 渲染船只
-            self._render_boats(screen)
+            # 水面、船只与前景（动态图层）
+            water_rects = self._render_water(target)
+            water_rects.extend(self._render_boats(target))
+            water_rects.extend(self._render_foreground(target))
+            frame_rects.append(self._union_rects(water_rects))
             
-            # 渲染前景元素
-            self._render_foreground(screen)
+            # FPS文字始终以原生分辨率绘制在放大后的画面之上
+            fps_text = None
             
             # 性能监控
             if PERFORMANCE_OPTIMIZATION_ENABLED:
@@ -1046,47 +1317,199 @@ class CanalVisualizer:
                     fps = 1.0 / avg_render_time if avg_render_time > 0 else 0
                     
                     # 在屏幕上显示FPS
-                    font = pygame.font.Font(None, 24)
-                    fps_text = font.render(f"FPS: {fps:.1f}", True, CanalColors.INK_DARK)
+                    fps_text = render_text(get_font(None, 24), f"FPS: {fps:.1f}", True, CanalColors.INK_DARK)
+            
+            if target is screen:
+                if fps_text is not None:
+                    frame_rects.append(screen.blit(fps_text, (10, 10)))
+                self._update_dirty_rects(screen, frame_rects)
+            else:
+                # 覆盖层与FPS区域也需从离屏表面放大，以擦除上一帧的内容
+                fps_rect = fps_text.get_rect(topleft=(10, 10)) if fps_text is not None else None
+                for rect in [fps_rect] + list(self._overlay_rects or []):
+                    if rect:
+                        frame_rects.append(self._to_render_rect(rect))
+                if self._overlay_rects is None:
+                    self._full_redraw = True
+                
+                self._update_dirty_rects(target, frame_rects)
+                self.dirty_rects = self._upscale_to_screen(target, screen, self.dirty_rects)
+                if fps_text is not None:
                     screen.blit(fps_text, (10, 10))
             
         except Exception as e:
             print(f"渲染场景时出错: {e}")
+            # 出错时要求整屏刷新
+            self._full_redraw = True
+            self.dirty_rects = [screen.get_rect()]
 
-    def _render_structured_particles(self, screen: pygame.Surface):
-        """渲染结构化粒子"""
+    def _build_static_layers(self):
+        """构建不变图层缓存：天空，以及桥梁、岸边与基础水面"""
+        sky_layer = pygame.Surface((self.width, self.height))
+        self._render_sky(sky_layer)
+        
+        overlay_layer = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        overlay_layer.fill((0, 0, 0, 0))
+        self._render_bridges(overlay_layer)
+        self._render_shore(overlay_layer)
+        self._render_water_base(overlay_layer)
+        
+        # 离屏渲染时将不变图层预先缩小到渲染分辨率
+        if self.render_scale < 1.0:
+            render_size = self._render_size()
+            sky_layer = pygame.transform.smoothscale(sky_layer, render_size)
+            overlay_layer = pygame.transform.smoothscale(overlay_layer, render_size)
+        
+        # 转换为显示格式以加速每帧合成
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            sky_layer = sky_layer.convert()
+            overlay_layer = overlay_layer.convert_alpha()
+        
+        self._static_sky_layer = sky_layer
+        self._static_overlay_layer = overlay_layer
+        self._full_redraw = True
+
+    def _render_size(self) -> Tuple[int, int]:
+        """离屏渲染表面尺寸"""
+        return (max(1, int(self.width * self.render_scale)),
+                max(1, int(self.height * self.render_scale)))
+
+    def _get_offscreen_surface(self) -> pygame.Surface:
+        """获取低分辨率离屏渲染表面（按渲染比例缓存）"""
+        if self._offscreen_surface is None:
+            surface = pygame.Surface(self._render_size())
+            if pygame.display.get_init() and pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            self._offscreen_surface = surface
+            self._full_redraw = True
+        return self._offscreen_surface
+
+    def _to_render_rect(self, rect: pygame.Rect) -> pygame.Rect:
+        """屏幕坐标矩形转换为离屏渲染坐标（向外取整）"""
+        scale = self.render_scale
+        left = int(math.floor(rect.left * scale))
+        top = int(math.floor(rect.top * scale))
+        right = int(math.ceil(rect.right * scale))
+        bottom = int(math.ceil(rect.bottom * scale))
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def _upscale_to_screen(self, source: pygame.Surface, screen: pygame.Surface,
+                           rects: List[pygame.Rect]) -> List[pygame.Rect]:
+        """将离屏表面的脏区域放大到屏幕，返回屏幕坐标下的脏矩形"""
+        source_rect = source.get_rect()
+        screen_rect = screen.get_rect()
+        
+        # 整屏放大
+        if any(rect == source_rect for rect in rects):
+            if screen.get_size() == (self.width, self.height) and screen.get_bitsize() in (24, 32):
+                pygame.transform.smoothscale(source, screen.get_size(), screen)
+            else:
+                screen.blit(pygame.transform.smoothscale(source, screen.get_size()), (0, 0))
+            return [screen_rect]
+        
+        # 局部放大：外扩1像素以避免平滑插值在区域边缘产生接缝
+        scale = self.render_scale
+        screen_rects = []
+        for rect in rects:
+            rect = rect.inflate(2, 2).clip(source_rect)
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            dest = pygame.Rect(
+                int(rect.left / scale), int(rect.top / scale),
+                int(math.ceil(rect.right / scale)) - int(rect.left / scale),
+                int(math.ceil(rect.bottom / scale)) - int(rect.top / scale)
+            ).clip(screen_rect)
+            if dest.width <= 0 or dest.height <= 0:
+                continue
+            scaled = pygame.transform.smoothscale(source.subsurface(rect), dest.size)
+            screen_rects.append(screen.blit(scaled, dest.topleft))
+        return screen_rects
+
+    def invalidate_static_layers(self):
+        """使不变图层缓存失效（场景布局变化时调用）"""
+        self._static_sky_layer = None
+        self._static_overlay_layer = None
+        self._structured_layer_dirty = True
+        self._full_redraw = True
+
+    def _union_rects(self, rects: List[Optional[pygame.Rect]]) -> Optional[pygame.Rect]:
+        """合并一组绘制区域为单个矩形"""
+        rects = [rect for rect in rects if rect]
+        if not rects:
+            return None
+        return rects[0].unionall(rects[1:])
+
+    def _update_dirty_rects(self, screen: pygame.Surface, frame_rects: List[Optional[pygame.Rect]]):
+        """记录本帧脏矩形：本帧动态区域加上一帧动态区域（擦除旧位置）"""
+        screen_rect = screen.get_rect()
+        current = [rect.clip(screen_rect) for rect in frame_rects if rect]
+        current = [rect for rect in current if rect.width > 0 and rect.height > 0]
+        
+        if self._full_redraw:
+            self.dirty_rects = [screen_rect]
+            self._full_redraw = False
+        else:
+            self.dirty_rects = current + self._previous_frame_rects
+        
+        self._previous_frame_rects = current
+
+    def _render_structured_particles(self, screen: pygame.Surface) -> Optional[pygame.Rect]:
+        """渲染结构化粒子 - 复用烘焙好的图层表面，重新烘焙时返回其覆盖区域"""
         try:
-            for particle in self.structured_particles:
-                # 转换结构化粒子为pygame坐标
-                screen_x = int(particle.x)
-                screen_y = int(particle.y)
-                
-                # 确保在屏幕范围内
-                if 0 <= screen_x < self.width and 0 <= screen_y < self.height:
-                    # 根据深度调整颜色和大小
-                    depth_factor = particle.z
-                    adjusted_color = tuple(
-                        int(c * (0.5 + depth_factor * 0.5)) for c in particle.color
-                    )
-                    adjusted_size = max(1, int(particle.size * (0.7 + depth_factor * 0.3)))
-                    
-                    # 音频响应效果
-                    if hasattr(particle, 'intensity') and particle.intensity > 0:
-                        intensity_factor = min(1.0, particle.intensity * 2)
-                        adjusted_size = int(adjusted_size * (1 + intensity_factor * 0.5))
-                        # 添加轻微的颜色变化
-                        adjusted_color = tuple(
-                            min(255, int(c * (1 + intensity_factor * 0.3))) for c in adjusted_color
-                        )
-                    
-                    # 绘制粒子
-                    if adjusted_size > 1:
-                        pygame.draw.circle(screen, adjusted_color, (screen_x, screen_y), adjusted_size)
-                    else:
-                        screen.set_at((screen_x, screen_y), adjusted_color)
+            rebaked = self._structured_layer_dirty or self._structured_layer_cache is None
+            if rebaked:
+                self._bake_structured_layer()
+            
+            screen.blit(self._structured_layer_cache, (0, 0))
+            
+            if rebaked:
+                return self._structured_layer_bounds
                         
         except Exception as e:
             print(f"渲染结构化粒子时出错: {e}")
+        return None
+
+    def _bake_structured_layer(self):
+        """将结构化点云烘焙到缓存图层表面"""
+        render_width, render_height = self._render_size()
+        if self._structured_layer_cache is None:
+            self._structured_layer_cache = pygame.Surface((render_width, render_height), pygame.SRCALPHA)
+        layer = self._structured_layer_cache
+        layer.fill((0, 0, 0, 0))
+        
+        cloud = self.structured_particles
+        if len(cloud) > 0:
+            # 转换结构化粒子为渲染坐标，并筛选屏幕范围内的粒子
+            scale = self.render_scale
+            screen_x = (cloud.x * scale).astype(np.int32)
+            screen_y = (cloud.y * scale).astype(np.int32)
+            visible = (screen_x >= 0) & (screen_x < render_width) & (screen_y >= 0) & (screen_y < render_height)
+            
+            # 根据深度调整颜色和大小
+            depth_factor = cloud.z[visible]
+            colors = (cloud.color[visible] * (0.5 + depth_factor * 0.5)[:, None]).astype(np.int32)
+            sizes = np.maximum(1, (cloud.size[visible] * (0.7 + depth_factor * 0.3) * scale).astype(np.int32))
+            
+            # 音频响应效果
+            intensity = cloud.intensity[visible]
+            active = intensity > 0
+            if np.any(active):
+                intensity_factor = np.minimum(1.0, intensity * 2)
+                sizes = np.where(active, (sizes * (1 + intensity_factor * 0.5)).astype(np.int32), sizes)
+                # 添加轻微的颜色变化
+                brightened = np.minimum(255, (colors * (1 + intensity_factor * 0.3)[:, None]).astype(np.int32))
+                colors = np.where(active[:, None], brightened, colors)
+            
+            # 绘制粒子
+            for x, y, size, color in zip(screen_x[visible].tolist(), screen_y[visible].tolist(),
+                                         sizes.tolist(), colors.tolist()):
+                if size > 1:
+                    pygame.draw.circle(layer, color, (x, y), size)
+                else:
+                    layer.set_at((x, y), color)
+        
+        self._structured_layer_bounds = layer.get_bounding_rect()
+        self._structured_layer_dirty = False
 
     def _process_audio_data(self, audio_data: np.ndarray):
         """处理音频数据"""
@@ -1172,21 +1595,23 @@ class CanalVisualizer:
             self.audio_energy = 0.0
             self.spectrum_data = np.zeros(128)
 
-    def _render_foreground(self, screen: pygame.Surface):
-        """渲染前景元素"""
+    def _render_foreground(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """渲染前景元素，返回涟漪绘制区域"""
+        rects = []
         try:
             # 渲染水面涟漪
-            if hasattr(self, 'audio_energy') and self.audio_energy > 0.05:
+            if self.quality.ripples and hasattr(self, 'audio_energy') and self.audio_energy > 0.05:
                 ripple_count = int(self.audio_energy * 20)
                 for i in range(ripple_count):
-                    x = np.random.randint(0, self.width)
-                    y = self.water_surface_y + np.random.randint(-5, 15)
-                    radius = np.random.randint(5, 20)
+                    x = np.random.randint(0, self.width) * self.render_scale
+                    y = (self.water_surface_y + np.random.randint(-5, 15)) * self.render_scale
+                    radius = max(1, int(np.random.randint(5, 20) * self.render_scale))
                     
-                    pygame.draw.circle(screen, CanalColors.WATER_FOAM, (x, y), radius, 1)
+                    rects.append(pygame.draw.circle(screen, CanalColors.WATER_FOAM, (x, y), radius, 1))
                     
         except Exception as e:
             print(f"前景渲染错误: {e}")
+        return rects
 
     def get_audio_visualization_data(self) -> Dict:
         """获取音频可视化数据"""
@@ -1254,16 +1679,53 @@ class CanalVisualizer:
                 screen.blit(text_surface, (20, 20))
         return None
 
+def benchmark_render_scale(width: int = 1280, height: int = 720, frames: int = 120,
+                           scales: Sequence[float] = (1.0, 0.75, 0.5)) -> Dict[float, float]:
+    """对比不同离屏渲染比例的单帧渲染耗时，返回{比例: 平均毫秒}"""
+    screen = pygame.display.set_mode((width, height))
+    visualizer = CanalVisualizer(width, height)
+    visualizer.set_overlay_rects([])
+    results = {}
+    
+    for scale in scales:
+        visualizer.set_render_scale(scale)
+        # 预热：构建缩放后的不变图层与烘焙图层
+        for _ in range(5):
+            visualizer.update(np.random.normal(0, 0.1, 1024))
+            visualizer.render(screen)
+        
+        elapsed = 0.0
+        for _ in range(frames):
+            visualizer.update(np.random.normal(0, 0.1, 1024))
+            start = time.perf_counter()
+            visualizer.render(screen)
+            elapsed += time.perf_counter() - start
+        
+        results[scale] = elapsed / frames * 1000
+        render_width, render_height = visualizer._render_size()
+        print(f"渲染比例 {scale:.2f} ({render_width}x{render_height}): "
+              f"{results[scale]:.2f} ms/帧，相对原生 {results[scale] / results[scales[0]]:.2f}x")
+    
+    return results
+
 # 测试代码
 if __name__ == "__main__":
+    import sys
+    
     # 测试运河可视化器
     pygame.init()
     
+    if "--benchmark" in sys.argv:
+        benchmark_render_scale()
+        pygame.quit()
+        sys.exit(0)
+    
     width, height = 1280, 720
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption("运河场景可视化测试 - 粒子点云版本")
     
     visualizer = CanalVisualizer(width, height)
+    visualizer.set_overlay_rects([])  # 无上层覆盖层
     clock = pygame.time.Clock()
     
     print("运河场景可视化测试启动 - 粒子点云效果")
@@ -1281,13 +1743,11 @@ if __name__ == "__main__":
         # 生成测试音频数据
         test_audio = np.random.normal(0, 0.1, 1024) * (1 + np.sin(time.time()) * 0.5)
         
-        # 更新和渲染
+        # 更新和渲染（仅推送脏矩形区域）
         visualizer.update(test_audio)
-        
-        screen.fill(CanalColors.PAPER_WHITE)
         visualizer.render(screen)
         
-        pygame.display.flip()
+        pygame.display.update(visualizer.dirty_rects)
         clock.tick(60)
     
     pygame.quit()
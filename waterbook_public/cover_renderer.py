@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+分级封面渲染器
+先在缩小的画布上快速渲染水墨预览封面（E4阶段即可使用），
+再由渲染后端以完整分辨率重新渲染，完成后原子替换同一路径的封面文件
+"""
+
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from render_backend import CoverJob, RenderBackend, render_cover_job
+
+# 预览画布相对完整分辨率的比例
+PREVIEW_SCALE = 0.4
+
+# 预览渲染的目标耗时（秒），超出时打印提示
+PREVIEW_BUDGET = 0.3
+
+def preview_canvas_size(full_size: Tuple[int, int], scale: float) -> Tuple[int, int]:
+    """预览画布大小"""
+    return max(1, int(full_size[0] * scale)), max(1, int(full_size[1] * scale))
+
+def make_cover_job(params: Any, canvas_size: Tuple[int, int], output_path: Path, scale: float = 1.0,
+                   output_size: Optional[Tuple[int, int]] = None) -> CoverJob:
+    """由艺术参数构造封面任务，像素相关的参数（笔触粗细、模糊）按画布比例缩放，参数带有seed时一并传入"""
+    return CoverJob(
+        text=params.content_text,
+        style=params.style,
+        brush_thickness=params.brush_thickness * scale,
+        ink_density=params.ink_density,
+        flywhite_intensity=params.flywhite_intensity,
+        ink_blur=params.ink_blur * scale,
+        ink_spread=params.ink_spread,
+        canvas_size=tuple(canvas_size),
+        output_path=str(output_path),
+        output_size=tuple(output_size) if output_size else None,
+        seed=getattr(params, 'seed', None)
+    )
+
+class TieredCoverRenderer:
+    """分级封面渲染器 - 先出预览，再细化为完整分辨率（渲染均在渲染后端执行）"""
+
+    def __init__(self, backend: RenderBackend, full_size: Tuple[int, int],
+                 output_dir: Path = Path("output"), preview_scale: float = PREVIEW_SCALE):
+        self.backend = backend
+        self.full_size = tuple(full_size)
+        self.output_dir = Path(output_dir)
+        self.preview_scale = preview_scale
+        self.preview_size = preview_canvas_size(self.full_size, preview_scale)
+
+        self._lock = threading.Lock()
+        self._refinements: Dict[str, Future] = {}
+
+    def _new_cover_path(self, suffix: str = "") -> Path:
+        self.output_dir.mkdir(exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return self.output_dir / f"cover_{timestamp}{suffix}.png"
+
+    def render(self, params: Any, backend: Optional[RenderBackend] = None) -> str:
+        """渲染预览封面并提交完整分辨率细化，返回封面路径（细化完成后同一路径内容被替换）
+
+        backend可传入渲染任务分组（RenderTaskGroup），以便整体取消；默认使用渲染器自身的后端。
+        """
+        backend = backend or self.backend
+        filepath = self._new_cover_path()
+
+        # 预览走优先通道，不排在细化、预渲染与视频任务之后；放大到完整尺寸保存，细化前后封面尺寸一致
+        start = time.perf_counter()
+        backend.submit_preview(render_cover_job, make_cover_job(
+            params, self.preview_size, filepath, self.preview_scale, output_size=self.full_size
+        )).result()
+
+        elapsed = time.perf_counter() - start
+        if elapsed > PREVIEW_BUDGET:
+            print(f"预览封面渲染超出预算: {elapsed * 1000:.0f} ms")
+        print(f"预览封面渲染完成: {filepath} ({elapsed * 1000:.0f} ms)")
+
+        # 任务在提交时复制参数，后续修改不影响细化结果
+        future = backend.submit(render_cover_job, make_cover_job(params, self.full_size, filepath))
+        future.add_done_callback(self._report_refinement)
+        with self._lock:
+            self._refinements[str(filepath)] = future
+        return str(filepath)
+
+    def render_full(self, params: Any, backend: Optional[RenderBackend] = None) -> str:
+        """直接渲染完整分辨率封面并返回路径（阻塞等待，供后台预渲染使用）"""
+        filepath = self._new_cover_path(f"_{params.style}")
+        return (backend or self.backend).submit(render_cover_job, make_cover_job(params, self.full_size, filepath)).result()
+
+    @staticmethod
+    def _report_refinement(future: Future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"完整封面渲染失败，保留预览封面: {future.exception()}")
+        else:
+            print(f"完整封面渲染完成: {future.result()}")
+
+    def _get_refinement(self, cover_path: str) -> Optional[Future]:
+        with self._lock:
+            return self._refinements.get(str(cover_path))
+
+    def is_refined(self, cover_path: str) -> bool:
+        """检查封面是否已细化为完整分辨率"""
+        future = self._get_refinement(cover_path)
+        return (future is not None and future.done() and not future.cancelled()
+                and future.exception() is None)
+
+    def wait_refined(self, cover_path: str, timeout: Optional[float] = None) -> bool:
+        """等待封面细化完成，超时或失败返回False"""
+        future = self._get_refinement(cover_path)
+        if future is None:
+            return False
+        try:
+            future.result(timeout=timeout)
+            return True
+        except FutureTimeoutError:
+            return False
+        except Exception:
+            return False
+
+    def on_refined(self, cover_path: str, callback: Callable[[str], None]):
+        """封面细化成功后回调（已完成时立即回调）"""
+        future = self._get_refinement(cover_path)
+        if future is None:
+            return
+
+        def _notify(done: Future):
+            if not done.cancelled() and done.exception() is None:
+                try:
+                    callback(str(cover_path))
+                except Exception as e:
+                    print(f"封面细化回调错误: {e}")
+
+        future.add_done_callback(_notify)
+
+    def cancel_pending(self):
+        """取消尚未开始的细化任务（访客重置时调用）"""
+        with self._lock:
+            for future in self._refinements.values():
+                future.cancel()
+            self._refinements.clear()
+
+if __name__ == "__main__":
+    from types import SimpleNamespace
+    from ink_wash_pygame import DEFAULT_CANVAS_SIZE
+    from render_backend import create_render_backend
+
+    backend = create_render_backend({'render_backend': 'process'}, canvas_sizes=(DEFAULT_CANVAS_SIZE,))
+    renderer = TieredCoverRenderer(backend, DEFAULT_CANVAS_SIZE)
+    for style in ["行书", "篆书", "水墨晕染"]:
+        params = SimpleNamespace(content_text="水", style=style, brush_thickness=0.6, ink_density=0.8,
+                                 flywhite_intensity=0.4, ink_blur=0.3, ink_spread=0.2)
+        path = renderer.render(params)
+        start = time.perf_counter()
+        refined = renderer.wait_refined(path)
+        print(f"{style}: 细化{'成功' if refined else '失败'}，等待 {(time.perf_counter() - start) * 1000:.0f} ms")
+    backend.shutdown()
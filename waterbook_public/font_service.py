@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+字体服务
+全进程只解析一次字体文件，并生成只包含本项目用到的字形（词表、运河词汇与界面文字）的子集字体，
+缓存到磁盘后供PIL与pygame共享使用：CJK字体从数MB缩减到数百KB，加载更快、常驻内存更少。
+pygame字体句柄经text_cache的字体注册表共享，PIL字体句柄按线程、按字号缓存（FreeTypeFont不可跨线程共享）。
+新增界面文字时需同步加入assets/ui_strings.json，否则子集中缺少对应字形。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+# 字体子集缓存格式版本（子集参数变化时递增）
+FONT_SUBSET_FORMAT_VERSION = 1
+
+# 默认缓存目录
+DEFAULT_FONT_CACHE_DIR = Path(__file__).parent / "cache" / "fonts"
+
+# 字体候选（按优先顺序）
+FONT_CANDIDATES = [
+    "墨趣古风体.ttf",
+    "assets/fonts/墨趣古风体.ttf",
+    "assets/fonts/NotoSansCJK-Regular.ttc",
+    "assets/fonts/Songti.ttc",
+    "assets/fonts/SourceHanSansSC-Regular.otf",
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Light.ttc",
+    "assets/fonts/NotoSansSC-Regular.otf",
+    "assets/fonts/SimSun.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc"
+]
+
+# 子集字符来源：词表与界面文字、运河词汇清单（取其中全部字符）
+CHARSET_SOURCES = [
+    "assets/words.json",
+    "assets/ui_strings.json",
+]
+
+# 始终包含的字符：可打印ASCII与常用中文标点
+BASE_CHARSET = "".join(chr(code) for code in range(0x20, 0x7F)) + "，。！？、；：「」『』（）《》…—·“”‘’％"
+
+def _resolve_path(path: str) -> Path:
+    """相对路径先按当前目录，再按本模块所在目录解析"""
+    candidate = Path(path)
+    if candidate.is_absolute() or candidate.exists():
+        return candidate
+    return Path(__file__).parent / candidate
+
+def collect_charset(sources: Iterable[str] = CHARSET_SOURCES) -> str:
+    """收集子集需要包含的字符"""
+    chars = set(BASE_CHARSET)
+    for source in sources:
+        path = _resolve_path(source)
+        try:
+            chars.update(path.read_text(encoding='utf-8'))
+        except Exception as e:
+            print(f"字符集来源读取失败 {source}: {e}")
+    return "".join(sorted(char for char in chars if char.isprintable()))
+
+def build_subset(source_path: Path, output_path: Path, charset: str) -> bool:
+    """用fontTools生成子集字体（TTC取第一个字体），先写临时文件再替换"""
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        print("fontTools不可用，使用完整字体")
+        return False
+
+    try:
+        font_number = 0 if source_path.suffix.lower() in ('.ttc', '.otc') else -1
+        font = TTFont(str(source_path), fontNumber=font_number, lazy=True)
+
+        options = subset.Options()
+        options.name_IDs = ['*']
+        options.notdef_outline = True
+        # 保留hinting，子集字形的光栅化结果与完整字体一致
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(text=charset)
+        subsetter.subset(font)
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = output_path.with_name(f"{output_path.stem}.{os.getpid()}.tmp")
+        font.save(str(temp_path))
+        font.close()
+        os.replace(temp_path, output_path)
+        return True
+    except Exception as e:
+        print(f"字体子集生成失败 {source_path}: {e}")
+        return False
+
+class FontService:
+    """字体服务 - 解析字体、生成并缓存子集、分发共享的PIL/pygame字体句柄"""
+
+    def __init__(self, candidates: Iterable[str] = FONT_CANDIDATES, cache_dir: Optional[Path] = None,
+                 use_subset: bool = True):
+        self.candidates: List[str] = list(candidates)
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_FONT_CACHE_DIR
+        self.use_subset = use_subset
+
+        self._lock = threading.Lock()
+        self._resolved = False
+        self._source_path: Optional[Path] = None
+        self._font_path: Optional[str] = None
+        # PIL字体按线程缓存：{字号: FreeTypeFont}
+        self._local = threading.local()
+
+    def _find_source(self) -> Optional[Path]:
+        for candidate in self.candidates:
+            path = _resolve_path(candidate)
+            # 排除占位用的空文件
+            if path.is_file() and path.stat().st_size > 1024:
+                return path
+        return None
+
+    def _subset_path(self, source_path: Path, charset: str) -> Path:
+        stat = source_path.stat()
+        payload = json.dumps([str(source_path.resolve()), stat.st_size, int(stat.st_mtime),
+                              hashlib.sha1(charset.encode('utf-8')).hexdigest(), FONT_SUBSET_FORMAT_VERSION])
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        # FreeType按内容识别字体格式，扩展名仅作区分
+        suffix = ".otf" if source_path.suffix.lower() in ('.otf', '.ttc', '.otc') else ".ttf"
+        return self.cache_dir / f"subset_{source_path.stem}_{digest}{suffix}"
+    
+    def _prune_subsets(self, keep: Path):
+        """删除字符集或字体变化后遗留的旧子集（进行中的临时文件不删除）"""
+        for path in self.cache_dir.glob("subset_*"):
+            if path != keep and path.suffix != ".tmp":
+                try:
+                    path.unlink()
+                    print(f"已删除过期的字体子集: {path.name}")
+                except OSError:
+                    pass
+
+    def font_path(self) -> Optional[str]:
+        """字体文件路径（子集或原字体），没有可用字体时返回None"""
+        if self._resolved:
+            return self._font_path
+
+        with self._lock:
+            if self._resolved:
+                return self._font_path
+
+            start = time.perf_counter()
+            self._source_path = self._find_source()
+            if self._source_path is None:
+                print("未找到可用的中文字体，使用默认字体")
+            elif self.use_subset:
+                charset = collect_charset()
+                subset_path = self._subset_path(self._source_path, charset)
+                if subset_path.exists() or build_subset(self._source_path, subset_path, charset):
+                    self._font_path = str(subset_path)
+                    self._prune_subsets(subset_path)
+                else:
+                    self._font_path = str(self._source_path)
+            else:
+                self._font_path = str(self._source_path)
+
+            if self._font_path is not None:
+                size_kb = Path(self._font_path).stat().st_size / 1024
+                print(f"字体服务就绪: {self._font_path} ({size_kb:.0f} KB, "
+                      f"{(time.perf_counter() - start) * 1000:.0f} ms)")
+            self._resolved = True
+        return self._font_path
+
+    @property
+    def source_path(self) -> Optional[str]:
+        """原字体文件路径"""
+        self.font_path()
+        return str(self._source_path) if self._source_path is not None else None
+
+    def pygame_font(self, size: int):
+        """获取共享的pygame字体（经text_cache字体注册表，失败时为pygame默认字体）"""
+        from text_cache import get_font
+        return get_font(self.font_path(), size)
+
+    def pil_font(self, size: int):
+        """获取本线程的PIL字体，没有可用字体时返回PIL默认字体"""
+        fonts = getattr(self._local, 'pil_fonts', None)
+        if fonts is None:
+            fonts = self._local.pil_fonts = {}
+        font = fonts.get(size)
+        if font is not None:
+            return font
+
+        from PIL import ImageFont
+        path = self.font_path()
+        try:
+            font = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+        except Exception as e:
+            print(f"PIL字体加载失败 {path} ({size}): {e}")
+            font = ImageFont.load_default()
+        fonts[size] = font
+        return font
+
+# 全局实例
+_service: Optional[FontService] = None
+_service_lock = threading.Lock()
+
+def get_font_service() -> FontService:
+    """获取全进程共享的字体服务"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = FontService()
+    return _service
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    charset = collect_charset()
+    print(f"子集字符数: {len(charset)}")
+
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        full = FontService(cache_dir=temp_dir, use_subset=False)
+        subsetted = FontService(cache_dir=temp_dir)
+        for label, service in (("完整字体", full), ("子集字体(首次)", subsetted),
+                               ("子集字体(缓存)", FontService(cache_dir=temp_dir))):
+            start = time.perf_counter()
+            path = service.font_path()
+            for size in (24, 32, 48, 72, 100, 150, 200):
+                service.pil_font(size)
+            elapsed = (time.perf_counter() - start) * 1000
+            size_kb = Path(path).stat().st_size / 1024 if path else 0
+            print(f"{label}: {path} {size_kb:.0f} KB，解析并加载7个字号 {elapsed:.0f} ms")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
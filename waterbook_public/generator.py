@@ -5,12 +5,14 @@
 支持行书、篆书、水墨晕染三种风格
 """
 
+import dataclasses
 import json
 import numpy as np
 import threading
 import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 from datetime import datetime
@@ -25,7 +27,15 @@ except ImportError:
     HAS_MOVIEPY = False
 
 from audio_rec import AudioFeatures
+from art_cache import (ArtworkCache, COVER_FILE, DEFAULT_QUANTUM, FINAL_LAYER_FILE, animation_file,
+                       copy_from_cache, quantize_parameters)
 from ink_wash_pygame import InkWashRenderer
+from cover_renderer import TieredCoverRenderer, PREVIEW_SCALE, preview_canvas_size, make_cover_job
+from render_backend import RenderBackend, RenderTaskGroup, create_render_backend, render_video_job, VideoJob
+from video_encoder import ANIMATION_FORMATS, EncoderSettings, ffmpeg_available
+
+# E4可选的水墨风格
+ART_STYLES = ("行书", "篆书", "水墨晕染")
 
 @dataclass
 class ArtParameters:
@@ -59,6 +69,9 @@ class ArtParameters:
     boat_influence: float     # 船只影响 (0-1)
     bird_influence: float     # 鸟鸣影响 (0-1)
     wind_influence: float     # 风声影响 (0-1)
+    
+    # 渲染随机种子（由作品缓存键派生，同一缓存键的渲染结果一致）
+    seed: Optional[int] = None
 
 @dataclass
 class GeneratedArt:
@@ -72,6 +85,9 @@ class GeneratedArt:
     # 音频相关
     audio_file_path: Optional[str] = None
     audio_features: Optional[AudioFeatures] = None
+    
+    # 同一动画的各格式文件 {格式: 路径}（animation_video_path为其中首选格式）
+    animation_variants: Dict[str, str] = field(default_factory=dict)
 
 class ArtGenerator:
     """水上书艺术生成器"""
@@ -90,6 +106,42 @@ class ArtGenerator:
         # 初始化水墨渲染器
         self.ink_renderer = InkWashRenderer()
         
+        # 渲染后端：默认在预热的工作进程中渲染，工作进程从宣纸服务的磁盘缓存载入纹理
+        full_size = self.ink_renderer.canvas_size
+        preview_scale = config.get('cover_preview_scale', PREVIEW_SCALE)
+        self.render_backend = create_render_backend(
+            config, canvas_sizes=(full_size, preview_canvas_size(full_size, preview_scale))
+        )
+        
+        # 分级封面渲染：先出预览，再细化为完整分辨率
+        self.cover_renderer = TieredCoverRenderer(self.render_backend, full_size, preview_scale=preview_scale)
+        
+        # 作品内容寻址缓存：量化后参数、风格与文字相同的作品直接复用已渲染的文件
+        self.art_cache: Optional[ArtworkCache] = None
+        if config.get('art_cache', True):
+            try:
+                self.art_cache = ArtworkCache(
+                    config.get('art_cache_dir', 'output/art_cache'),
+                    max_bytes=int(config.get('art_cache_mb', 512)) * 1024 * 1024,
+                    quantum=float(config.get('art_cache_quantum', DEFAULT_QUANTUM))
+                )
+            except Exception as e:
+                print(f"作品缓存初始化失败: {e}")
+        
+        # 风格预渲染：音频特征就绪后在后台渲染全部风格，访客确认时直接取用
+        self._speculation_executor = ThreadPoolExecutor(
+            max_workers=config.get('speculative_workers', 2), thread_name_prefix="art-speculate"
+        )
+        self._speculation_lock = threading.Lock()
+        self._speculation_features: Optional[AudioFeatures] = None
+        self._speculation_params: Optional[ArtParameters] = None
+        self._speculative_futures: Dict[str, Future] = {}
+        # 各风格的渲染任务分组（取消时一并取消后端中排队的任务）与封面结果（E3直接复用首选风格的封面）
+        self._speculative_groups: Dict[str, RenderTaskGroup] = {}
+        self._speculative_covers: Dict[str, Future] = {}
+        # 预渲染线程中的作品缓存查找：先记下，访客选定该风格时再计入命中统计
+        self._deferred_lookups = threading.local()
+        
         # 运河主题词汇
         self.canal_words = [
             "水", "流", "波", "浪", "涛", "潮", "涌", "溅",
@@ -150,6 +202,9 @@ class ArtGenerator:
         self.generation_complete = False
         self.generation_progress = 0.0
         
+        # 特征已就绪，先开始预渲染全部风格，生成线程直接复用其中首选风格的封面
+        self.start_speculative_rendering(audio_features)
+        
         # 启动生成线程
         self.generation_thread = threading.Thread(
             target=self._generate_art_async,
@@ -160,29 +215,195 @@ class ArtGenerator:
         
         print("开始生成艺术作品...")
     
+    def start_speculative_rendering(self, audio_features: AudioFeatures, selected_style: str = ART_STYLES[0]):
+        """在后台渲染全部风格的作品，已选风格优先；同一批特征只启动一次"""
+        with self._speculation_lock:
+            if self._speculation_features is audio_features:
+                return
+            self._cancel_speculation_locked()
+            
+            # 各风格共用同一组基础参数与文字内容，只在风格调整上不同
+            base_params = self._map_audio_to_art_parameters_fast(audio_features)
+            base_params.content_text = self._generate_content_text_fast(audio_features, base_params)
+            
+            self._speculation_features = audio_features
+            self._speculation_params = base_params
+            self._schedule_speculation_locked(selected_style)
+        
+        print(f"开始预渲染全部风格，优先: {selected_style}")
+    
+    def prioritize_style(self, selected_style: str):
+        """访客切换风格时调用：新选风格排到队首，其他尚未开始的风格排在其后"""
+        with self._speculation_lock:
+            if self._speculation_features is not None:
+                self._schedule_speculation_locked(selected_style)
+    
+    def _schedule_speculation_locked(self, selected_style: str):
+        """按优先顺序（重新）提交尚未开始的风格任务"""
+        order = [selected_style] + [style for style in ART_STYLES if style != selected_style]
+        for style in order:
+            future = self._speculative_futures.get(style)
+            if future is not None:
+                if future.running() or future.done():
+                    continue
+                # 线程池队列按提交顺序执行：取消后重新提交以调整顺序（取消失败说明已开始执行）
+                if not future.cancel():
+                    continue
+            group = self._speculative_groups.setdefault(style, RenderTaskGroup(self.render_backend))
+            cover = self._speculative_covers.setdefault(style, Future())
+            self._speculative_futures[style] = self._speculation_executor.submit(
+                self._render_style_variant, self._speculation_params, style, self._speculation_features,
+                group, cover
+            )
+    
+    def _cancel_speculation_locked(self, keep: Optional[str] = None):
+        """取消全部（keep以外）风格的预渲染，包括已提交到渲染后端、尚未开始的任务"""
+        for style, future in self._speculative_futures.items():
+            if style != keep:
+                future.cancel()
+        for style, group in self._speculative_groups.items():
+            if style != keep:
+                group.cancel()
+        for style, cover in self._speculative_covers.items():
+            if style != keep:
+                cover.cancel()
+        self._speculative_futures = {}
+        self._speculative_groups = {}
+        self._speculative_covers = {}
+        self._speculation_features = None
+        self._speculation_params = None
+    
+    def cancel_speculation(self):
+        """取消全部尚未开始的预渲染任务"""
+        with self._speculation_lock:
+            self._cancel_speculation_locked()
+    
+    def _render_style_variant(self, base_params: ArtParameters, style: str, audio_features: AudioFeatures,
+                              group: RenderTaskGroup, cover: Future) -> Tuple[GeneratedArt, list]:
+        """渲染单个风格的完整作品（在预渲染线程中执行），封面完成后先通过cover发布(参数, 封面路径)
+        
+        返回(作品, 缓存查找记录)，查找记录为[(是否命中, 字节数)]，访客选定该风格时计入缓存统计
+        """
+        if not cover.set_running_or_notify_cancel():
+            raise CancelledError()
+        
+        start = time.perf_counter()
+        self._deferred_lookups.log = lookups = []
+        try:
+            try:
+                params = dataclasses.replace(base_params, style=style)
+                self._adjust_parameters_for_style_fast(params, style)
+                self._quantize_for_cache(params)
+                
+                if style == ART_STYLES[0]:
+                    # 首选风格即E3展示的封面：先出预览再细化，生成线程无需等待完整分辨率
+                    cover_path = self._render_cover_image_tiered(params, group)
+                    if group.cancelled:
+                        # 分组已取消时退回的占位封面不应被复用
+                        raise CancelledError()
+                else:
+                    cover_path = self._cached_cover(params)
+                    if cover_path is None:
+                        cover_path = self.cover_renderer.render_full(params, group)
+                        self._store_cover(params, cover_path)
+            except BaseException as e:
+                cover.set_exception(e)
+                raise
+            cover.set_result((params, cover_path))
+            
+            video_path, variants = self._render_animation_video(params, group)
+        finally:
+            self._deferred_lookups.log = None
+        metadata = self._generate_metadata_fast(params, audio_features)
+        metadata["speculative"] = True
+        
+        print(f"风格预渲染完成: {style} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+        return GeneratedArt(
+            parameters=params,
+            cover_image_path=cover_path,
+            animation_video_path=video_path,
+            metadata=metadata,
+            creation_time=datetime.now(),
+            audio_features=audio_features,
+            animation_variants=variants
+        ), lookups
+    
+    def _take_speculative_art(self, audio_features: AudioFeatures, selected_style: str) -> Optional[GeneratedArt]:
+        """取出已选风格的预渲染作品；尚未开始渲染时返回None，由调用方走常规路径"""
+        with self._speculation_lock:
+            future = None
+            if self._speculation_features is audio_features:
+                future = self._speculative_futures.get(selected_style)
+                if future is not None and not (future.running() or future.done()):
+                    future = None
+            # 落选风格不再需要，其在渲染后端排队的任务一并取消
+            self._cancel_speculation_locked(keep=selected_style if future is not None else None)
+        
+        if future is None or future.cancelled():
+            return None
+        
+        try:
+            generated_art, lookups = future.result()
+            # 该风格的缓存查找此时才算作访客的查找
+            if self.art_cache is not None:
+                for hit, size in lookups:
+                    self.art_cache.count_lookup(hit, size)
+            print(f"使用预渲染作品: {selected_style}")
+            return generated_art
+        except Exception as e:
+            print(f"预渲染作品不可用: {e}")
+            return None
+    
+    def _take_speculative_cover(self, audio_features: AudioFeatures,
+                                style: str) -> Optional[Tuple[ArtParameters, str]]:
+        """等待并取出预渲染中该风格的(参数, 封面路径)；没有对应的预渲染或渲染失败时返回None"""
+        with self._speculation_lock:
+            cover = None
+            if self._speculation_features is audio_features:
+                cover = self._speculative_covers.get(style)
+        
+        if cover is None:
+            return None
+        try:
+            params, cover_path = cover.result()
+            return dataclasses.replace(params), cover_path
+        except CancelledError:
+            return None
+        except Exception as e:
+            print(f"预渲染封面不可用: {e}")
+            return None
+    
     def _generate_art_async(self, audio_features: AudioFeatures):
         """异步生成艺术作品（高度优化版本）"""
         try:
             print("开始异步生成艺术作品...")
             
-            # 步骤1: 快速分析音频特征 (20%)
-            print("步骤1: 分析音频特征...")
-            self.generation_progress = 0.2
-            art_params = self._map_audio_to_art_parameters_fast(audio_features)
-            print(f"音频特征分析完成，生成参数: {art_params.style}")
-            
-            # 步骤2: 快速生成文字内容 (40%)
-            print("步骤2: 生成文字内容...")
-            self.generation_progress = 0.4
-            content_text = self._generate_content_text_fast(audio_features, art_params)
-            art_params.content_text = content_text
-            print(f"文字内容生成完成: {content_text}")
-            
-            # 步骤3: 超快速渲染封面图像 (70%)
-            print("步骤3: 渲染封面图像...")
-            self.generation_progress = 0.7
-            cover_path = self._render_cover_image_ultra_fast(art_params)
-            print(f"封面图像渲染完成: {cover_path}")
+            # 首选风格的封面由预渲染线程渲染，这里直接复用，不再重复渲染
+            speculative = self._take_speculative_cover(audio_features, ART_STYLES[0])
+            if speculative is not None:
+                art_params, cover_path = speculative
+                self.generation_progress = 0.7
+                print(f"复用预渲染封面: {cover_path}")
+            else:
+                # 步骤1: 快速分析音频特征 (20%)
+                print("步骤1: 分析音频特征...")
+                self.generation_progress = 0.2
+                art_params = self._map_audio_to_art_parameters_fast(audio_features)
+                print(f"音频特征分析完成，生成参数: {art_params.style}")
+                
+                # 步骤2: 快速生成文字内容 (40%)
+                print("步骤2: 生成文字内容...")
+                self.generation_progress = 0.4
+                content_text = self._generate_content_text_fast(audio_features, art_params)
+                art_params.content_text = content_text
+                self._quantize_for_cache(art_params)
+                print(f"文字内容生成完成: {content_text}")
+                
+                # 步骤3: 渲染预览封面，完整分辨率在后台细化 (70%)
+                print("步骤3: 渲染封面图像...")
+                self.generation_progress = 0.7
+                cover_path = self._render_cover_image_tiered(art_params)
+                print(f"封面图像渲染完成: {cover_path}")
             
             # 步骤4: 跳过视频生成或使用极简版本 (90%)
             print("步骤4: 生成动画视频...")
@@ -307,6 +528,66 @@ class ArtGenerator:
         else:
             return "静"
 
+    def _quantize_for_cache(self, params: ArtParameters):
+        """渲染前将参数吸附到缓存量化网格，使相近的录音得到相同的缓存键；渲染种子由缓存键派生"""
+        if self.art_cache is not None:
+            quantize_parameters(params, self.art_cache.quantum)
+            params.seed = int(self._cache_key(params)[:8], 16)
+    
+    def _cache_key(self, params: ArtParameters) -> Optional[str]:
+        if self.art_cache is None:
+            return None
+        return self.art_cache.key_for(params, self.ink_renderer.canvas_size)
+    
+    def _cache_get(self, key: str, name: str) -> Optional[Path]:
+        """查找作品缓存文件；预渲染线程中的查找先记下，不直接计入命中统计"""
+        deferred = getattr(self._deferred_lookups, 'log', None)
+        cached = self.art_cache.get(key, name, count=deferred is None)
+        if deferred is not None:
+            try:
+                size = cached.stat().st_size if cached is not None else 0
+            except OSError:
+                size = 0
+            deferred.append((cached is not None, size))
+        return cached
+    
+    def _cached_cover(self, params: ArtParameters) -> Optional[str]:
+        """从作品缓存取出完整分辨率封面，未命中返回None"""
+        key = self._cache_key(params)
+        cached = self._cache_get(key, COVER_FILE) if key else None
+        if cached is None:
+            return None
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        cover_path = copy_from_cache(cached, Path("output") / f"cover_{timestamp}_{params.style}.png")
+        print(f"作品缓存命中（封面）: {cover_path}")
+        return cover_path
+    
+    def _store_cover(self, params: ArtParameters, cover_path: str):
+        """将完整分辨率封面存入作品缓存"""
+        key = self._cache_key(params)
+        if key is not None:
+            self.art_cache.put(key, COVER_FILE, cover_path)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取作品缓存统计信息（命中率、节省字节数等）"""
+        return self.art_cache.get_stats() if self.art_cache is not None else {}
+    
+    def _render_cover_image_tiered(self, params: ArtParameters, backend: Optional[RenderBackend] = None) -> str:
+        """分级渲染水墨封面，失败时退回超快速封面"""
+        cover_path = self._cached_cover(params)
+        if cover_path is not None:
+            return cover_path
+        
+        try:
+            cover_path = self.cover_renderer.render(params, backend)
+            # 预览封面不入缓存，细化完成后再存入完整分辨率封面
+            if self.art_cache is not None:
+                self.cover_renderer.on_refined(cover_path, lambda refined: self._store_cover(params, refined))
+            return cover_path
+        except Exception as e:
+            print(f"分级封面渲染失败: {e}")
+            return self._render_cover_image_ultra_fast(params)
+    
     def _render_cover_image_ultra_fast(self, params: ArtParameters) -> str:
         """超快速渲染封面图像"""
         try:
@@ -349,13 +630,78 @@ class ArtGenerator:
             print(f"超快速封面渲染失败: {e}")
             return self._create_placeholder_cover()
 
+    def _animation_formats(self) -> List[str]:
+        """生成阶段直接编码的动画格式（generation.animation_formats，首项为首选格式）"""
+        formats = [name for name in self.config.get('animation_formats', ['mp4']) if name in ANIMATION_FORMATS]
+        return formats or ['mp4']
+    
+    def _render_animation_video(self, params: ArtParameters,
+                                backend: Optional[RenderBackend] = None) -> Tuple[str, Dict[str, str]]:
+        """在渲染后端逐帧流式编码书写动画（一次生成画面，同时编码所有配置的格式）
+        
+        返回(首选格式路径, {格式: 路径})；ffmpeg不可用或编码失败时退回静态图像
+        """
+        if not ffmpeg_available():
+            return self._render_animation_video_minimal(params), {}
+        
+        try:
+            start = time.perf_counter()
+            formats = self._animation_formats()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            filepath = (Path("output") / f"animation_{timestamp}_{params.style}").with_suffix(
+                ANIMATION_FORMATS[formats[0]].extension)
+            
+            # 先从作品缓存取已有格式，只渲染缺少的格式
+            key = self._cache_key(params)
+            variants: Dict[str, str] = {}
+            missing = []
+            for name in formats:
+                extension = ANIMATION_FORMATS[name].extension
+                cached = self._cache_get(key, animation_file(extension)) if key else None
+                if cached is not None:
+                    variants[name] = copy_from_cache(cached, filepath.with_suffix(extension))
+                else:
+                    missing.append(name)
+            
+            if missing:
+                # 缓存中有完成态基础图层时工作进程直接读取，跳过书法渲染；否则渲染后写入缓存
+                final_layer_path = None
+                if key is not None:
+                    if self._cache_get(key, FINAL_LAYER_FILE) is not None:
+                        print("作品缓存命中（动画基础图层）")
+                    final_layer_path = str(self.art_cache.path_for(key, FINAL_LAYER_FILE))
+                
+                job = VideoJob(
+                    cover=make_cover_job(params, self.ink_renderer.canvas_size, filepath),
+                    fps=int(self.config.get('video_fps', 24)),
+                    duration=float(self.config.get('video_duration', 7)),
+                    settings=tuple(EncoderSettings.from_config(self.config, name) for name in missing),
+                    final_layer_path=final_layer_path
+                )
+                rendered = (backend or self.render_backend).submit(render_video_job, job).result()
+                if key is not None:
+                    self.art_cache.record(key, FINAL_LAYER_FILE)
+                    for name, path in rendered.items():
+                        self.art_cache.put(key, animation_file(ANIMATION_FORMATS[name].extension), path)
+                variants.update(rendered)
+                print(f"动画编码完成: {', '.join(rendered.values())} ({time.perf_counter() - start:.1f} 秒)")
+            else:
+                print(f"作品缓存命中（动画）: {', '.join(variants.values())}")
+            
+            variants = {name: variants[name] for name in formats}
+            return variants[formats[0]], variants
+            
+        except Exception as e:
+            print(f"动画视频编码失败: {e}")
+            return self._render_animation_video_minimal(params), {}
+    
     def _render_animation_video_minimal(self, params: ArtParameters) -> str:
         """极简动画视频生成"""
         try:
             # 直接返回静态图像作为"视频"，避免复杂的视频生成
             print("使用静态图像代替视频生成...")
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")  # 预渲染线程可能同一秒内生成多个
             filename = f"animation_{timestamp}.png"  # 使用PNG而不是MP4
             filepath = Path("output") / filename
             filepath.parent.mkdir(exist_ok=True)
@@ -403,6 +749,11 @@ class ArtGenerator:
         try:
             print(f"开始生成最终艺术作品，风格: {selected_style}")
             
+            # 优先使用E3/E4期间预渲染好的作品
+            generated_art = self._take_speculative_art(audio_features, selected_style)
+            if generated_art is not None:
+                return generated_art
+            
             # 使用快速映射方法
             art_params = self._map_audio_to_art_parameters_fast(audio_features)
             art_params.style = selected_style
@@ -413,10 +764,11 @@ class ArtGenerator:
             # 快速生成文字内容
             content_text = self._generate_content_text_fast(audio_features, art_params)
             art_params.content_text = content_text
+            self._quantize_for_cache(art_params)
             
-            # 使用优化的渲染方法
-            cover_path = self._render_cover_image_ultra_fast(art_params)
-            video_path = self._render_animation_video_minimal(art_params)
+            # 预览封面同步生成，完整分辨率在后台细化（E5展示期间完成后替换同一文件）
+            cover_path = self._render_cover_image_tiered(art_params)
+            video_path, variants = self._render_animation_video(art_params)
             
             # 快速生成元数据
             metadata = self._generate_metadata_fast(art_params, audio_features)
@@ -428,7 +780,8 @@ class ArtGenerator:
                 animation_video_path=video_path,
                 metadata=metadata,
                 creation_time=datetime.now(),
-                audio_features=audio_features
+                audio_features=audio_features,
+                animation_variants=variants
             )
             
         except Exception as e:
@@ -448,6 +801,15 @@ class ArtGenerator:
             params.ink_blur = min(params.ink_blur + 0.2, 1.0)  # 增加模糊
         # 行书保持默认参数
     
+    def shutdown(self):
+        """停止预渲染线程与渲染后端"""
+        self.cancel_speculation()
+        self.cover_renderer.cancel_pending()
+        self._speculation_executor.shutdown(wait=False)
+        self.render_backend.shutdown()
+        if self.art_cache is not None:
+            print(f"作品缓存统计: {self.art_cache.get_stats()}")
+    
     def is_generation_complete(self) -> bool:
         """检查生成是否完成 - 添加线程安全检查"""
         # 检查生成标志
@@ -474,6 +836,10 @@ class ArtGenerator:
         self.generation_progress = 0.0
         self.generated_art = None
         
+        # 取消尚未开始的封面细化与风格预渲染
+        self.cover_renderer.cancel_pending()
+        self.cancel_speculation()
+        
         # 清理临时文件
         self._cleanup_temp_files()
     
@@ -499,13 +865,14 @@ class ArtGenerator:
                         old_file.unlink()
                         print(f"删除旧文件: {old_file}")
                 
-                # 获取所有视频文件
-                video_files = list(output_dir.glob("animation_*.mp4"))
-                if len(video_files) > 5:
-                    video_files.sort(key=lambda x: x.stat().st_mtime)
-                    for old_file in video_files[:-5]:
-                        old_file.unlink()
-                        print(f"删除旧文件: {old_file}")
+                # 获取所有视频/动图文件（每种格式各保留最新的5个）
+                for animation_format in ANIMATION_FORMATS.values():
+                    video_files = list(output_dir.glob(f"animation_*{animation_format.extension}"))
+                    if len(video_files) > 5:
+                        video_files.sort(key=lambda x: x.stat().st_mtime)
+                        for old_file in video_files[:-5]:
+                            old_file.unlink()
+                            print(f"删除旧文件: {old_file}")
                         
         except Exception as e:
             print(f"清理临时文件时出错: {e}")
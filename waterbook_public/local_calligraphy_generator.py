@@ -17,9 +17,20 @@ import threading
 from pathlib import Path
 
 from canal_visualizer import CanalColors
+from font_service import get_font_service
+from quality_settings import QualitySettings, DEFAULT_QUALITY, scaled_count
+from text_cache import render_text
+from paper_texture import CALLIGRAPHY_PAPER, get_paper_service
 from audio_rec import AudioFeatures
 from generator import ArtParameters
 
+# 笔画书写动画时长（秒），书写完成后栅格化到墨迹累积画布
+STROKE_DRAW_DURATION = 0.6
+
+# 墨迹累积画布淡出：每隔固定间隔对整张画布做一次alpha乘法
+INK_FADE_INTERVAL = 0.1         # 秒
+INK_FADE_TIME_CONSTANT = 1.5    # 秒，alpha按exp(-t/τ)衰减
+
 @dataclass
 class CalligraphyStroke:
     """书法笔画数据类"""
@@ -30,6 +41,7 @@ class CalligraphyStroke:
     style: str  # 'flowing', 'bold', 'delicate'
     created_time: float
     duration: float
+    baked: bool = False  # 是否已栅格化到累积画布
 
 class LocalCalligraphyGenerator:
     """本地书法艺术生成器"""
@@ -78,37 +90,42 @@ class LocalCalligraphyGenerator:
         self.generation_interval = 2.0  # 每2秒生成一次新笔画
         self.animation_time = 0
         
+        # 渲染质量设置（由性能优化器通过apply_quality下发）
+        self.quality: QualitySettings = DEFAULT_QUALITY
+        self.max_rendered_strokes = self.strokes.maxlen
+        
         # 字体加载
         self._load_fonts()
         
         # 背景纹理
         self._generate_paper_texture()
         
+        # 墨迹累积画布：书写完成的笔画只栅格化一次，整体淡出
+        self.ink_canvas = pygame.Surface((self.canvas_width, self.canvas_height), pygame.SRCALPHA)
+        self.ink_canvas.fill((0, 0, 0, 0))
+        self._fade_elapsed = 0.0
+        fade_factor = math.exp(-INK_FADE_INTERVAL / INK_FADE_TIME_CONSTANT)
+        self._fade_multiplier = (255, 255, 255, int(255 * fade_factor))
+        
         print("本地书法艺术生成器初始化完成")
     
     def _load_fonts(self):
-        """加载字体"""
-        try:
-            self.font_large = pygame.font.Font("墨趣古风体.ttf", 48)
-            self.font_medium = pygame.font.Font("墨趣古风体.ttf", 32)
-            self.font_small = pygame.font.Font("墨趣古风体.ttf", 24)
-        except:
-            self.font_large = pygame.font.Font(None, 48)
-            self.font_medium = pygame.font.Font(None, 32)
-            self.font_small = pygame.font.Font(None, 24)
+        """从字体服务获取共享字体"""
+        fonts = get_font_service()
+        self.font_large = fonts.pygame_font(48)
+        self.font_medium = fonts.pygame_font(32)
+        self.font_small = fonts.pygame_font(24)
     
     def _generate_paper_texture(self):
-        """生成宣纸纹理背景"""
-        self.paper_surface = pygame.Surface((self.canvas_width, self.canvas_height))
-        self.paper_surface.fill(CanalColors.PAPER_WHITE)
-        
-        # 添加细微的纹理噪声
-        for _ in range(200):
-            x = random.randint(0, self.canvas_width-1)
-            y = random.randint(0, self.canvas_height-1)
-            color_variation = random.randint(-10, 10)
-            color = (245 + color_variation, 245 + color_variation, 240 + color_variation)
-            pygame.draw.circle(self.paper_surface, color, (x, y), 1)
+        """生成宣纸纹理背景（取自共享的宣纸纹理服务）"""
+        pixels = get_paper_service().paper_rgb(self.canvas_width, self.canvas_height,
+                                               CanalColors.PAPER_WHITE, CALLIGRAPHY_PAPER)
+        self.paper_surface = pygame.image.fromstring(pixels.tobytes(), (self.canvas_width, self.canvas_height), 'RGB')
+    
+    def apply_quality(self, settings: QualitySettings):
+        """应用质量设置：同屏笔画预算与笔画生成频率"""
+        self.quality = settings
+        self.max_rendered_strokes = scaled_count(self.strokes.maxlen, settings, minimum=1)
     
     def update_audio_data(self, audio_data: np.ndarray, sample_rate: int = 32000):
         """更新音频数据"""
@@ -267,21 +284,66 @@ class LocalCalligraphyGenerator:
                 self._create_new_stroke()
                 self.last_generation_time = current_time
                 
-                # 动态调整生成间隔
-                self.generation_interval = 1.0 + random.random() * 2.0
+                # 动态调整生成间隔（低质量等级下降低生成频率）
+                self.generation_interval = (1.0 + random.random() * 2.0) * self.quality.update_interval_scale
         
-        # 更新笔画透明度（淡出效果）
+        # 书写完成的笔画栅格化到累积画布，过期笔画移出列表
         for stroke in list(self.strokes):
             age = current_time - stroke.created_time
+            if not stroke.baked and age >= STROKE_DRAW_DURATION:
+                self._bake_stroke(stroke)
             if age > stroke.duration:
                 self.strokes.remove(stroke)
-            else:
-                # 淡出效果
-                fade_ratio = 1.0 - (age / stroke.duration)
-                stroke.alpha = int(stroke.alpha * fade_ratio)
+        
+        # 累积画布整体淡出
+        self._fade_elapsed += dt
+        while self._fade_elapsed >= INK_FADE_INTERVAL:
+            self._fade_elapsed -= INK_FADE_INTERVAL
+            self.ink_canvas.fill(self._fade_multiplier, special_flags=pygame.BLEND_RGBA_MULT)
+            # 乘法取整会残留极淡的墨迹，额外减1保证最终完全淡出
+            self.ink_canvas.fill((0, 0, 0, 1), special_flags=pygame.BLEND_RGBA_SUB)
+    
+    def _stroke_width(self, stroke: CalligraphyStroke) -> int:
+        """根据风格确定线宽"""
+        if stroke.style == 'delicate':
+            # 精细风格 - 细线条
+            return max(1, int(stroke.thickness * 0.7))
+        elif stroke.style == 'bold':
+            # 粗犷风格 - 粗线条
+            return max(1, int(stroke.thickness * 1.3))
+        # 流动风格 - 平滑曲线
+        return max(1, int(stroke.thickness))
+    
+    def _draw_stroke(self, target: pygame.Surface, stroke: CalligraphyStroke, progress: float = 1.0):
+        """在笔画包围盒大小的表面上绘制笔画（可只绘制前一部分），再按笔画透明度合成到目标"""
+        point_count = max(2, int(math.ceil(len(stroke.points) * progress)))
+        # 调整点坐标到相对画布的位置
+        points = [(x - self.canvas_x, y - self.canvas_y) for x, y in stroke.points[:point_count]]
+        if len(points) < 2:
+            return
+        
+        width = self._stroke_width(stroke)
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        left, top = min(xs) - width, min(ys) - width
+        bounds = pygame.Rect(left, top, max(xs) - left + width + 1, max(ys) - top + width + 1)
+        
+        stroke_surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        pygame.draw.lines(stroke_surface, stroke.color, False,
+                          [(x - left, y - top) for x, y in points], width)
+        
+        # 应用透明度
+        stroke_surface.set_alpha(stroke.alpha)
+        target.blit(stroke_surface, bounds.topleft)
+    
+    def _bake_stroke(self, stroke: CalligraphyStroke):
+        """将书写完成的笔画栅格化到墨迹累积画布（每个笔画仅一次）"""
+        if len(stroke.points) > 1 and stroke.alpha > 0:
+            self._draw_stroke(self.ink_canvas, stroke)
+        stroke.baked = True
     
     def render(self, screen: pygame.Surface):
-        """渲染书法艺术生成器"""
+        """渲染书法艺术生成器 - 累积画布一次合成，仅书写中的笔画实时绘制"""
         # 绘制画布背景
         canvas_rect = pygame.Rect(self.canvas_x, self.canvas_y, self.canvas_width, self.canvas_height)
         screen.blit(self.paper_surface, (self.canvas_x, self.canvas_y))
@@ -289,44 +351,29 @@ class LocalCalligraphyGenerator:
         # 绘制画布边框
         pygame.draw.rect(screen, CanalColors.INK_MEDIUM, canvas_rect, 3)
         
-        # 渲染所有笔画
-        for stroke in self.strokes:
-            if len(stroke.points) > 1 and stroke.alpha > 0:
-                # 创建带透明度的表面
-                stroke_surface = pygame.Surface((self.canvas_width, self.canvas_height), pygame.SRCALPHA)
-                
-                # 调整点坐标到相对画布的位置
-                adjusted_points = [(x - self.canvas_x, y - self.canvas_y) for x, y in stroke.points]
-                
-                # 绘制笔画
-                if len(adjusted_points) > 1:
-                    color_with_alpha = (*stroke.color, stroke.alpha)
-                    
-                    # 根据风格绘制不同效果
-                    if stroke.style == 'flowing':
-                        # 流动风格 - 平滑曲线
-                        pygame.draw.lines(stroke_surface, stroke.color, False, adjusted_points, int(stroke.thickness))
-                    elif stroke.style == 'delicate':
-                        # 精细风格 - 细线条
-                        pygame.draw.lines(stroke_surface, stroke.color, False, adjusted_points, max(1, int(stroke.thickness * 0.7)))
-                    elif stroke.style == 'bold':
-                        # 粗犷风格 - 粗线条
-                        pygame.draw.lines(stroke_surface, stroke.color, False, adjusted_points, int(stroke.thickness * 1.3))
-                
-                # 应用透明度
-                stroke_surface.set_alpha(stroke.alpha)
-                screen.blit(stroke_surface, (self.canvas_x, self.canvas_y))
+        # 已完成笔画（累积画布）
+        screen.blit(self.ink_canvas, (self.canvas_x, self.canvas_y))
+        
+        # 书写中的笔画（按预算只绘制最新的笔画）
+        current_time = time.time()
+        live_strokes = [stroke for stroke in self.strokes if not stroke.baked]
+        if live_strokes:
+            canvas = screen.subsurface(canvas_rect.clip(screen.get_rect()))
+            for stroke in live_strokes[-self.max_rendered_strokes:]:
+                if len(stroke.points) > 1 and stroke.alpha > 0:
+                    progress = min(1.0, (current_time - stroke.created_time) / STROKE_DRAW_DURATION)
+                    self._draw_stroke(canvas, stroke, progress)
         
         # 绘制当前字符提示
         if self.current_character:
-            char_surface = self.font_large.render(self.current_character, True, CanalColors.INK_LIGHT)
+            char_surface = render_text(self.font_large, self.current_character, True, CanalColors.INK_LIGHT)
             char_rect = char_surface.get_rect()
             char_rect.center = (self.canvas_x + self.canvas_width // 2, self.canvas_y - 30)
             screen.blit(char_surface, char_rect)
         
         # 绘制标题
         title_text = "声音映射书法"
-        title_surface = self.font_medium.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_medium, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect()
         title_rect.center = (self.canvas_x + self.canvas_width // 2, 50)
         screen.blit(title_surface, title_rect)
@@ -346,7 +393,7 @@ class LocalCalligraphyGenerator:
         
         # 能量标签
         energy_text = f"音频强度: {self.audio_energy:.2f}"
-        energy_surface = self.font_small.render(energy_text, True, CanalColors.INK_MEDIUM)
+        energy_surface = render_text(self.font_small, energy_text, True, CanalColors.INK_MEDIUM)
         screen.blit(energy_surface, (info_x, info_y + 15))
         
         # 频段信息
@@ -366,14 +413,14 @@ class LocalCalligraphyGenerator:
             pygame.draw.rect(screen, colors[i], bar_rect)
             
             # 标签
-            label_surface = self.font_small.render(label, True, CanalColors.INK_MEDIUM)
+            label_surface = render_text(self.font_small, label, True, CanalColors.INK_MEDIUM)
             screen.blit(label_surface, (x, freq_y + 5))
         
         # 当前风格显示
         style = self._determine_style()
         style_names = {'flowing': '流动', 'delicate': '精细', 'bold': '粗犷'}
         style_text = f"当前风格: {style_names.get(style, style)}"
-        style_surface = self.font_small.render(style_text, True, CanalColors.INK_BLACK)
+        style_surface = render_text(self.font_small, style_text, True, CanalColors.INK_BLACK)
         screen.blit(style_surface, (info_x, freq_y + 30))
 
 if __name__ == "__main__":
@@ -7,10 +7,122 @@
 import pygame
 import numpy as np
 import math
+import random
 import time
-from typing import List, Dict, Tuple, Optional
+from functools import lru_cache
+from typing import List, Dict, Tuple, Optional, Iterable
 from collections import deque
+from font_service import get_font_service
 from onomatopoeia_generator import CanalOnomatopoeiaGenerator, OnomatopoeiaFeature
+from quality_settings import QualitySettings, DEFAULT_QUALITY, scaled_count
+from text_cache import render_text
+
+# 按主频段选择的拟声词词表（上限频率Hz, 候选词）
+FREQUENCY_WORD_BANDS = (
+    (300, ('突突', '轰轰', '嗡嗡')),
+    (1000, ('潺潺', '汩汩', '淙淙')),
+    (3000, ('哗啦', '溅溅')),
+    (float('inf'), ('啾啾', '唧唧')),
+)
+
+# 当前拟声词的文字颜色
+ACTIVE_TEXT_COLOR = (50, 50, 50)
+
+# 字形精灵预先光栅化的缩放档位（覆盖1.2 -> 1.0的出场缩放动画）
+GLYPH_SCALE_STEPS = (1.0, 1.05, 1.1, 1.15, 1.2)
+
+# 笔画模板的逐实例扰动：旋转角度（弧度）与缩放幅度
+STROKE_JITTER_ANGLE = 0.05
+STROKE_JITTER_SCALE = 0.05
+
+# 墨滴重力与最长寿命（秒）
+INK_DROP_GRAVITY = 0.1
+INK_DROP_MAX_LIFE = 2.5
+
+class GlyphSpriteCache:
+    """拟声词字形精灵缓存 - 每个(词, 颜色)预先光栅化若干缩放档位
+
+    精灵由缓存独占（不同于全局文字缓存的共享表面），调用方可直接set_alpha后贴图，
+    淡出与缩放动画因此只需贴图，不再每帧缩放或复制表面。
+    """
+
+    def __init__(self, font: pygame.font.Font, scale_steps: Iterable[float] = GLYPH_SCALE_STEPS):
+        self.font = font
+        self.scale_steps = tuple(sorted(scale_steps))
+        self._sprites: Dict[Tuple[str, Tuple[int, int, int]], List[pygame.Surface]] = {}
+
+    def _rasterize(self, word: str, color: Tuple[int, int, int]) -> List[pygame.Surface]:
+        base = render_text(self.font, word, True, color)
+        width, height = base.get_size()
+        sprites = []
+        for scale in self.scale_steps:
+            if scale == 1.0:
+                sprites.append(base.copy())
+            else:
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                sprites.append(pygame.transform.smoothscale(base, size))
+        return sprites
+
+    def get(self, word: str, color: Tuple[int, int, int], scale: float = 1.0) -> pygame.Surface:
+        """获取最接近目标缩放的字形精灵"""
+        key = (word, tuple(color))
+        sprites = self._sprites.get(key)
+        if sprites is None:
+            sprites = self._sprites[key] = self._rasterize(word, key[1])
+        index = min(range(len(self.scale_steps)), key=lambda i: abs(self.scale_steps[i] - scale))
+        return sprites[index]
+
+    def warm(self, words: Iterable[str], color: Tuple[int, int, int]):
+        """预先光栅化一组词"""
+        for word in words:
+            self.get(word, color)
+
+@lru_cache(maxsize=64)
+def stroke_template(char_count: int, style: str) -> Tuple[np.ndarray, np.ndarray]:
+    """笔画几何模板：返回(基础偏移, 单位强度偏移)，笔画点 = 起点 + 基础偏移 + 强度 * 单位强度偏移"""
+    char_width = 35
+    base_parts = []
+    unit_parts = []
+    
+    for i in range(char_count):
+        char_x = i * char_width
+        
+        if style == 'flowing':
+            # 流动笔画 - 适合水流相关拟声词
+            j = np.arange(20)
+            base = np.stack([char_x + j * 2.0, np.zeros(len(j))], axis=1)
+            unit = np.stack([np.zeros(len(j)), np.sin(j * 0.3 + i) * 8], axis=1)
+        elif style == 'bold':
+            # 粗犷笔画 - 适合引擎、撞击声
+            j = np.arange(15)
+            base = np.stack([char_x + j * 3.0, np.zeros(len(j))], axis=1)
+            unit = np.stack([np.zeros(len(j)), (j % 3 - 1) * 5.0], axis=1)
+        elif style == 'delicate':
+            # 精细笔画 - 适合鸟鸣、细微声音
+            j = np.arange(25)
+            base = np.stack([char_x + j * 1.5, np.zeros(len(j))], axis=1)
+            unit = np.stack([np.zeros(len(j)), np.sin(j * 0.5) * 3], axis=1)
+        elif style == 'splash':
+            # 飞溅笔画 - 适合水花、爆裂声
+            angles = np.linspace(0, 2 * math.pi, 12)
+            base = np.tile([char_x + 15.0, 0.0], (len(angles), 1))
+            unit = np.stack([np.cos(angles) * 20, np.sin(angles) * 20], axis=1)
+        else:
+            continue
+        base_parts.append(base)
+        unit_parts.append(unit)
+    
+    if not base_parts:
+        empty = np.zeros((0, 2))
+        empty.flags.writeable = False
+        return empty, empty
+    
+    base = np.concatenate(base_parts)
+    unit = np.concatenate(unit_parts)
+    # 模板在实例间共享，禁止原地修改
+    base.flags.writeable = False
+    unit.flags.writeable = False
+    return base, unit
 
 class InkBrushStroke:
     """水墨笔画类"""
@@ -41,66 +153,30 @@ class InkBrushStroke:
         self.animation_progress = 0.0
         self.fade_start_time = self.created_time + duration * 0.7
         
-    def _generate_stroke_points(self) -> List[Tuple[int, int]]:
-        """生成笔画轨迹点"""
-        points = []
-        char_width = 35
+    def _generate_stroke_points(self) -> np.ndarray:
+        """由缓存的几何模板生成笔画轨迹点（逐实例施加轻微旋转与缩放扰动），返回(N, 2)数组"""
+        base, unit = stroke_template(len(self.word), self.style)
+        offsets = base + unit * self.intensity
         
-        for i, char in enumerate(self.word):
-            char_x = self.x + i * char_width
-            char_y = self.y
-            
-            # 根据字符和风格生成笔画
-            if self.style == 'flowing':
-                # 流动笔画 - 适合水流相关拟声词
-                for j in range(20):
-                    x = char_x + j * 2
-                    y = char_y + math.sin(j * 0.3 + i) * self.intensity * 8
-                    points.append((int(x), int(y)))
-                    
-            elif self.style == 'bold':
-                # 粗犷笔画 - 适合引擎、撞击声
-                for j in range(15):
-                    x = char_x + j * 3
-                    y = char_y + (j % 3 - 1) * self.intensity * 5
-                    points.append((int(x), int(y)))
-                    
-            elif self.style == 'delicate':
-                # 精细笔画 - 适合鸟鸣、细微声音
-                for j in range(25):
-                    x = char_x + j * 1.5
-                    y = char_y + math.sin(j * 0.5) * self.intensity * 3
-                    points.append((int(x), int(y)))
-                    
-            elif self.style == 'splash':
-                # 飞溅笔画 - 适合水花、爆裂声
-                center_x, center_y = char_x + 15, char_y
-                for angle in np.linspace(0, 2*math.pi, 12):
-                    radius = self.intensity * 20
-                    x = center_x + radius * math.cos(angle)
-                    y = center_y + radius * math.sin(angle)
-                    points.append((int(x), int(y)))
-        
-        return points
-    
-    def _generate_ink_drops(self) -> List[Dict]:
-        """生成墨滴效果"""
-        drops = []
-        drop_count = int(self.intensity * 8)
-        
-        for _ in range(drop_count):
-            drop = {
-                'x': self.x + np.random.uniform(-20, self.length + 20),
-                'y': self.y + np.random.uniform(-15, 15),
-                'size': np.random.uniform(1, 4) * self.intensity,
-                'alpha': int(self.alpha * np.random.uniform(0.3, 0.8)),
-                'vx': np.random.uniform(-1, 1),
-                'vy': np.random.uniform(0.5, 2),
-                'life': np.random.uniform(1.0, 2.5)
-            }
-            drops.append(drop)
+        angle = np.random.uniform(-STROKE_JITTER_ANGLE, STROKE_JITTER_ANGLE)
+        scale = np.random.uniform(1 - STROKE_JITTER_SCALE, 1 + STROKE_JITTER_SCALE)
+        cos_a, sin_a = math.cos(angle) * scale, math.sin(angle) * scale
+        transform = np.array([[cos_a, sin_a], [-sin_a, cos_a]])
         
-        return drops
+        return (offsets @ transform + (self.x, self.y)).astype(np.int32)
+    
+    def _generate_ink_drops(self) -> Dict[str, np.ndarray]:
+        """生成墨滴效果（按字段存放的数组）"""
+        count = int(self.intensity * 8)
+        return {
+            'x': self.x + np.random.uniform(-20, self.length + 20, count),
+            'y': self.y + np.random.uniform(-15, 15, count),
+            'size': np.random.uniform(1, 4, count) * self.intensity,
+            'alpha': (self.alpha * np.random.uniform(0.3, 0.8, count)).astype(np.int32),
+            'vx': np.random.uniform(-1, 1, count),
+            'vy': np.random.uniform(0.5, 2, count),
+            'life': np.random.uniform(1.0, INK_DROP_MAX_LIFE, count)
+        }
 
 class OnomatopoeiaVisualizer:
     """拟声词可视化器 - 水墨线条风格"""
@@ -114,32 +190,17 @@ class OnomatopoeiaVisualizer:
         self.update_interval = 0.1  # 100ms更新一次
         self.last_update_time = 0
         
-        # 字体加载（优先使用墨趣古风体）
+        # 从字体服务获取共享字体
         self.font_size = 48
-        self.font = None
-        font_paths = [
-            "墨趣古风体.ttf",
-            "fonts/墨趣古风体.ttf",
-            "assets/fonts/墨趣古风体.ttf",
-            "/System/Library/Fonts/PingFang.ttc",
-            "/System/Library/Fonts/Hiragino Sans GB.ttc",
-            "/System/Library/Fonts/STHeiti Light.ttc"
-        ]
-        
-        for font_path in font_paths:
-            try:
-                self.font = pygame.font.Font(font_path, self.font_size)
-                print(f"成功加载字体: {font_path}")
-                break
-            except:
-                continue
-        
-        if self.font is None:
-            try:
-                self.font = pygame.font.Font("墨趣古风体.ttf", self.font_size)
-            except:
-                self.font = pygame.font.Font(None, self.font_size)
-            print("使用默认字体")
+        self.font = get_font_service().pygame_font(self.font_size)
+        
+        # 拟声词字形精灵缓存：词表固定且很小，启动时预先光栅化全部缩放档位
+        self.glyph_cache = GlyphSpriteCache(self.font)
+        self.glyph_cache.warm((word for _, words in FREQUENCY_WORD_BANDS for word in words),
+                              ACTIVE_TEXT_COLOR)
+        
+        # 墨滴精灵缓存：(颜色, 半径) -> 不透明圆形精灵
+        self._drop_sprites: Dict[Tuple[Tuple[int, int, int], int], pygame.Surface] = {}
         
         # 拟声词生成器
         self.generator = CanalOnomatopoeiaGenerator()
@@ -156,7 +217,8 @@ class OnomatopoeiaVisualizer:
         
         # 简化的笔画系统
         self.ink_strokes = []
-        self.max_strokes = 5  # 限制最大笔画数量
+        self.base_max_strokes = 5
+        self.max_strokes = self.base_max_strokes  # 限制最大笔画数量
         
         # 颜色定义
         self.colors = {
@@ -167,66 +229,10 @@ class OnomatopoeiaVisualizer:
             'wind': (176, 196, 222)
         }
         
-        # 初始化pygame字体
-        pygame.font.init()
-        
-        # 优先使用墨趣古风体，与其他组件保持一致
-        font_paths = [
-            "墨趣古风体.ttf",
-            "assets/fonts/墨趣古风体.ttf",
-            "/System/Library/Fonts/PingFang.ttc",
-            "/System/Library/Fonts/STHeiti Light.ttc"
-        ]
-        
-        self.font_large = None
-        self.font_medium = None
-        self.font_small = None
-        
-        for font_path in font_paths:
-            try:
-                if Path(font_path).exists():
-                    self.font_large = pygame.font.Font(font_path, 48)
-                    self.font_medium = pygame.font.Font(font_path, 32)
-                    self.font_small = pygame.font.Font(font_path, 24)
-                    print(f"拟声词可视化字体加载成功: {font_path}")
-                    break
-            except Exception as e:
-                continue
-        
-        # 如果没有加载成功，使用系统字体
-        if not self.font_large:
-            try:
-                chinese_fonts = ['PingFang SC', 'STHeiti', 'SimHei', 'Microsoft YaHei']
-                for font_name in chinese_fonts:
-                    try:
-                        self.font_large = pygame.font.SysFont(font_name, 48)
-                        self.font_medium = pygame.font.SysFont(font_name, 32)
-                        self.font_small = pygame.font.SysFont(font_name, 24)
-                        print(f"拟声词可视化使用系统字体: {font_name}")
-                        break
-                    except:
-                        continue
-                
-                if not self.font_large:
-                    try:
-                        self.font_large = pygame.font.Font("墨趣古风体.ttf", 48)
-                        self.font_medium = pygame.font.Font("墨趣古风体.ttf", 32)
-                        self.font_small = pygame.font.Font("墨趣古风体.ttf", 24)
-                    except:
-                        self.font_large = pygame.font.Font(None, 48)
-                        self.font_medium = pygame.font.Font(None, 32)
-                        self.font_small = pygame.font.Font(None, 24)
-                    print("拟声词可视化使用默认字体")
-            except Exception as e:
-                print(f"拟声词字体初始化失败: {e}")
-                try:
-                    self.font_large = pygame.font.Font("墨趣古风体.ttf", 48)
-                    self.font_medium = pygame.font.Font("墨趣古风体.ttf", 32)
-                    self.font_small = pygame.font.Font("墨趣古风体.ttf", 24)
-                except:
-                    self.font_large = pygame.font.Font(None, 48)
-                    self.font_medium = pygame.font.Font(None, 32)
-                    self.font_small = pygame.font.Font(None, 24)
+        fonts = get_font_service()
+        self.font_large = fonts.pygame_font(48)
+        self.font_medium = fonts.pygame_font(32)
+        self.font_small = fonts.pygame_font(24)
         
         # 当前显示的拟声词
         self.current_onomatopoeia = ""
@@ -239,12 +245,20 @@ class OnomatopoeiaVisualizer:
         
         # 性能优化：减少更新频率
         self.last_update_time = 0
-        self.update_interval = 0.05  # 每50ms更新一次
+        self.base_update_interval = 0.05  # 每50ms更新一次
+        self.update_interval = self.base_update_interval
+        
+        # 渲染质量设置（由性能优化器通过apply_quality下发）
+        self.quality: QualitySettings = DEFAULT_QUALITY
         
         # 动画参数
         self.animation_time = 0
         self.text_scale = 1.0
         self.text_alpha = 255
+        
+        # 本帧与上一帧的绘制区域（供主循环局部刷新）
+        self.dirty_rects = []
+        self._previous_frame_rects = []
     
     def _init_fonts(self):
         """初始化字体 - 优先使用中文字体"""
@@ -281,6 +295,12 @@ class OnomatopoeiaVisualizer:
                 'small': None, 'medium': None, 'large': None, 'calligraphy': None
             }
 
+    def apply_quality(self, settings: QualitySettings):
+        """应用质量设置：装饰笔画预算、声波效果层数与更新频率"""
+        self.quality = settings
+        self.max_strokes = scaled_count(self.base_max_strokes, settings)
+        self.update_interval = self.base_update_interval * settings.update_interval_scale
+
     def _try_load_font(self, font_path: str, size: int) -> bool:
         """尝试加载字体，返回是否成功"""
         try:
@@ -324,14 +344,8 @@ class OnomatopoeiaVisualizer:
                 dominant_freq = abs(freqs[dominant_freq_idx])
                 
                 # 根据频率范围选择拟声词
-                if dominant_freq < 300:
-                    onomatopoeia = random.choice(['突突', '轰轰', '嗡嗡'])
-                elif dominant_freq < 1000:
-                    onomatopoeia = random.choice(['潺潺', '汩汩', '淙淙'])
-                elif dominant_freq < 3000:
-                    onomatopoeia = random.choice(['哗啦', '溅溅'])
-                else:
-                    onomatopoeia = random.choice(['啾啾', '唧唧'])
+                onomatopoeia = next(random.choice(words) for upper, words in FREQUENCY_WORD_BANDS
+                                    if dominant_freq < upper)
                 
                 # 更新当前拟声词
                 if onomatopoeia != self.current_onomatopoeia:
@@ -423,11 +437,11 @@ class OnomatopoeiaVisualizer:
             stroke.animation_progress = min(1.0, age / (stroke.duration * 0.3))
             
             # 更新墨滴位置
-            for drop in stroke.ink_drops:
-                drop['x'] += drop['vx']
-                drop['y'] += drop['vy']
-                drop['vy'] += 0.1  # 重力
-                drop['life'] -= 0.016
+            drops = stroke.ink_drops
+            drops['x'] += drops['vx']
+            drops['y'] += drops['vy']
+            drops['vy'] += INK_DROP_GRAVITY  # 重力
+            drops['life'] -= 0.016
         
         # 清理过期的笔画
         self.ink_strokes = [stroke for stroke in self.ink_strokes 
@@ -435,24 +449,15 @@ class OnomatopoeiaVisualizer:
 
     def render(self, surface: pygame.Surface):
         """渲染拟声词可视化（增强声波跟随效果）"""
+        frame_rects = []
         try:
             # 渲染当前拟声词
             if self.current_onomatopoeia and self.text_alpha > 0:
-                # 创建文字表面
-                text_surface = self.font.render(self.current_onomatopoeia, True, (50, 50, 50))
-                
-                # 应用透明度
-                if self.text_alpha < 255:
-                    text_surface.set_alpha(self.text_alpha)
-                
-                # 计算位置 - 增强声波跟随效果
+                # 取预先光栅化的缩放档位精灵，只设置透明度后贴图
+                text_surface = self.glyph_cache.get(self.current_onomatopoeia, ACTIVE_TEXT_COLOR,
+                                                    self.text_scale)
+                text_surface.set_alpha(self.text_alpha)
                 text_rect = text_surface.get_rect()
-                if self.text_scale != 1.0:
-                    # 缩放文字
-                    scaled_width = int(text_rect.width * self.text_scale)
-                    scaled_height = int(text_rect.height * self.text_scale)
-                    text_surface = pygame.transform.scale(text_surface, (scaled_width, scaled_height))
-                    text_rect = text_surface.get_rect()
                 
                 # 声波跟随效果 - 基于音频强度的动态位置
                 base_x = self.width // 2
@@ -477,11 +482,13 @@ class OnomatopoeiaVisualizer:
                 text_rect.center = (final_x, final_y)
                 
                 # 绘制文字
-                surface.blit(text_surface, text_rect)
+                frame_rects.append(surface.blit(text_surface, text_rect))
                 
                 # 添加声波可视化效果
                 if audio_intensity > 0.1:
-                    self._render_sound_wave_effects(surface, final_x, final_y, audio_intensity)
+                    frame_rects.extend(
+                        self._render_sound_wave_effects(surface, final_x, final_y, audio_intensity)
+                    )
             
             # 简化的装饰效果
             if self.current_onomatopoeia and len(self.ink_strokes) < self.max_strokes:
@@ -494,18 +501,29 @@ class OnomatopoeiaVisualizer:
                     end_y = y + random.randint(-30, 30)
                     
                     # 绘制简单线条
-                    pygame.draw.line(surface, stroke_color[:3], (x, y), (end_x, end_y), 2)
+                    frame_rects.append(
+                        pygame.draw.line(surface, stroke_color[:3], (x, y), (end_x, end_y), 2)
+                    )
         
         except Exception as e:
             print(f"拟声词渲染错误: {e}")
+        
+        # 记录脏矩形：本帧绘制区域加上一帧绘制区域
+        self.dirty_rects = frame_rects + self._previous_frame_rects
+        self._previous_frame_rects = frame_rects
     
-    def _render_sound_wave_effects(self, surface: pygame.Surface, center_x: int, center_y: int, intensity: float):
-        """渲染声波效果"""
+    def _render_sound_wave_effects(self, surface: pygame.Surface, center_x: int, center_y: int,
+                                   intensity: float) -> List[pygame.Rect]:
+        """渲染声波效果，返回绘制区域"""
+        rects = []
         try:
             current_time = time.time()
             
-            # 绘制同心圆声波
-            for i in range(3):
+            # 绘制同心圆声波（关闭光晕效果时只绘制内圈）
+            ring_count = 3 if self.quality.glow_effects else 1
+            # 按粒子预算调整每圈的点数
+            angle_step = max(10, int(10 / max(self.quality.particle_budget, 0.1)))
+            for i in range(ring_count):
                 radius = int(30 + i * 20 + intensity * 40)
                 wave_phase = current_time * 3.0 + i * 0.5
                 alpha = int(100 * (1 - i * 0.3) * intensity)
@@ -516,7 +534,7 @@ class OnomatopoeiaVisualizer:
                     wave_color = (100, 150, 200, alpha)
                     
                     # 绘制波动的圆形
-                    for angle in range(0, 360, 10):
+                    for angle in range(0, 360, angle_step):
                         rad = math.radians(angle)
                         wave_radius = radius + math.sin(wave_phase + angle * 0.1) * 5
                         x = int(radius + 5 + math.cos(rad) * wave_radius)
@@ -524,10 +542,11 @@ class OnomatopoeiaVisualizer:
                         pygame.draw.circle(wave_surface, wave_color[:3], (x, y), 2)
                     
                     wave_surface.set_alpha(alpha)
-                    surface.blit(wave_surface, (center_x - radius - 5, center_y - radius - 5))
+                    rects.append(surface.blit(wave_surface, (center_x - radius - 5, center_y - radius - 5)))
                     
         except Exception as e:
             print(f"声波效果渲染错误: {e}")
+        return rects
     
     def update_audio_intensity(self, intensity: float):
         """更新音频强度，用于声波跟随效果"""
@@ -571,78 +590,57 @@ class OnomatopoeiaVisualizer:
                 self._render_ink_drops(screen, stroke, alpha)
     
     def _render_single_stroke(self, screen: pygame.Surface, stroke: InkBrushStroke, alpha: int):
-        """渲染单个笔画"""
-        if not self.fonts['calligraphy']:
-            return
-            
+        """渲染单个笔画（字形精灵分层贴图）"""
         try:
-            # 创建笔画表面
-            stroke_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            
-            # 渲染文字 - 书法风格
-            text_surface = self.fonts['calligraphy'].render(
-                stroke.word, True, (*stroke.color, alpha)
-            )
+            glyph = self.glyph_cache.get(stroke.word, stroke.color)
             
-            # 添加笔画效果
+            # 添加笔画效果：各层为(偏移x, 偏移y, 透明度)
             if stroke.style == 'flowing':
                 # 流动效果 - 轻微的位置偏移
-                for i in range(3):
-                    offset_x = int(math.sin(self.animation_time + i) * 2)
-                    offset_y = int(math.cos(self.animation_time + i) * 1)
-                    temp_alpha = max(0, alpha - i * 30)
-                    if temp_alpha > 0:
-                        temp_surface = self.fonts['calligraphy'].render(
-                            stroke.word, True, (*stroke.color, temp_alpha)
-                        )
-                        stroke_surface.blit(temp_surface, 
-                                          (stroke.x + offset_x, stroke.y + offset_y))
-            
+                layers = [(int(math.sin(self.animation_time + i) * 2),
+                           int(math.cos(self.animation_time + i) * 1),
+                           alpha - i * 30) for i in range(3)]
             elif stroke.style == 'bold':
                 # 粗犷效果 - 多层叠加
-                for i in range(2):
-                    temp_surface = self.fonts['calligraphy'].render(
-                        stroke.word, True, (*stroke.color, alpha // (i + 1))
-                    )
-                    stroke_surface.blit(temp_surface, (stroke.x + i, stroke.y + i))
-            
+                layers = [(i, i, alpha // (i + 1)) for i in range(2)]
             elif stroke.style == 'splash':
                 # 飞溅效果 - 随机位置偏移
-                for i in range(5):
-                    offset_x = int(np.random.uniform(-3, 3))
-                    offset_y = int(np.random.uniform(-3, 3))
-                    temp_alpha = max(0, alpha - i * 20)
-                    if temp_alpha > 0:
-                        temp_surface = self.fonts['calligraphy'].render(
-                            stroke.word, True, (*stroke.color, temp_alpha)
-                        )
-                        stroke_surface.blit(temp_surface, 
-                                          (stroke.x + offset_x, stroke.y + offset_y))
-            
+                offsets = np.random.uniform(-3, 3, (5, 2)).astype(int)
+                layers = [(offsets[i, 0], offsets[i, 1], alpha - i * 20) for i in range(5)]
             else:  # delicate
                 # 精细效果 - 清晰渲染
-                stroke_surface.blit(text_surface, (stroke.x, stroke.y))
+                layers = [(0, 0, alpha)]
             
-            screen.blit(stroke_surface, (0, 0))
+            for offset_x, offset_y, layer_alpha in layers:
+                if layer_alpha > 0:
+                    glyph.set_alpha(layer_alpha)
+                    screen.blit(glyph, (stroke.x + offset_x, stroke.y + offset_y))
             
         except Exception as e:
             print(f"笔画渲染错误: {e}")
     
+    def _get_drop_sprite(self, color: Tuple[int, int, int], radius: int) -> pygame.Surface:
+        """获取墨滴精灵（按颜色与半径缓存）"""
+        key = (tuple(color), radius)
+        sprite = self._drop_sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, key[0], (radius, radius), radius)
+            self._drop_sprites[key] = sprite
+        return sprite
+    
     def _render_ink_drops(self, screen: pygame.Surface, stroke: InkBrushStroke, base_alpha: int):
         """渲染墨滴效果"""
-        for drop in stroke.ink_drops:
-            if drop['life'] > 0:
-                drop_alpha = min(base_alpha, int(drop['alpha'] * (drop['life'] / 2.5)))
-                if drop_alpha > 0:
-                    drop_surface = pygame.Surface((drop['size'] * 2, drop['size'] * 2), pygame.SRCALPHA)
-                    pygame.draw.circle(drop_surface, 
-                                     (*stroke.color, drop_alpha),
-                                     (int(drop['size']), int(drop['size'])), 
-                                     int(drop['size']))
-                    
-                    screen.blit(drop_surface, 
-                              (int(drop['x'] - drop['size']), 
-                               int(drop['y'] - drop['size'])))
+        drops = stroke.ink_drops
+        alphas = np.minimum(base_alpha, (drops['alpha'] * (drops['life'] / INK_DROP_MAX_LIFE)).astype(np.int32))
+        radii = drops['size'].astype(np.int32)
+        visible = (drops['life'] > 0) & (alphas > 0) & (radii > 0)
+        
+        for x, y, radius, alpha in zip(drops['x'][visible].tolist(), drops['y'][visible].tolist(),
+                                       radii[visible].tolist(), alphas[visible].tolist()):
+            sprite = self._get_drop_sprite(stroke.color, radius)
+            sprite.set_alpha(alpha)
+            screen.blit(sprite, (int(x - radius), int(y - radius)))
     
     def _render_ink_panel(self, screen: pygame.Surface):
         """渲染水墨风格信息面板"""
@@ -672,7 +670,7 @@ class OnomatopoeiaVisualizer:
             screen.blit(panel_surface, (panel_x, panel_y))
             
             # 标题
-            title_text = self.fonts['medium'].render("运河拟声", True, self.ink_colors['deep_ink'])
+            title_text = render_text(self.fonts['medium'], "运河拟声", True, self.ink_colors['deep_ink'])
             screen.blit(title_text, (panel_x + 10, panel_y + 10))
             
             # 显示最近的拟声词
@@ -689,16 +687,53 @@ class OnomatopoeiaVisualizer:
                 else:
                     color = self.ink_colors['light_ink']
                 
-                word_text = self.fonts['small'].render(f"「{word}」", True, color)
+                word_text = render_text(self.fonts['small'], f"「{word}」", True, color)
                 screen.blit(word_text, (panel_x + 10 + (i % 3) * 80, panel_y + y_offset + (i // 3) * 25))
                 
         except Exception as e:
             print(f"面板渲染错误: {e}")
 
+def benchmark_glyph_rendering(width: int = 1280, height: int = 720, frames: int = 600) -> Dict[str, float]:
+    """对比逐帧缩放文字与字形精灵缓存的淡出动画耗时，返回{方式: 平均毫秒}"""
+    screen = pygame.display.set_mode((width, height))
+    visualizer = OnomatopoeiaVisualizer(width, height)
+    words = [word for _, band_words in FREQUENCY_WORD_BANDS for word in band_words]
+    
+    def animate(draw):
+        start = time.perf_counter()
+        for frame in range(frames):
+            progress = (frame % 60) / 60
+            draw(words[frame // 60 % len(words)], 1.2 - 0.2 * progress, int(255 * (1 - progress)))
+        return (time.perf_counter() - start) / frames * 1000
+    
+    def draw_rescaled(word, scale, alpha):
+        text_surface = render_text(visualizer.font, word, True, ACTIVE_TEXT_COLOR)
+        text_width, text_height = text_surface.get_size()
+        text_surface = pygame.transform.scale(text_surface, (int(text_width * scale), int(text_height * scale)))
+        text_surface.set_alpha(alpha)
+        screen.blit(text_surface, (width // 2, height // 2))
+    
+    def draw_cached(word, scale, alpha):
+        text_surface = visualizer.glyph_cache.get(word, ACTIVE_TEXT_COLOR, scale)
+        text_surface.set_alpha(alpha)
+        screen.blit(text_surface, (width // 2, height // 2))
+    
+    results = {'逐帧缩放': animate(draw_rescaled), '精灵缓存': animate(draw_cached)}
+    for name, cost in results.items():
+        print(f"{name}: {cost:.3f} ms/帧")
+    return results
+
 if __name__ == "__main__":
+    import sys
+    
     # 测试代码
     pygame.init()
     
+    if "--benchmark" in sys.argv:
+        benchmark_glyph_rendering()
+        pygame.quit()
+        sys.exit(0)
+    
     width, height = 1280, 720
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption("拟声词可视化测试")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+宣纸纹理服务
+生成可无缝平铺的宣纸纹理块（周期性噪声与纤维整体运算生成），按(参数, 尺寸, 种子)缓存到磁盘，
+之后以内存映射方式加载。水墨渲染引擎、本地书法生成器与界面背景共用同一纹理库。
+
+纹理块为float32的亮度偏移（0-255灰度单位，0为无变化），使用方叠加到各自的宣纸底色上。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# 纹理缓存格式版本（生成算法或文件布局变化时递增）
+PAPER_TEXTURE_FORMAT_VERSION = 1
+
+# 默认缓存目录与纹理块边长
+DEFAULT_PAPER_CACHE_DIR = Path(__file__).parent / "cache" / "paper"
+DEFAULT_TILE_SIZE = 512
+
+@dataclass(frozen=True)
+class PaperParams:
+    """宣纸纹理参数"""
+    grain: float = 5.0                     # 细颗粒噪声标准差
+    cloud: float = 2.0                     # 低频云纹标准差
+    cloud_scale: float = 24.0              # 云纹尺度（像素）
+    fibers_per_mpx: float = 200.0          # 每百万像素纤维数
+    fiber_strength: float = 10.0           # 纤维最大加深量
+    fiber_length: Tuple[int, int] = (8, 40)
+    fiber_blur: float = 0.6                # 纤维柔化半径（像素）
+
+# 各使用方的预设
+INK_WASH_PAPER = PaperParams()
+CALLIGRAPHY_PAPER = PaperParams(grain=2.0, cloud=3.0, fibers_per_mpx=120.0, fiber_strength=8.0)
+
+def _periodic_blur(field: np.ndarray, sigma: float) -> np.ndarray:
+    """频域高斯模糊（循环卷积，结果天然可无缝平铺）"""
+    if sigma <= 0:
+        return field
+    height, width = field.shape
+    fy = np.fft.fftfreq(height)[:, None]
+    fx = np.fft.rfftfreq(width)[None, :]
+    transfer = np.exp(-2 * (np.pi * sigma) ** 2 * (fx ** 2 + fy ** 2))
+    return np.fft.irfft2(np.fft.rfft2(field) * transfer, s=(height, width))
+
+def _splat_fibers(size: int, params: PaperParams, rng: np.random.Generator) -> np.ndarray:
+    """一次性生成全部纤维的采样点并累加到纹理块（坐标取模回绕，跨边界的纤维在对边延续）"""
+    coverage = np.zeros((size, size), dtype=np.float32)
+    count = int(round(params.fibers_per_mpx * size * size / 1e6))
+    if count == 0:
+        return coverage
+
+    min_length, max_length = params.fiber_length
+    start = rng.uniform(0, size, (count, 2))
+    angle = rng.uniform(0, 2 * np.pi, count)
+    length = rng.uniform(min_length, max_length, count)
+    alpha = rng.uniform(0.4, 1.0, count).astype(np.float32)
+
+    # 每根纤维按最大长度等距采样，超出自身长度的采样点权重为0
+    steps = np.arange(int(np.ceil(max_length)) + 1, dtype=np.float64)
+    valid = steps[None, :] <= length[:, None]
+    xs = start[:, 0:1] + steps[None, :] * np.cos(angle)[:, None]
+    ys = start[:, 1:2] + steps[None, :] * np.sin(angle)[:, None]
+
+    rows = np.round(ys[valid]).astype(np.int64) % size
+    cols = np.round(xs[valid]).astype(np.int64) % size
+    weights = np.broadcast_to(alpha[:, None], valid.shape)[valid]
+    np.add.at(coverage, (rows, cols), weights)
+    return np.minimum(coverage, 1.0)
+
+def generate_tile(params: PaperParams, size: int = DEFAULT_TILE_SIZE, seed: int = 0) -> np.ndarray:
+    """生成可无缝平铺的宣纸纹理块（亮度偏移）"""
+    rng = np.random.default_rng(seed)
+
+    delta = rng.normal(0, params.grain, (size, size))
+    if params.cloud > 0:
+        cloud = _periodic_blur(rng.normal(0, 1, (size, size)), params.cloud_scale)
+        delta += cloud / max(float(cloud.std()), 1e-6) * params.cloud
+
+    fibers = _periodic_blur(_splat_fibers(size, params, rng), params.fiber_blur)
+    delta -= params.fiber_strength * np.clip(fibers / max(float(fibers.max()), 1e-6), 0, 1)
+    return delta.astype(np.float32)
+
+def tile_to(tile: np.ndarray, width: int, height: int) -> np.ndarray:
+    """将纹理块平铺到指定大小"""
+    tile_height, tile_width = tile.shape
+    reps = (-(-height // tile_height), -(-width // tile_width))
+    return np.tile(tile, reps)[:height, :width]
+
+class PaperTextureService:
+    """宣纸纹理服务 - 内存缓存 -> 磁盘内存映射 -> 生成并写盘"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, tile_size: int = DEFAULT_TILE_SIZE):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_PAPER_CACHE_DIR
+        self.tile_size = tile_size
+        self._tiles: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.generated = 0
+        self.loaded = 0
+
+    @staticmethod
+    def make_key(params: PaperParams, size: int, seed: int) -> str:
+        """生成缓存键"""
+        payload = json.dumps([asdict(params), size, seed, PAPER_TEXTURE_FORMAT_VERSION], sort_keys=True)
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+        return f"paper_{size}_s{seed}_{digest}"
+
+    def tile(self, params: PaperParams = INK_WASH_PAPER, seed: int = 0, size: Optional[int] = None) -> np.ndarray:
+        """获取纹理块（只读）"""
+        size = size or self.tile_size
+        key = self.make_key(params, size, seed)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            return tile
+
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                tile = self._load(key)
+                if tile is None:
+                    start = time.perf_counter()
+                    tile = generate_tile(params, size, seed)
+                    tile.setflags(write=False)
+                    self._save(key, tile)
+                    self.generated += 1
+                    print(f"宣纸纹理生成完成: {key} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+                self._tiles[key] = tile
+        return tile
+
+    def texture(self, width: int, height: int, params: PaperParams = INK_WASH_PAPER, seed: int = 0) -> np.ndarray:
+        """获取平铺到指定大小的纹理（新数组）"""
+        return tile_to(self.tile(params, seed), width, height)
+
+    def paper_rgb(self, width: int, height: int, base_color: Tuple[int, int, int],
+                  params: PaperParams = INK_WASH_PAPER, seed: int = 0) -> np.ndarray:
+        """宣纸底色叠加纹理后的RGB数组 (H, W, 3) uint8"""
+        delta = self.texture(width, height, params, seed)
+        base = np.asarray(base_color, dtype=np.float32)[None, None, :]
+        return np.clip(base + delta[:, :, None], 0, 255).astype(np.uint8)
+
+    def prewarm(self, specs: Iterable[Tuple[PaperParams, int]]):
+        """启动时预先加载（或生成）纹理块，specs为(参数, 种子)"""
+        for params, seed in specs:
+            self.tile(params, seed)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npy"
+
+    def _load(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            tile = np.load(path, mmap_mode='r')
+            self.loaded += 1
+            return tile
+        except Exception as e:
+            print(f"宣纸纹理缓存加载失败: {e}")
+            return None
+
+    def _save(self, key: str, tile: np.ndarray):
+        """写入临时文件后替换，避免其他进程读到半成品"""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp")
+            with open(temp_path, 'wb') as f:
+                np.save(f, tile)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"宣纸纹理缓存保存失败: {e}")
+
+# 全局实例
+_service: Optional[PaperTextureService] = None
+_service_lock = threading.Lock()
+
+def get_paper_service() -> PaperTextureService:
+    """获取全进程共享的宣纸纹理服务"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PaperTextureService()
+    return _service
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        service = PaperTextureService(temp_dir)
+        start = time.perf_counter()
+        service.tile(INK_WASH_PAPER)
+        generate_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        tile = PaperTextureService(temp_dir).tile(INK_WASH_PAPER)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        service.paper_rgb(1280, 720, (245, 245, 240))
+        compose_ms = (time.perf_counter() - start) * 1000
+
+        # 平铺接缝：对边像素差应与相邻像素差同量级
+        seam = float(np.abs(tile[:, 0] - tile[:, -1]).mean())
+        inner = float(np.abs(tile[:, 1] - tile[:, 0]).mean())
+        print(f"生成 {generate_ms:.0f} ms，映射加载 {load_ms:.1f} ms，1280x720平铺 {compose_ms:.1f} ms")
+        print(f"接缝差 {seam:.2f}，相邻差 {inner:.2f}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -8,12 +8,14 @@ import time
 import psutil
 import gc
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import threading
 import queue
 from dataclasses import dataclass
 from collections import deque
 
+from quality_settings import QualitySettings, QUALITY_TIERS
+
 @dataclass
 class PerformanceMetrics:
     """性能指标数据类"""
@@ -169,6 +171,87 @@ class PerformanceProfiler:
             'uptime': time.time() - self.start_time
         }
 
+class QualityGovernor:
+    """自适应质量调节器 - 基于帧耗时的PID控制，带滞回与最短停留时间
+
+    连续质量值quality_level(0-1)由PID输出驱动，再映射为离散质量等级；
+    只有越过等级边界一定余量并持续足够时间后才切换，避免等级来回抖动。
+    """
+    
+    def __init__(self, target_fps: float = 60, headroom: float = 0.9,
+                 kp: float = 0.004, ki: float = 0.0004, kd: float = 0.002,
+                 hysteresis: float = 0.08, min_dwell_time: float = 2.0):
+        self.tiers = QUALITY_TIERS
+        self.target_fps = target_fps
+        self.headroom = headroom  # 目标帧耗时占帧预算的比例，留出余量
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.hysteresis = hysteresis
+        self.min_dwell_time = min_dwell_time
+        
+        self.quality_level = 1.0
+        self.tier_index = 0
+        self.smoothed_frame_time = None
+        self._integral = 0.0
+        self._last_error = 0.0
+        self._last_change_time = 0.0
+    
+    @property
+    def target_frame_time(self) -> float:
+        """目标帧耗时（毫秒）"""
+        return 1000.0 / self.target_fps * self.headroom
+    
+    @property
+    def settings(self) -> QualitySettings:
+        return self.tiers[self.tier_index]
+    
+    def _tier_bounds(self, tier_index: int) -> Tuple[float, float]:
+        """等级对应的质量值区间(下界, 上界)，等级0对应最高区间"""
+        width = 1.0 / len(self.tiers)
+        upper = 1.0 - tier_index * width
+        return upper - width, upper
+    
+    def update(self, frame_time_ms: float, now: Optional[float] = None) -> bool:
+        """输入本帧耗时（毫秒），返回质量等级是否发生变化"""
+        if frame_time_ms <= 0:
+            return False
+        now = time.time() if now is None else now
+        
+        # 指数平滑，抑制单帧尖峰
+        if self.smoothed_frame_time is None:
+            self.smoothed_frame_time = frame_time_ms
+        else:
+            self.smoothed_frame_time += (frame_time_ms - self.smoothed_frame_time) * 0.1
+        
+        # PID：误差为正表示低于目标耗时，可以提高质量
+        error = self.target_frame_time - self.smoothed_frame_time
+        self._integral = float(np.clip(self._integral + error, -100.0, 100.0))
+        derivative = error - self._last_error
+        self._last_error = error
+        
+        output = self.kp * error + self.ki * self._integral + self.kd * derivative
+        self.quality_level = float(np.clip(self.quality_level + output * 0.1, 0.0, 1.0))
+        
+        # 滞回：越过当前等级区间边界一定余量才切换
+        if now - self._last_change_time < self.min_dwell_time:
+            return False
+        lower, upper = self._tier_bounds(self.tier_index)
+        new_index = self.tier_index
+        if self.quality_level < lower - self.hysteresis and self.tier_index < len(self.tiers) - 1:
+            new_index += 1
+        elif self.quality_level > upper + self.hysteresis and self.tier_index > 0:
+            new_index -= 1
+        
+        if new_index == self.tier_index:
+            return False
+        
+        self.tier_index = new_index
+        self._last_change_time = now
+        # 切换后积分项减半，避免持续推动到下一级
+        self._integral *= 0.5
+        return True
+
 class PerformanceOptimizer:
     """性能优化器"""
     
@@ -188,27 +271,53 @@ class PerformanceOptimizer:
         self.frame_skip_count = 0
         self.max_frame_skip = 2
         
-    def optimize_frame_rate(self, current_fps: float) -> Dict[str, Any]:
-        """优化帧率"""
+        # 质量等级调节器与接收质量设置的可视化器
+        self.quality_governor = QualityGovernor(self.target_fps)
+        self.quality_targets = []
+    
+    @property
+    def quality_settings(self) -> QualitySettings:
+        """当前质量设置"""
+        return self.quality_governor.settings
+    
+    def register_quality_target(self, target):
+        """注册实现apply_quality(settings)的可视化器，并立即下发当前设置"""
+        if target is None or not hasattr(target, 'apply_quality'):
+            return
+        self.quality_targets.append(target)
+        target.apply_quality(self.quality_settings)
+    
+    def _broadcast_quality(self):
+        """向所有已注册的可视化器下发质量设置"""
+        settings = self.quality_settings
+        for target in self.quality_targets:
+            try:
+                target.apply_quality(settings)
+            except Exception as e:
+                print(f"质量设置下发失败 ({type(target).__name__}): {e}")
+        
+    def optimize_frame_rate(self, current_fps: float, frame_time_ms: Optional[float] = None) -> Dict[str, Any]:
+        """优化帧率 - 按实测帧耗时调节质量等级"""
         optimizations = {}
         
-        if current_fps < self.target_fps * 0.8:  # 低于目标FPS的80%
+        # 未提供帧耗时时由FPS推算
+        if frame_time_ms is None and current_fps > 0:
+            frame_time_ms = 1000.0 / current_fps
+        
+        if self.adaptive_quality and frame_time_ms:
+            self.quality_governor.target_fps = self.target_fps
+            if self.quality_governor.update(frame_time_ms):
+                self._broadcast_quality()
+                optimizations['quality_tier'] = self.quality_settings.name
+            self.quality_level = self.quality_governor.quality_level
+        
+        if current_fps < self.target_fps * 0.6:  # 低于目标FPS的60%
+            # 启用帧跳过
             if self.adaptive_quality:
-                # 降低质量
-                self.quality_level = max(0.5, self.quality_level - 0.1)
-                optimizations['quality_reduced'] = self.quality_level
-                
-                # 启用帧跳过
-                if current_fps < self.target_fps * 0.6:
-                    self.frame_skip_count = min(self.max_frame_skip, self.frame_skip_count + 1)
-                    optimizations['frame_skip'] = self.frame_skip_count
+                self.frame_skip_count = min(self.max_frame_skip, self.frame_skip_count + 1)
+                optimizations['frame_skip'] = self.frame_skip_count
         
         elif current_fps > self.target_fps * 1.1:  # 高于目标FPS的110%
-            # 提高质量
-            if self.quality_level < 1.0:
-                self.quality_level = min(1.0, self.quality_level + 0.05)
-                optimizations['quality_increased'] = self.quality_level
-            
             # 减少帧跳过
             if self.frame_skip_count > 0:
                 self.frame_skip_count = max(0, self.frame_skip_count - 1)
@@ -268,8 +377,8 @@ class PerformanceOptimizer:
         
         return recommendations
     
-    def apply_optimizations(self, fps: float) -> Dict[str, Any]:
-        """应用优化策略"""
+    def apply_optimizations(self, fps: float, frame_time_ms: Optional[float] = None) -> Dict[str, Any]:
+        """应用优化策略（frame_time_ms为本帧实际工作耗时，不含帧率限制的等待）"""
         if not self.optimization_enabled:
             return {}
         
@@ -279,7 +388,7 @@ class PerformanceOptimizer:
         self.profiler.record_frame(fps)
         
         # 帧率优化
-        fps_opts = self.optimize_frame_rate(fps)
+        fps_opts = self.optimize_frame_rate(fps, frame_time_ms)
         if fps_opts:
             optimizations['fps'] = fps_opts
         
@@ -296,6 +405,7 @@ class PerformanceOptimizer:
             'optimization_enabled': self.optimization_enabled,
             'adaptive_quality': self.adaptive_quality,
             'quality_level': self.quality_level,
+            'quality_tier': self.quality_settings.name,
             'frame_skip_count': self.frame_skip_count,
             'target_fps': self.target_fps,
             'memory_pool_stats': self.memory_pool.get_stats()
@@ -353,6 +463,17 @@ if __name__ == "__main__":
         
         time.sleep(0.01)
     
+    # 质量调节器测试：模拟慢速设备（帧耗时24ms）后恢复（帧耗时8ms）
+    print("\n质量调节器测试:")
+    governor = QualityGovernor(target_fps=60)
+    simulated_time = 0.0
+    for frame in range(1200):
+        frame_time = 24.0 if frame < 600 else 8.0
+        simulated_time += 1.0 / 60
+        if governor.update(frame_time, now=simulated_time):
+            print(f"  帧 {frame}: 帧耗时={frame_time}ms -> 等级 {governor.settings.name} "
+                  f"(质量值 {governor.quality_level:.2f})")
+    
     # 显示性能摘要
     summary = optimizer.profiler.get_performance_summary()
     print("\n性能摘要:")
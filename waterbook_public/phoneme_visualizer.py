@@ -14,6 +14,86 @@ from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from collections import deque
 
+from font_service import get_font_service
+from quality_settings import QualitySettings, DEFAULT_QUALITY, scaled_count
+from text_cache import render_text
+
+# 笔画与粒子的存活时间（秒）
+STROKE_TTL = 3.0
+PARTICLE_TTL = 2.0
+
+# 粒子运动参数按60帧/秒标定，实际按时间步长换算
+REFERENCE_FRAME_RATE = 60.0
+PARTICLE_GRAVITY = 0.1
+MAX_SIMULATION_STEP = 0.1
+
+class TimedArrayPool:
+    """按创建时间排列的数组池
+
+    新条目总是追加在尾部，因此过期条目总在头部；压缩时用二分查找定位过期前缀，
+    整体前移一次，不逐条重建对象。可选的objects列表与数组行一一对应（如笔画精灵）。
+    """
+
+    def __init__(self, fields: Dict[str, Tuple[type, Tuple[int, ...]]], capacity: int = 256):
+        self.capacity = capacity
+        self.count = 0
+        self.arrays: Dict[str, np.ndarray] = {'created': np.zeros(capacity, dtype=np.float64)}
+        for name, (dtype, shape) in fields.items():
+            self.arrays[name] = np.zeros((capacity, *shape), dtype=dtype)
+        self.objects: List = []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def view(self, name: str) -> np.ndarray:
+        """获取字段的有效部分（视图，可原地修改）"""
+        return self.arrays[name][:self.count]
+
+    def _reserve(self, extra: int):
+        """容量不足时按倍数扩容"""
+        needed = self.count + extra
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, array in self.arrays.items():
+            grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            self.arrays[name] = grown
+        self.capacity = capacity
+
+    def append(self, n: int, created: float, objects: Optional[List] = None, **values):
+        """追加n个条目，values为各字段的标量或长度为n的数组"""
+        if n <= 0:
+            return
+        self._reserve(n)
+        rows = slice(self.count, self.count + n)
+        self.arrays['created'][rows] = created
+        for name, value in values.items():
+            self.arrays[name][rows] = value
+        if objects is not None:
+            self.objects.extend(objects)
+        self.count += n
+
+    def compact(self, now: float, ttl: float) -> int:
+        """移除存活时间超过ttl的条目，返回移除数量"""
+        if self.count == 0:
+            return 0
+        expired = int(np.searchsorted(self.view('created'), now - ttl, side='right'))
+        if expired:
+            remaining = self.count - expired
+            for array in self.arrays.values():
+                array[:remaining] = array[expired:self.count]
+            del self.objects[:expired]
+            self.count = remaining
+        return expired
+
+    def clear(self):
+        """清空池"""
+        self.count = 0
+        self.objects.clear()
+
 @dataclass
 class PhonemeFeature:
     """音素特征数据类"""
@@ -267,77 +347,41 @@ class PhonemeVisualizer:
         # 初始化音素分析器
         self.analyzer = CanalPhonemeAnalyzer()
         
-        # 初始化pygame字体
-        pygame.font.init()
-        
-        # 优先使用墨趣古风体
-        font_paths = [
-            "墨趣古风体.ttf",
-            "assets/fonts/墨趣古风体.ttf"
-        ]
-        
-        self.font = None  # 添加缺失的font属性
-        self.font_large = None
-        self.font_medium = None
-        self.font_small = None
-        
-        for font_path in font_paths:
-            try:
-                self.font = pygame.font.Font(font_path, 36)  # 初始化font属性
-                self.font_large = pygame.font.Font(font_path, 36)
-                self.font_medium = pygame.font.Font(font_path, 24)
-                self.font_small = pygame.font.Font(font_path, 18)
-                print(f"音素可视化字体加载成功: {font_path}")
-                break
-            except Exception as e:
-                continue
-        
-        # 如果没有加载成功，使用默认字体
-        if not self.font_large:
-            try:
-                self.font = pygame.font.Font("墨趣古风体.ttf", 36)  # 初始化font属性
-                self.font_large = pygame.font.Font("墨趣古风体.ttf", 36)
-                self.font_medium = pygame.font.Font("墨趣古风体.ttf", 24)
-                self.font_small = pygame.font.Font("墨趣古风体.ttf", 18)
-                print("音素可视化字体加载成功: 墨趣古风体.ttf")
-            except:
-                # 最后的备用方案
-                chinese_fonts = ['PingFang SC', 'STHeiti', 'SimHei', 'Microsoft YaHei']
-                for font_name in chinese_fonts:
-                    try:
-                        self.font = pygame.font.SysFont(font_name, 36)  # 初始化font属性
-                        self.font_large = pygame.font.SysFont(font_name, 36)
-                        self.font_medium = pygame.font.SysFont(font_name, 24)
-                        self.font_small = pygame.font.SysFont(font_name, 18)
-                        print(f"音素可视化使用系统字体: {font_name}")
-                        break
-                    except:
-                        continue
-                
-                if not self.font_large:
-                    self.font = pygame.font.Font(None, 36)  # 初始化font属性
-                    self.font_large = pygame.font.Font(None, 36)
-                    self.font_medium = pygame.font.Font(None, 24)
-                    self.font_small = pygame.font.Font(None, 18)
-                    print("音素可视化使用默认字体")
-                try:
-                    self.font = pygame.font.Font("墨趣古风体.ttf", 36)  # 初始化font属性
-                    self.font_large = pygame.font.Font("墨趣古风体.ttf", 36)
-                    self.font_medium = pygame.font.Font("墨趣古风体.ttf", 24)
-                    self.font_small = pygame.font.Font("墨趣古风体.ttf", 18)
-                except:
-                    self.font = pygame.font.Font(None, 36)  # 初始化font属性
-                    self.font_large = pygame.font.Font(None, 36)
-                    self.font_medium = pygame.font.Font(None, 24)
-                    self.font_small = pygame.font.Font(None, 18)
-        
-        # 水墨笔画效果
-        self.ink_strokes = []
-        self.stroke_particles = []
+        # 从字体服务获取共享字体
+        fonts = get_font_service()
+        self.font = fonts.pygame_font(36)
+        self.font_large = self.font
+        self.font_medium = fonts.pygame_font(24)
+        self.font_small = fonts.pygame_font(18)
+        
+        # 水墨笔画效果：笔画在创建时预先光栅化为包围盒精灵，每帧只调整透明度后贴图
+        self.stroke_pool = TimedArrayPool({
+            'base_alpha': (np.float32, ()),
+            'left': (np.int32, ()),
+            'top': (np.int32, ())
+        }, capacity=64)
+        self.particle_pool = TimedArrayPool({
+            'x': (np.float32, ()),
+            'y': (np.float32, ()),
+            'vx': (np.float32, ()),
+            'vy': (np.float32, ()),
+            'size': (np.float32, ()),
+            'base_alpha': (np.float32, ()),
+            'color': (np.uint8, (3,))
+        }, capacity=512)
+        self._last_simulation_time: Optional[float] = None
+        
+        # 粒子共享覆盖层：整个生命周期只分配一次，每帧清除上一帧用到的区域
+        self._particle_overlay: Optional[pygame.Surface] = None
+        self._particle_overlay_rect: Optional[pygame.Rect] = None
         
         # 性能优化：减少更新频率
         self.last_update_time = 0
-        self.update_interval = 0.1  # 每100ms更新一次，而不是每帧
+        self.base_update_interval = 0.1  # 每100ms更新一次，而不是每帧
+        self.update_interval = self.base_update_interval
+        
+        # 渲染质量设置（由性能优化器通过apply_quality下发）
+        self.quality: QualitySettings = DEFAULT_QUALITY
         
         # 性能优化：限制历史记录长度
         self.max_history_length = 10  # 从30减少到10
@@ -345,13 +389,25 @@ class PhonemeVisualizer:
         # 动画参数
         self.animation_time = 0
         
+        # 本帧与上一帧的绘制区域（供主循环局部刷新）
+        self.dirty_rects = []
+        self._previous_frame_rects = []
+        
+    def apply_quality(self, settings: QualitySettings):
+        """应用质量设置：笔画粒子预算、粒子尺寸与分析频率"""
+        self.quality = settings
+        self.update_interval = self.base_update_interval * settings.update_interval_scale
+    
     def update(self, audio_data: np.ndarray):
         """更新音素分析和可视化（性能优化版本）"""
+        current_time = time.time()
+        
+        # 粒子运动与过期清理每帧进行，不受分析频率限制
+        self._step_simulation(current_time)
+        
         if audio_data is None or len(audio_data) == 0:
             return
         
-        current_time = time.time()
-        
         # 性能优化：限制更新频率
         if current_time - self.last_update_time < self.update_interval:
             return
@@ -371,6 +427,23 @@ class PhonemeVisualizer:
         
         # 更新动画时间
         self.animation_time += self.update_interval
+    
+    def _step_simulation(self, current_time: float):
+        """推进笔画粒子运动并按存活时间压缩笔画池与粒子池"""
+        if self._last_simulation_time is None:
+            self._last_simulation_time = current_time
+        dt = min(MAX_SIMULATION_STEP, max(0.0, current_time - self._last_simulation_time))
+        self._last_simulation_time = current_time
+        
+        self.stroke_pool.compact(current_time, STROKE_TTL)
+        self.particle_pool.compact(current_time, PARTICLE_TTL)
+        
+        pool = self.particle_pool
+        if pool.count and dt > 0:
+            steps = dt * REFERENCE_FRAME_RATE
+            pool.view('x')[:] += pool.view('vx') * steps
+            pool.view('y')[:] += pool.view('vy') * steps
+            pool.view('vy')[:] += PARTICLE_GRAVITY * steps
         
     def _update_ink_strokes(self, phonemes: Dict[str, PhonemeFeature]):
         """更新水墨笔画效果"""
@@ -380,12 +453,6 @@ class PhonemeVisualizer:
         for phoneme_id, feature in phonemes.items():
             if feature.intensity > 0.2:  # 只为强度较高的音素创建笔画
                 self._create_ink_stroke(phoneme_id, feature, current_time)
-        
-        # 清理过期的笔画
-        self.ink_strokes = [stroke for stroke in self.ink_strokes 
-                           if current_time - stroke['created_time'] < 3.0]
-        self.stroke_particles = [particle for particle in self.stroke_particles 
-                               if current_time - particle['created_time'] < 2.0]
     
     def _create_ink_stroke(self, phoneme_id: str, feature: PhonemeFeature, current_time: float):
         """创建水墨笔画"""
@@ -396,138 +463,170 @@ class PhonemeVisualizer:
         freq_ratio = (feature.frequency_range[0] + feature.frequency_range[1]) / 2 / 8000
         y_offset = (0.5 - freq_ratio) * self.height * 0.4
         
-        # 创建笔画数据
-        stroke = {
-            'phoneme_id': phoneme_id,
-            'feature': feature,
-            'created_time': current_time,
-            'points': self._generate_stroke_points(feature, base_y + y_offset),
-            'alpha': 255,
-            'thickness': max(1, int(feature.intensity * 8))
-        }
+        points = self._generate_stroke_points(feature, base_y + y_offset)
+        thickness = max(1, int(feature.intensity * 8))
         
-        self.ink_strokes.append(stroke)
+        # 预先光栅化笔画（不透明颜色），渲染时通过表面透明度实现淡出
+        if len(points) > 1:
+            sprite, left, top = self._rasterize_stroke(points, feature.visual_color, thickness,
+                                                       feature.line_style == 'dotted')
+            self.stroke_pool.append(1, current_time, objects=[sprite],
+                                    base_alpha=255, left=left, top=top)
         
         # 创建笔画粒子效果
-        for _ in range(int(feature.intensity * 10)):
-            particle = {
-                'x': np.random.randint(50, self.width - 50),
-                'y': base_y + y_offset + np.random.randint(-20, 20),
-                'vx': np.random.uniform(-2, 2),
-                'vy': np.random.uniform(-1, 1),
-                'size': np.random.uniform(1, 4),
-                'alpha': int(feature.intensity * 200),
-                'color': feature.visual_color,
-                'created_time': current_time,
-                'line_style': feature.line_style
-            }
-            self.stroke_particles.append(particle)
+        count = scaled_count(int(feature.intensity * 10), self.quality)
+        if count > 0:
+            self.particle_pool.append(
+                count, current_time,
+                x=np.random.randint(50, self.width - 50, count),
+                y=base_y + y_offset + np.random.randint(-20, 20, count),
+                vx=np.random.uniform(-2, 2, count),
+                vy=np.random.uniform(-1, 1, count),
+                size=np.maximum(1.0, np.random.uniform(1, 4, count) * self.quality.sprite_scale),
+                base_alpha=int(feature.intensity * 200),
+                color=feature.visual_color
+            )
     
-    def _generate_stroke_points(self, feature: PhonemeFeature, base_y: float) -> List[Tuple[int, int]]:
-        """根据音素特征生成笔画点"""
-        points = []
+    @staticmethod
+    def _rasterize_stroke(points: np.ndarray, color: Tuple[int, int, int], thickness: int,
+                          dotted: bool) -> Tuple[pygame.Surface, int, int]:
+        """将笔画绘制到包围盒大小的精灵上，返回(精灵, 左, 上)"""
+        pad = thickness + 1
+        left = int(points[:, 0].min()) - pad
+        top = int(points[:, 1].min()) - pad
+        width = int(points[:, 0].max()) - left + pad + 1
+        height = int(points[:, 1].max()) - top + pad + 1
+        
+        sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+        local_points = (points - (left, top)).tolist()
+        if dotted:
+            # 点状线条：每隔一个点绘制
+            for point in local_points[::2]:
+                pygame.draw.circle(sprite, color, point, thickness)
+        else:
+            pygame.draw.lines(sprite, color, False, local_points, thickness)
+        return sprite, left, top
+    
+    def _generate_stroke_points(self, feature: PhonemeFeature, base_y: float) -> np.ndarray:
+        """根据音素特征生成笔画点，返回(N, 2)整数坐标数组"""
         stroke_length = int(feature.intensity * 200 + 50)
         
         if feature.line_style == 'flowing':
             # 流动线条 - 适合水流声、风声
-            for i in range(stroke_length):
-                x = 50 + i * 2
-                y = base_y + math.sin(i * 0.1 + self.animation_time * 2) * feature.intensity * 20
-                points.append((int(x), int(y)))
-                
+            i = np.arange(stroke_length)
+            xs = 50 + i * 2
+            ys = base_y + np.sin(i * 0.1 + self.animation_time * 2) * feature.intensity * 20
+            
         elif feature.line_style == 'sharp':
             # 尖锐线条 - 适合水花声、船笛声
-            for i in range(0, stroke_length, 5):
-                x = 50 + i * 3
-                y = base_y + ((-1) ** (i // 5)) * feature.intensity * 15
-                points.append((int(x), int(y)))
-                
+            i = np.arange(0, stroke_length, 5)
+            xs = 50 + i * 3
+            ys = base_y + np.where((i // 5) % 2 == 0, 1.0, -1.0) * feature.intensity * 15
+            
         elif feature.line_style == 'dotted':
             # 点状线条 - 适合鸟鸣声
-            for i in range(0, stroke_length, 8):
-                x = 50 + i * 2
-                y = base_y + math.sin(i * 0.2) * feature.intensity * 10
-                points.append((int(x), int(y)))
-                
+            i = np.arange(0, stroke_length, 8)
+            xs = 50 + i * 2
+            ys = base_y + np.sin(i * 0.2) * feature.intensity * 10
+            
         elif feature.line_style == 'thick':
             # 粗线条 - 适合引擎声
-            for i in range(stroke_length):
-                x = 50 + i
-                y = base_y + math.sin(i * 0.05) * feature.intensity * 5
-                points.append((int(x), int(y)))
+            i = np.arange(stroke_length)
+            xs = 50 + i
+            ys = base_y + np.sin(i * 0.05) * feature.intensity * 5
+            
+        else:
+            return np.zeros((0, 2), dtype=np.int32)
         
-        return points
+        return np.stack([xs, ys.astype(np.int32)], axis=1).astype(np.int32)
 
     def render(self, screen: pygame.Surface):
         """渲染音素可视化 - 水墨线条风格"""
+        frame_rects = []
+        
         # 渲染水墨笔画
-        self._render_ink_strokes(screen)
+        frame_rects.extend(self._render_ink_strokes(screen))
         
         # 渲染笔画粒子
-        self._render_stroke_particles(screen)
+        frame_rects.extend(self._render_stroke_particles(screen))
         
         # 渲染音素信息面板（简化版）
-        self._render_phoneme_panel_ink_style(screen)
+        frame_rects.extend(self._render_phoneme_panel_ink_style(screen))
         
-    def _render_ink_strokes(self, screen: pygame.Surface):
-        """渲染水墨笔画"""
-        current_time = time.time()
+        # 记录脏矩形：本帧绘制区域加上一帧绘制区域
+        self.dirty_rects = frame_rects + self._previous_frame_rects
+        self._previous_frame_rects = frame_rects
         
-        for stroke in self.ink_strokes:
-            age = current_time - stroke['created_time']
-            # 笔画随时间淡化
-            alpha = max(0, int(stroke['alpha'] * (1 - age / 3.0)))
-            
-            if len(stroke['points']) > 1 and alpha > 0:
-                # 创建带透明度的表面
-                stroke_surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                
-                # 根据线条风格绘制
-                if stroke['feature'].line_style == 'dotted':
-                    # 点状线条
-                    for point in stroke['points'][::2]:  # 每隔一个点绘制
-                        pygame.draw.circle(stroke_surface, 
-                                         (*stroke['feature'].visual_color, alpha),
-                                         point, stroke['thickness'])
-                else:
-                    # 连续线条
-                    if len(stroke['points']) > 1:
-                        pygame.draw.lines(stroke_surface, 
-                                        (*stroke['feature'].visual_color, alpha),
-                                        False, stroke['points'], stroke['thickness'])
-                
-                screen.blit(stroke_surface, (0, 0))
+    def _render_ink_strokes(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """渲染水墨笔画，返回绘制区域"""
+        pool = self.stroke_pool
+        if pool.count == 0:
+            return []
+        
+        # 笔画随时间淡化（批量计算透明度）
+        ages = time.time() - pool.view('created')
+        alphas = np.clip(pool.view('base_alpha') * (1 - ages / STROKE_TTL), 0, 255).astype(np.int32)
+        
+        rects = []
+        for sprite, alpha, left, top in zip(pool.objects, alphas.tolist(),
+                                            pool.view('left').tolist(), pool.view('top').tolist()):
+            if alpha <= 0:
+                continue
+            # 精灵归笔画所有，可直接修改表面透明度
+            sprite.set_alpha(alpha)
+            rects.append(screen.blit(sprite, (left, top)))
+        
+        return rects
     
-    def _render_stroke_particles(self, screen: pygame.Surface):
-        """渲染笔画粒子效果"""
-        current_time = time.time()
+    def _get_particle_overlay(self) -> pygame.Surface:
+        """获取粒子共享覆盖层，并清除上一帧绘制过的区域"""
+        if self._particle_overlay is None:
+            self._particle_overlay = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        elif self._particle_overlay_rect is not None:
+            self._particle_overlay.fill((0, 0, 0, 0), self._particle_overlay_rect)
+        self._particle_overlay_rect = None
+        return self._particle_overlay
+    
+    def _render_stroke_particles(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """渲染笔画粒子效果，返回绘制区域"""
+        overlay = self._get_particle_overlay()
+        pool = self.particle_pool
+        if pool.count == 0:
+            return []
         
-        for particle in self.stroke_particles:
-            age = current_time - particle['created_time']
-            # 粒子随时间淡化和移动
-            alpha = max(0, int(particle['alpha'] * (1 - age / 2.0)))
-            
-            if alpha > 0:
-                # 更新粒子位置
-                particle['x'] += particle['vx']
-                particle['y'] += particle['vy']
-                particle['vy'] += 0.1  # 重力效果
-                
-                # 绘制粒子
-                particle_surface = pygame.Surface((particle['size'] * 2, particle['size'] * 2), pygame.SRCALPHA)
-                pygame.draw.circle(particle_surface, 
-                                 (*particle['color'], alpha),
-                                 (int(particle['size']), int(particle['size'])), 
-                                 int(particle['size']))
-                
-                screen.blit(particle_surface, 
-                          (int(particle['x'] - particle['size']), 
-                           int(particle['y'] - particle['size'])))
+        # 粒子随时间淡化（运动已在update中推进）
+        ages = time.time() - pool.view('created')
+        alphas = (pool.view('base_alpha') * (1 - ages / PARTICLE_TTL)).astype(np.int32)
+        visible = alphas > 0
+        if not visible.any():
+            return []
+        
+        xs = pool.view('x')[visible].astype(np.int32)
+        ys = pool.view('y')[visible].astype(np.int32)
+        radii = pool.view('size')[visible].astype(np.int32)
+        colors = pool.view('color')[visible]
+        
+        # 所有粒子画到同一覆盖层，再只贴回粒子包围盒区域
+        for x, y, radius, alpha, (r, g, b) in zip(xs.tolist(), ys.tolist(), radii.tolist(),
+                                                   alphas[visible].tolist(), colors.tolist()):
+            pygame.draw.circle(overlay, (r, g, b, alpha), (x, y), radius)
+        
+        left = int((xs - radii).min())
+        top = int((ys - radii).min())
+        right = int((xs + radii).max()) + 1
+        bottom = int((ys + radii).max()) + 1
+        bounds = pygame.Rect(left, top, right - left, bottom - top).clip(overlay.get_rect())
+        if bounds.width == 0 or bounds.height == 0:
+            return []
+        
+        self._particle_overlay_rect = bounds
+        return [screen.blit(overlay, bounds.topleft, bounds)]
     
-    def _render_phoneme_panel_ink_style(self, screen: pygame.Surface):
-        """渲染水墨风格的音素信息面板"""
+    def _render_phoneme_panel_ink_style(self, screen: pygame.Surface) -> List[pygame.Rect]:
+        """渲染水墨风格的音素信息面板，返回绘制区域"""
+        rects = []
         if not self.font or not self.font_small:
-            return
+            return rects
             
         try:
             # 调整位置避免与E2录制覆盖层重叠
@@ -548,10 +647,10 @@ class PhonemeVisualizer:
             pygame.draw.rect(panel_surface, (50, 50, 50, 150), 
                            (0, 0, panel_width, panel_height), 2)
             
-            screen.blit(panel_surface, (panel_x, panel_y))
+            rects.append(screen.blit(panel_surface, (panel_x, panel_y)))
             
             # 标题 - 使用墨色
-            title_text = self.font.render("运河音韵", True, (30, 30, 30))
+            title_text = render_text(self.font, "运河音韵", True, (30, 30, 30))
             screen.blit(title_text, (panel_x + 10, panel_y + 10))
             
             # 显示主要音素及其拟声词
@@ -560,7 +659,7 @@ class PhonemeVisualizer:
             
             for i, phoneme in enumerate(dominant_phonemes):
                 # 音素名称 - 使用对应的墨色深浅
-                name_text = self.font_small.render(
+                name_text = render_text(self.font_small, 
                     f"{phoneme.name}", True, phoneme.visual_color
                 )
                 screen.blit(name_text, (panel_x + 10, panel_y + y_offset))
@@ -575,8 +674,8 @@ class PhonemeVisualizer:
                 if phoneme_info and 'onomatopoeia' in phoneme_info:
                     # 随机选择一个拟声词
                     onomatopoeia = phoneme_info['onomatopoeia'][int(self.animation_time) % len(phoneme_info['onomatopoeia'])]
-                    ono_text = self.font_small.render(f"「{onomatopoeia}」", True, (80, 80, 80))
-                    screen.blit(ono_text, (panel_x + 150, panel_y + y_offset))
+                    ono_text = render_text(self.font_small, f"「{onomatopoeia}」", True, (80, 80, 80))
+                    rects.append(screen.blit(ono_text, (panel_x + 150, panel_y + y_offset)))
                 
                 # 强度线条 - 水墨风格，优化线条粗细
                 line_length = int(phoneme.intensity * 80)
@@ -596,6 +695,8 @@ class PhonemeVisualizer:
                 
         except Exception as e:
             print(f"音素面板渲染错误: {e}")
+        
+        return rects
 
     def _render_phoneme_spectrum(self, screen: pygame.Surface):
         """渲染音素频谱图"""
@@ -615,7 +716,7 @@ class PhonemeVisualizer:
                         (spectrum_x, spectrum_y, spectrum_width, spectrum_height), 2)
         
         # 标题
-        title_text = self.font.render("音素频谱", True, (255, 255, 255))
+        title_text = render_text(self.font, "音素频谱", True, (255, 255, 255))
         screen.blit(title_text, (spectrum_x + 10, spectrum_y + 10))
         
         # 绘制频谱条
@@ -643,10 +744,55 @@ class PhonemeVisualizer:
                 pygame.draw.rect(screen, (80, 80, 80), 
                                (bar_x, bar_y, bar_width - 2, bar_height), 1)
 
+def benchmark_stroke_rendering(width: int = 1280, height: int = 720,
+                               stroke_counts: Tuple[int, ...] = (10, 50, 100),
+                               frames: int = 120) -> Dict[int, float]:
+    """测量不同并发笔画数量下的单帧更新+渲染耗时，返回{笔画数: 平均毫秒}"""
+    screen = pygame.display.set_mode((width, height))
+    styles = ['flowing', 'sharp', 'dotted', 'thick']
+    results = {}
+    
+    for stroke_count in stroke_counts:
+        visualizer = PhonemeVisualizer(width, height)
+        start_time = time.time()
+        for i in range(stroke_count):
+            feature = PhonemeFeature(
+                name=f"测试{i}",
+                frequency_range=(200 + i * 60 % 6000, 800 + i * 60 % 6000),
+                intensity=0.4 + 0.5 * (i % 7) / 7,
+                duration=0.5,
+                confidence=0.8,
+                visual_color=(40 + i % 5 * 20, 40 + i % 3 * 25, 50),
+                line_style=styles[i % len(styles)]
+            )
+            # 创建时间集中在最近，保证基准测试期间笔画全部存活
+            visualizer._create_ink_stroke(f"test_{i}", feature, start_time + i * 1e-4)
+        
+        elapsed = 0.0
+        for _ in range(frames):
+            start = time.perf_counter()
+            visualizer.update(None)
+            visualizer._render_ink_strokes(screen)
+            visualizer._render_stroke_particles(screen)
+            elapsed += time.perf_counter() - start
+        
+        results[stroke_count] = elapsed / frames * 1000
+        print(f"{stroke_count} 条笔画 / {len(visualizer.particle_pool)} 个粒子: "
+              f"{results[stroke_count]:.2f} ms/帧")
+    
+    return results
+
 if __name__ == "__main__":
+    import sys
+    
     # 测试代码
     pygame.init()
     
+    if "--benchmark" in sys.argv:
+        benchmark_stroke_rendering()
+        pygame.quit()
+        sys.exit(0)
+    
     width, height = 1280, 720
     screen = pygame.display.set_mode((width, height))
     pygame.display.set_caption("运河音素可视化测试")
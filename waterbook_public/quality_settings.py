@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+渲染质量等级约定
+性能优化器按帧耗时选择质量等级，各可视化器通过apply_quality(settings)接收并调整自身开销
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+@dataclass(frozen=True)
+class QualitySettings:
+    """渲染质量设置（各可视化器共同遵守的约定）"""
+    tier: int                       # 等级索引，0为最高质量
+    name: str
+    particle_budget: float          # 粒子预算（相对满额粒子数的比例，0-1）
+    sprite_scale: float             # 精灵/粒子绘制尺寸比例
+    update_interval_scale: float    # 更新间隔倍数（>=1，越大更新越少）
+    glow_effects: bool              # 光晕、晕染等多层叠加效果
+    ripples: bool                   # 水面涟漪等装饰效果
+    reflections: bool               # 频谱倒影等反射效果
+    render_scale: float             # 场景离屏渲染分辨率比例（<1时渲染后放大到屏幕）
+
+# 质量等级表，由高到低
+QUALITY_TIERS: Tuple[QualitySettings, ...] = (
+    QualitySettings(0, "高", 1.0, 1.0, 1.0, True, True, True, 1.0),
+    QualitySettings(1, "中", 0.75, 1.0, 1.0, False, True, True, 1.0),
+    QualitySettings(2, "低", 0.5, 0.75, 1.5, False, False, True, 0.75),
+    QualitySettings(3, "极简", 0.3, 0.5, 2.0, False, False, False, 0.5),
+)
+
+DEFAULT_QUALITY = QUALITY_TIERS[0]
+
+def scaled_count(count: int, settings: QualitySettings, minimum: int = 0) -> int:
+    """按粒子预算缩放数量"""
+    return max(minimum, int(count * settings.particle_budget))
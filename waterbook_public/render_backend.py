@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+艺术渲染后端
+将水墨封面渲染放到独立的工作进程中执行，避免PIL/NumPy长时间持有GIL拖慢pygame主循环与Web服务。
+工作进程启动时预加载字体与宣纸纹理（纹理经宣纸服务的磁盘缓存内存映射载入），
+任务输入为普通数据类，输出为文件路径。
+预览封面走独立的优先通道（单独的工作进程），不排在完整分辨率细化、风格预渲染与视频任务之后。
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# 默认工作进程数（常规通道 / 预览优先通道）
+DEFAULT_RENDER_WORKERS = 2
+DEFAULT_PREVIEW_WORKERS = 1
+
+@dataclass
+class CoverJob:
+    """封面渲染任务（可跨进程传递的普通数据）"""
+    text: str
+    style: str
+    brush_thickness: float
+    ink_density: float
+    flywhite_intensity: float
+    ink_blur: float
+    ink_spread: float
+    canvas_size: Tuple[int, int]              # 渲染画布大小
+    output_path: str
+    output_size: Optional[Tuple[int, int]] = None  # 保存前缩放到的尺寸（预览放大到完整尺寸）
+    seed: Optional[int] = None                # 渲染随机种子（同一种子、同一画布的渲染结果一致）
+
+@dataclass
+class VideoJob:
+    """动画视频渲染任务：以封面任务的参数为终态，逐帧流式编码为一种或多种格式
+
+    cover.output_path为首个格式的输出路径，其余格式仅替换扩展名。
+    """
+    cover: CoverJob
+    fps: int
+    duration: float
+    settings: Tuple[Any, ...]                 # 各输出格式的EncoderSettings
+    final_layer_path: Optional[str] = None    # 完成态画面（动画基础图层）：存在时直接读取，否则渲染后写入
+
+# 工作线程/进程内的渲染器缓存（按画布大小），线程后端下每个线程各自一份
+_worker_state = threading.local()
+
+def _init_worker(canvas_sizes: Tuple[Tuple[int, int], ...]):
+    """工作进程初始化：预热各画布大小的渲染器（宣纸纹理来自宣纸服务的缓存）"""
+    try:
+        for canvas_size in canvas_sizes:
+            _get_renderer(canvas_size)
+    except Exception as e:
+        print(f"渲染进程初始化失败: {e}")
+
+def _get_renderer(canvas_size: Tuple[int, int]):
+    from ink_wash_pygame import InkWashRenderer
+
+    renderers = getattr(_worker_state, 'renderers', None)
+    if renderers is None:
+        renderers = _worker_state.renderers = {}
+    renderer = renderers.get(tuple(canvas_size))
+    if renderer is None:
+        renderer = renderers[tuple(canvas_size)] = InkWashRenderer(canvas_size=canvas_size)
+    return renderer
+
+def _ping() -> int:
+    """空任务，用于预先拉起工作进程"""
+    return os.getpid()
+
+def render_cover_job(job: CoverJob) -> str:
+    """执行封面渲染任务，先写临时文件再替换，返回封面路径"""
+    from PIL import Image
+
+    renderer = _get_renderer(job.canvas_size)
+    image = renderer.render_calligraphy(
+        job.text, job.style,
+        brush_thickness=job.brush_thickness,
+        ink_density=job.ink_density,
+        flywhite_intensity=job.flywhite_intensity,
+        ink_blur=job.ink_blur,
+        ink_spread=job.ink_spread,
+        seed=job.seed
+    )
+    if job.output_size is not None and tuple(job.output_size) != image.size:
+        image = image.resize(tuple(job.output_size), Image.BICUBIC)
+
+    output_path = Path(job.output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    image.save(temp_path, format='PNG')
+    os.replace(temp_path, output_path)
+    return str(output_path)
+
+def render_video_job(job: VideoJob) -> Dict[str, str]:
+    """执行动画视频渲染任务，返回{格式: 路径}（按job.settings顺序）"""
+    from video_encoder import animation_path_for
+
+    from PIL import Image
+
+    renderer = _get_renderer(job.cover.canvas_size)
+    outputs = [(str(animation_path_for(job.cover.output_path, settings.format)), settings)
+               for settings in job.settings]
+
+    # CoverJob带有动画参数计算所需的各项属性（笔触粗细、墨浓度等）
+    final_image = None
+    if job.final_layer_path:
+        final_path = Path(job.final_layer_path)
+        if final_path.exists():
+            with Image.open(final_path) as image:
+                final_image = image.convert('RGB')
+        else:
+            final_image = renderer.render_final_frame(job.cover.text, job.cover.style, job.cover)
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = final_path.with_name(final_path.name + ".tmp")
+            final_image.save(temp_path, format='PNG')
+            os.replace(temp_path, final_path)
+    layers = renderer.build_animation_layers(job.cover.text, job.cover.style, job.cover, final_image)
+
+    paths = renderer.render_animation_outputs(job.cover.text, job.cover.style, job.cover, outputs,
+                                              job.fps, job.duration, layers)
+    return {settings.format: path for settings, path in zip(job.settings, paths)}
+
+class RenderBackend:
+    """渲染后端接口"""
+
+    name = "base"
+
+    def submit(self, fn: Callable, *args) -> Future:
+        raise NotImplementedError
+
+    def submit_preview(self, fn: Callable, *args) -> Future:
+        """提交预览任务（优先通道），默认与常规任务同一队列"""
+        return self.submit(fn, *args)
+
+    def shutdown(self):
+        pass
+
+class RenderTaskGroup(RenderBackend):
+    """一组相关的渲染任务：经所属后端提交，可整体取消（落选风格的预渲染不再占用工作进程）"""
+
+    def __init__(self, backend: RenderBackend):
+        self.backend = backend
+        self.name = backend.name
+        self._lock = threading.Lock()
+        self._futures = set()
+        self.cancelled = False
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self._add(lambda: self.backend.submit(fn, *args))
+
+    def submit_preview(self, fn: Callable, *args) -> Future:
+        return self._add(lambda: self.backend.submit_preview(fn, *args))
+
+    def _add(self, submit: Callable[[], Future]) -> Future:
+        with self._lock:
+            if self.cancelled:
+                # 已取消的分组不再提交新任务，返回已取消的Future
+                future = Future()
+                future.cancel()
+                return future
+            future = submit()
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def cancel(self):
+        """取消分组内排队中的任务（已在执行的任务无法中断），之后提交的任务直接取消"""
+        with self._lock:
+            self.cancelled = True
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+class ThreadRenderBackend(RenderBackend):
+    """线程后端（与主循环共享GIL，用于无法创建子进程的环境）"""
+
+    name = "thread"
+
+    def __init__(self, workers: int = DEFAULT_RENDER_WORKERS, preview_workers: int = DEFAULT_PREVIEW_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="art-render")
+        self._preview_executor = ThreadPoolExecutor(max_workers=max(1, preview_workers),
+                                                    thread_name_prefix="art-preview")
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self._executor.submit(fn, *args)
+
+    def submit_preview(self, fn: Callable, *args) -> Future:
+        return self._preview_executor.submit(fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self._preview_executor.shutdown(wait=False)
+
+# 创建工作进程期间替换__main__的锁
+_spawn_main_lock = threading.Lock()
+
+@contextmanager
+def _slim_spawn_main():
+    """spawn的子进程会以__mp_main__重新导入主模块（app.py及pygame等依赖），
+    创建工作进程期间把__main__临时换成本模块，子进程只导入渲染所需的轻量模块"""
+    with _spawn_main_lock:
+        main_module = sys.modules.get('__main__')
+        sys.modules['__main__'] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            if main_module is not None:
+                sys.modules['__main__'] = main_module
+
+class ProcessRenderBackend(RenderBackend):
+    """进程后端 - 预热的工作进程池（常规通道与预览优先通道各一个），渲染不占用主进程GIL"""
+
+    name = "process"
+
+    def __init__(self, workers: int = DEFAULT_RENDER_WORKERS, canvas_sizes: Tuple[Tuple[int, int], ...] = (),
+                 preview_workers: int = DEFAULT_PREVIEW_WORKERS):
+        # 使用spawn：主进程已初始化pygame/SDL，fork出的子进程继承其线程状态不安全
+        context = get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(tuple(canvas_sizes),)
+        )
+        self._preview_executor = ProcessPoolExecutor(
+            max_workers=max(1, preview_workers),
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(tuple(canvas_sizes),)
+        )
+
+        # 已提交、尚未结束的任务（关闭时取消排队中的任务）
+        self._pending_lock = threading.Lock()
+        self._pending = set()
+        
+        # 预先拉起全部工作进程（进程在submit时创建），首个任务无需等待进程启动与字体加载
+        with _slim_spawn_main():
+            warmups = ([self._executor.submit(_ping) for _ in range(workers)] +
+                       [self._preview_executor.submit(_ping) for _ in range(max(1, preview_workers))])
+        for future in warmups:
+            future.add_done_callback(self._report_warmup_error)
+
+    @staticmethod
+    def _report_warmup_error(future: Future):
+        if future.exception() is not None:
+            print(f"渲染进程预热失败: {future.exception()}")
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self._track(self._executor.submit(fn, *args))
+
+    def submit_preview(self, fn: Callable, *args) -> Future:
+        return self._track(self._preview_executor.submit(fn, *args))
+
+    def _track(self, future: Future) -> Future:
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future: Future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def shutdown(self):
+        # Python 3.8的Executor.shutdown不支持cancel_futures，自行取消排队中的任务
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        self._preview_executor.shutdown(wait=False)
+
+def create_render_backend(config: Dict, canvas_sizes: Tuple[Tuple[int, int], ...] = ()) -> RenderBackend:
+    """按配置创建渲染后端（generation.render_backend: process | thread），进程后端失败时退回线程后端"""
+    kind = config.get('render_backend', 'process')
+    workers = config.get('render_workers', DEFAULT_RENDER_WORKERS)
+    preview_workers = config.get('render_preview_workers', DEFAULT_PREVIEW_WORKERS)
+
+    if kind == 'process':
+        try:
+            backend = ProcessRenderBackend(workers, canvas_sizes, preview_workers)
+            print(f"艺术渲染使用进程后端（{workers}个工作进程，{preview_workers}个预览进程）")
+            return backend
+        except Exception as e:
+            print(f"进程渲染后端启动失败，改用线程后端: {e}")
+
+    print(f"艺术渲染使用线程后端（{workers}个线程，{preview_workers}个预览线程）")
+    return ThreadRenderBackend(workers, preview_workers)
+
+def benchmark_frame_jitter(backend_kind: str, renders: int = 4, frame_budget: float = 1 / 60) -> Tuple[float, float]:
+    """模拟主循环在后台渲染期间的帧耗时，返回(平均毫秒, 最大毫秒)"""
+    from ink_wash_pygame import DEFAULT_CANVAS_SIZE
+
+    backend = create_render_backend({'render_backend': backend_kind}, (DEFAULT_CANVAS_SIZE,))
+    # 等待预热完成，只测量渲染本身对主循环的影响
+    backend.submit(_ping).result()
+
+    output_dir = Path("output") / "benchmark"
+    futures = [backend.submit(render_cover_job, CoverJob(
+        "水", style, 0.6, 0.8, 0.4, 0.3, 0.2, DEFAULT_CANVAS_SIZE, str(output_dir / f"{backend_kind}_{i}.png")
+    )) for i, style in enumerate(["行书", "篆书", "水墨晕染"] * renders)]
+
+    frame_times = []
+    while not all(future.done() for future in futures):
+        start = time.perf_counter()
+        # 模拟一帧的Python侧工作
+        sum(i * i for i in range(20000))
+        elapsed = time.perf_counter() - start
+        frame_times.append(elapsed)
+        time.sleep(max(0.0, frame_budget - elapsed))
+
+    backend.shutdown()
+    if not frame_times:
+        return 0.0, 0.0
+    return sum(frame_times) / len(frame_times) * 1000, max(frame_times) * 1000
+
+def benchmark_preview_latency(backend_kind: str, queued_jobs: int = 6) -> float:
+    """常规通道排满完整分辨率任务时，预览任务的等待+渲染耗时（毫秒）"""
+    from ink_wash_pygame import DEFAULT_CANVAS_SIZE
+
+    preview_size = (DEFAULT_CANVAS_SIZE[0] * 2 // 5, DEFAULT_CANVAS_SIZE[1] * 2 // 5)
+    backend = create_render_backend({'render_backend': backend_kind}, (DEFAULT_CANVAS_SIZE, preview_size))
+    backend.submit(_ping).result()
+    backend.submit_preview(_ping).result()
+
+    output_dir = Path("output") / "benchmark"
+    backlog = [backend.submit(render_cover_job, CoverJob(
+        "水", "行书", 0.6, 0.8, 0.4, 0.3, 0.2, DEFAULT_CANVAS_SIZE, str(output_dir / f"backlog_{i}.png")
+    )) for i in range(queued_jobs)]
+
+    start = time.perf_counter()
+    backend.submit_preview(render_cover_job, CoverJob(
+        "水", "行书", 0.24, 0.8, 0.4, 0.12, 0.2, preview_size, str(output_dir / "preview.png"), DEFAULT_CANVAS_SIZE
+    )).result()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for future in backlog:
+        future.result()
+    backend.shutdown()
+    return elapsed
+
+if __name__ == "__main__":
+    for kind in ("thread", "process"):
+        mean_ms, max_ms = benchmark_frame_jitter(kind)
+        print(f"{kind}: 主循环帧耗时 平均 {mean_ms:.2f} ms，最大 {max_ms:.2f} ms")
+        print(f"{kind}: 常规通道积压时预览耗时 {benchmark_preview_latency(kind):.0f} ms")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景点云缓存
+将生成好的E2运河场景（结构化点云与粒子系统）按布局种子烘焙到磁盘，
+下次启动时以内存映射方式加载，跳过逐粒子的场景生成
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Iterable
+
+import numpy as np
+
+# 场景缓存格式版本（缓存文件布局变化时递增）
+SCENE_CACHE_FORMAT_VERSION = 1
+
+# 默认缓存目录
+DEFAULT_SCENE_CACHE_DIR = Path(__file__).parent / "cache" / "scenes"
+
+# 加载后需要在运行时修改的数组（以写时复制方式映射，不会写回磁盘）
+_MUTABLE_ARRAYS = {
+    'structured_x', 'structured_y', 'structured_size',
+    'structured_velocity_x', 'structured_velocity_y', 'structured_intensity'
+}
+
+class SceneCache:
+    """场景点云磁盘缓存
+
+    每个布局保存为一个目录，目录名由(宽, 高, 模板版本, 种子)决定，
+    目录内每个数组为一个.npy文件，便于用np.load(mmap_mode=...)直接内存映射
+    （np.load无法内存映射.npz归档中的成员）。
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_SCENE_CACHE_DIR
+
+    @staticmethod
+    def make_key(width: int, height: int, template_version: int, seed: int) -> str:
+        """生成缓存键"""
+        return f"scene_{width}x{height}_t{template_version}_s{seed}_f{SCENE_CACHE_FORMAT_VERSION}"
+
+    def _layout_dir(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def has(self, key: str) -> bool:
+        """检查布局是否已缓存"""
+        return (self._layout_dir(key) / "manifest.json").exists()
+
+    def save(self, key: str, arrays: Dict[str, np.ndarray]) -> bool:
+        """保存场景数组，写入完成后才写清单文件，避免读到半成品"""
+        layout_dir = self._layout_dir(key)
+        try:
+            layout_dir.mkdir(parents=True, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(layout_dir / f"{name}.npy", np.ascontiguousarray(array))
+
+            manifest = {
+                'key': key,
+                'arrays': sorted(arrays.keys()),
+                'created': time.time()
+            }
+            with open(layout_dir / "manifest.json", 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            return True
+        except Exception as e:
+            print(f"场景缓存保存失败: {e}")
+            return False
+
+    def load(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """以内存映射方式加载场景数组，缓存缺失或损坏时返回None"""
+        layout_dir = self._layout_dir(key)
+        manifest_path = layout_dir / "manifest.json"
+        if not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            arrays = {}
+            for name in manifest['arrays']:
+                # 运行时会修改的数组使用写时复制映射，其余只读映射
+                mode = 'c' if name in _MUTABLE_ARRAYS else 'r'
+                arrays[name] = np.load(layout_dir / f"{name}.npy", mmap_mode=mode)
+            return arrays
+        except Exception as e:
+            print(f"场景缓存加载失败: {e}")
+            return None
+
+def prebake_layouts(width: int, height: int, seeds: Iterable[int],
+                    cache_dir: Optional[Path] = None) -> Tuple[int, float]:
+    """预先烘焙多个场景布局，返回(烘焙数量, 耗时秒数)"""
+    from canal_visualizer import CanalVisualizer
+
+    start = time.perf_counter()
+    count = 0
+    for seed in seeds:
+        CanalVisualizer(width, height, layout_seed=seed, scene_cache=SceneCache(cache_dir))
+        count += 1
+    return count, time.perf_counter() - start
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="预烘焙E2运河场景布局")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2, 3])
+    args = parser.parse_args()
+
+    baked, elapsed = prebake_layouts(args.width, args.height, args.seeds)
+    print(f"已烘焙 {baked} 个场景布局，耗时 {elapsed:.2f} 秒")
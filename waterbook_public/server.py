@@ -5,28 +5,227 @@
 支持响应式设计，适配手机和平板访问
 """
 
+import hashlib
+import io
 import os
 import json
 import socket
 import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 from http.server import HTTPServer, SimpleHTTPRequestHandler, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Optional, Tuple
 import mimetypes
 from datetime import datetime
 
 from generator import GeneratedArt
+from video_encoder import (ANIMATION_FORMATS, EncoderSettings, ffmpeg_available,
+                           negotiate_animation_format, transcode_animation)
+
+# 默认提供的动画格式（按优先顺序，Accept同等接受时取靠前者）
+DEFAULT_ANIMATION_FORMATS = ['webp', 'apng', 'mp4']
+
+# 并发服务默认值：工作线程数、最大连接数（含排队）、keep-alive空闲超时与传输超时（秒）
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_MAX_CONNECTIONS = 64
+DEFAULT_KEEPALIVE_TIMEOUT = 5.0
+DEFAULT_TRANSFER_TIMEOUT = 60.0
+
+# 带版本号的作品链接（?v=内容哈希）内容不变，可长期缓存；其余文件每次用ETag向服务器确认
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# 发布作品时计算ETag的文件
+PUBLISHED_FILES = ['meta.json', 'cover.png', 'raw.wav', 'loop.png'] + [
+    f"loop{fmt.extension}" for fmt in ANIMATION_FORMATS.values()]
+
+# 分块发送文件时的块大小（无法使用sendfile时）
+FILE_CHUNK_SIZE = 64 * 1024
+
+# 连接数超限时直接返回的响应
+SERVICE_UNAVAILABLE_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"Content-Length: 4\r\n"
+    b"Retry-After: 1\r\n"
+    b"Connection: close\r\n\r\n"
+    b"busy"
+)
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """解析单区间Range请求头，返回闭区间(起, 止)
+
+    无Range头、格式不合法或多区间请求时返回None（按完整文件响应），区间无法满足时抛出ValueError。
+    """
+    if not header:
+        return None
+    unit, _, spec = header.strip().partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    
+    first, dash, last = spec.strip().partition('-')
+    if not dash:
+        return None
+    first, last = first.strip(), last.strip()
+    if not (first.isdigit() or first == '') or not (last.isdigit() or last == '') or not (first or last):
+        return None
+    
+    if first == '':
+        # 后缀区间：最后N个字节
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - suffix), size - 1
+    
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+def file_etag(f: BinaryIO) -> str:
+    """由已打开文件的内容（SHA-256）计算强ETag"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+        digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+def etag_version(etag: str) -> str:
+    """作品链接中的版本号（ETag哈希的前16位）"""
+    return etag.strip('"')[:16]
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match比较（弱比较，忽略W/前缀）"""
+    if header.strip() == '*':
+        return True
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith('W/') else candidate) == etag:
+            return True
+    return False
+
+class BoundedThreadingHTTPServer(HTTPServer):
+    """有界线程池HTTP服务器
+
+    每个连接在一个工作线程中处理（keep-alive连接在空闲超时前一直占用该线程），
+    超过工作线程数的连接排队等待，超过最大连接数时直接返回503，慢速客户端不会阻塞其他访客。
+    有连接排队时，处理器在当前响应后关闭keep-alive连接，把工作线程让给排队的访客。
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, server_address, handler_class, max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        self.max_workers = max_workers
+        self.max_connections = max(max_connections, max_workers)
+        # 监听队列与最大连接数一致，人群同时扫码时不因队列过短丢弃SYN（客户端需等待1秒重传）
+        self.request_queue_size = self.max_connections
+        super().__init__(server_address, handler_class)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="web")
+        self._lock = threading.Lock()
+        self._queued: Dict[Future, socket.socket] = {}  # 已提交、尚未结束的连接
+        self.connections = 0
+        self.rejected = 0
+    
+    def has_waiting_connections(self) -> bool:
+        """是否有连接在等待工作线程"""
+        return self.connections > self.max_workers
+    
+    def process_request(self, request, client_address):
+        """连接交给线程池处理，连接数超限时拒绝"""
+        with self._lock:
+            accepted = self.connections < self.max_connections
+            if accepted:
+                self.connections += 1
+            else:
+                self.rejected += 1
+        
+        if not accepted:
+            try:
+                request.sendall(SERVICE_UNAVAILABLE_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        
+        try:
+            future = self._executor.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # 服务器正在关闭
+            self._release()
+            self.shutdown_request(request)
+            return
+        
+        with self._lock:
+            self._queued[future] = request
+        future.add_done_callback(self._forget)
+    
+    def _forget(self, future: Future):
+        with self._lock:
+            self._queued.pop(future, None)
+    
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._release()
+    
+    def _release(self):
+        with self._lock:
+            self.connections -= 1
+    
+    def server_close(self):
+        """关闭监听套接字，取消仍在排队的连接（Python 3.8的Executor.shutdown不支持cancel_futures）"""
+        super().server_close()
+        with self._lock:
+            queued = list(self._queued.items())
+        for future, request in queued:
+            if future.cancel():
+                self.shutdown_request(request)
+                self._release()
+        self._executor.shutdown(wait=False)
 
 class CanalWebHandler(BaseHTTPRequestHandler):
     """运河水墨Web请求处理器"""
     
+    # HTTP/1.1：默认保持连接，同一手机加载页面、封面与动画复用一个连接（每个响应都须带Content-Length）
+    protocol_version = 'HTTP/1.1'
+    
     def __init__(self, *args, server_instance=None, **kwargs):
         """初始化处理器"""
         self.server_instance = server_instance
         self.app_instance = server_instance.app_instance if server_instance else None
+        self.keepalive_timeout = server_instance.keepalive_timeout if server_instance else DEFAULT_KEEPALIVE_TIMEOUT
+        self.transfer_timeout = server_instance.transfer_timeout if server_instance else DEFAULT_TRANSFER_TIMEOUT
         super().__init__(*args, **kwargs)
     
+    def handle_one_request(self):
+        """等待下一个请求时使用keep-alive空闲超时，超时即关闭连接并释放工作线程"""
+        self.connection.settimeout(self.keepalive_timeout)
+        super().handle_one_request()
+    
+    def parse_request(self) -> bool:
+        """收到请求后改用传输超时，慢速下载不受空闲超时限制；有连接排队时本次响应后关闭连接"""
+        self.connection.settimeout(self.transfer_timeout)
+        waiting = getattr(self.server, 'has_waiting_connections', None)
+        self._yield_connection = waiting is not None and waiting()
+        return super().parse_request()
+    
+    def end_headers(self):
+        """需要让出工作线程时告知客户端关闭连接"""
+        if getattr(self, '_yield_connection', False):
+            self._yield_connection = False
+            self.send_header('Connection', 'close')
+        super().end_headers()
+    
     def do_GET(self):
         """处理GET请求"""
         try:
@@ -39,6 +238,12 @@ class CanalWebHandler(BaseHTTPRequestHandler):
                 self._serve_status_api()
             elif path.startswith('/api/'):
                 self._serve_api_error(404, "API endpoint not found")
+            elif path.startswith('/download/'):
+                self._serve_download(path)
+            elif path == '/loop':
+                self._serve_animation(None)
+            elif path == '/loop.webp' or path == '/loop.apng':
+                self._serve_animation(path.rsplit('.', 1)[-1])
             elif path.endswith('.png') or path.endswith('.jpg') or path.endswith('.jpeg'):
                 self._serve_static_file(path)
             elif path.endswith('.mp4') or path.endswith('.webm'):
@@ -48,31 +253,34 @@ class CanalWebHandler(BaseHTTPRequestHandler):
             else:
                 self._serve_404()
                 
+        except (BrokenPipeError, ConnectionResetError, TimeoutError, socket.timeout):
+            # 客户端已断开或传输超时（Python 3.10以前socket.timeout不是TimeoutError）
+            self.close_connection = True
         except Exception as e:
             print(f"Web请求处理错误: {e}")
+            # 响应可能已部分发出，错误页之后关闭连接
+            self.close_connection = True
             self._serve_error(500, "Internal Server Error")
     
     def _serve_api_error(self, code: int, message: str):
         """返回API错误响应"""
-        self.send_response(code)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         error_response = {
             'error': message,
             'code': code,
             'timestamp': datetime.now().isoformat()
         }
+        content = json.dumps(error_response, ensure_ascii=False).encode('utf-8')
         
-        self.wfile.write(json.dumps(error_response, ensure_ascii=False).encode('utf-8'))
-    
-    def _serve_error(self, code: int, message: str):
-        """返回HTML错误页面"""
         self.send_response(code)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
         
+        self.wfile.write(content)
+    
+    def _serve_error(self, code: int, message: str):
+        """返回HTML错误页面"""
         error_html = f"""
         <!DOCTYPE html>
         <html>
@@ -87,8 +295,14 @@ class CanalWebHandler(BaseHTTPRequestHandler):
         </body>
         </html>
         """
+        content = error_html.encode('utf-8')
         
-        self.wfile.write(error_html.encode('utf-8'))
+        self.send_response(code)
+        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        
+        self.wfile.write(content)
     
     def _serve_404(self):
         """返回404页面"""
@@ -102,6 +316,8 @@ class CanalWebHandler(BaseHTTPRequestHandler):
             self.send_response(200)
             self.send_header('Content-Type', 'text/html; charset=utf-8')
             self.send_header('Content-Length', str(len(html_content.encode('utf-8'))))
+            # 页面内嵌带版本号的作品链接，本身不缓存
+            self.send_header('Cache-Control', 'no-store')
             self.end_headers()
             
             self.wfile.write(html_content.encode('utf-8'))
@@ -129,158 +345,228 @@ class CanalWebHandler(BaseHTTPRequestHandler):
         else:
             self._send_json_response({'error': 'No artwork available'}, 404)
     
+    def _www_path(self, path: str) -> Optional[Path]:
+        """将请求路径映射到www目录下的文件，路径不安全时返回None"""
+        # 移除开头的斜杠
+        path = path.lstrip('/')
+        
+        # 安全检查（隐藏文件为发布作品时的临时文件，不对外提供）
+        if '..' in path or Path(path).name.startswith('.'):
+            return None
+        
+        www_dir = self.server_instance.www_dir if self.server_instance else Path('www')
+        return www_dir / path
+    
     def _serve_download(self, path: str):
         """提供文件下载"""
         # 提取文件名
         filename = path.split('/')[-1]
         
         # 安全检查
-        if '..' in filename or '/' in filename:
+        if not filename or '..' in filename:
             self._send_error_response(400, "Invalid filename")
             return
         
-        # 查找文件
-        file_path = Path('www') / filename
-        
-        if not file_path.exists():
+        file_path = self._www_path(filename)
+        if file_path is None:
+            self._send_error_response(400, "Invalid path")
+            return
+        if not file_path.is_file():
             self._send_error_response(404, "File not found")
             return
         
-        try:
-            # 确定MIME类型
-            mime_type, _ = mimetypes.guess_type(str(file_path))
-            if mime_type is None:
-                mime_type = 'application/octet-stream'
-            
-            # 读取文件
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            
-            # 发送响应
-            self.send_response(200)
-            self.send_header('Content-Type', mime_type)
-            self.send_header('Content-Length', str(len(content)))
-            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-            self.end_headers()
-            
-            self.wfile.write(content)
-            
-        except Exception as e:
-            print(f"文件下载错误: {e}")
-            self._send_error_response(500, "Download failed")
+        self._send_file(file_path, extra_headers={'Content-Disposition': f'attachment; filename="{filename}"'})
     
     def _serve_static_file(self, path: str):
         """提供静态文件"""
-        # 移除开头的斜杠
-        if path.startswith('/'):
-            path = path[1:]
-        
-        # 安全检查
-        if '..' in path:
+        file_path = self._www_path(path)
+        if file_path is None:
             self._send_error_response(400, "Invalid path")
             return
         
-        file_path = Path('www') / path
-        
-        if not file_path.exists():
+        if not file_path.is_file():
             self._send_error_response(404, "File not found")
             return
         
-        try:
-            # 确定MIME类型
-            mime_type, _ = mimetypes.guess_type(str(file_path))
-            if mime_type is None:
-                mime_type = 'application/octet-stream'
-            
-            # 读取文件
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            
-            # 发送响应
-            self.send_response(200)
-            self.send_header('Content-Type', mime_type)
-            self.send_header('Content-Length', str(len(content)))
-            self.end_headers()
-            
-            self.wfile.write(content)
-            
-        except Exception as e:
-            print(f"静态文件服务错误: {e}")
-            self._send_error_response(500, "File serve failed")
+        self._send_file(file_path)
 
-    def _serve_video_file(self, path: str):
-        """提供视频文件"""
-        # 移除开头的斜杠
-        if path.startswith('/'):
-            path = path[1:]
+    def _serve_animation(self, format: Optional[str]):
+        """提供书写动画：未指定格式时按Accept请求头协商，缺少的格式由发布时启动的后台转码生成"""
+        server = self.server_instance
+        if server is None:
+            self._send_error_response(404, "Animation not found")
+            return
         
-        # 安全检查
-        if '..' in path:
+        negotiated = format is None
+        if negotiated:
+            format = server.select_animation_format(self.headers.get('Accept'))
+        
+        # 所选格式不可用（转码未完成或失败）时依次尝试其余格式与MP4，最后退回静态PNG
+        candidates = [format] + [name for name in server.animation_formats if name != format]
+        if 'mp4' not in candidates:
+            candidates.append('mp4')
+        for name in candidates:
+            file_path = server.get_animation_file(name)
+            if file_path is not None:
+                mime_type = ANIMATION_FORMATS[name].mime_type
+                break
+        else:
+            file_path = server.www_dir / 'loop.png'
+            mime_type = 'image/png'
+            if not file_path.exists():
+                self._send_error_response(404, "Animation not found")
+                return
+        
+        self._send_file(file_path, mime_type, {'Vary': 'Accept'} if negotiated else None)
+
+    def _serve_video_file(self, path: str):
+        """提供视频文件（支持Range请求，移动端拖动进度时只取所需片段）"""
+        file_path = self._www_path(path)
+        if file_path is None:
             self._send_error_response(400, "Invalid path")
             return
         
-        file_path = Path('www') / path
-        
-        if not file_path.exists():
+        if not file_path.is_file():
             self._send_error_response(404, "Video file not found")
             return
         
-        try:
-            # 确定MIME类型
-            mime_type, _ = mimetypes.guess_type(str(file_path))
-            if mime_type is None:
-                mime_type = 'video/mp4'
-            
-            # 读取文件
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            
-            # 发送响应
-            self.send_response(200)
-            self.send_header('Content-Type', mime_type)
-            self.send_header('Content-Length', str(len(content)))
-            self.send_header('Accept-Ranges', 'bytes')
-            self.end_headers()
-            
-            self.wfile.write(content)
-            
-        except Exception as e:
-            print(f"视频文件服务错误: {e}")
-            self._send_error_response(500, "Video serve failed")
+        self._send_file(file_path, mimetypes.guess_type(str(file_path))[0] or 'video/mp4')
 
     def _serve_json_file(self, path: str):
         """提供JSON文件"""
-        # 移除开头的斜杠
-        if path.startswith('/'):
-            path = path[1:]
-        
-        # 安全检查
-        if '..' in path:
+        file_path = self._www_path(path)
+        if file_path is None:
             self._send_error_response(400, "Invalid path")
             return
         
-        file_path = Path('www') / path
-        
-        if not file_path.exists():
+        if not file_path.is_file():
             self._send_error_response(404, "JSON file not found")
             return
         
+        self._send_file(file_path, 'application/json; charset=utf-8')
+
+    def _send_file(self, file_path: Path, mime_type: Optional[str] = None,
+                   extra_headers: Optional[Dict[str, str]] = None):
+        """统一的文件响应：支持条件请求（304）与单区间Range请求（206），文件内容经sendfile直接从内核发送，不读入Python内存"""
+        if mime_type is None:
+            mime_type = mimetypes.guess_type(str(file_path))[0] or 'application/octet-stream'
+        
         try:
-            # 读取JSON文件
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            f = open(file_path, 'rb')
+        except OSError as e:
+            print(f"文件打开失败 {file_path}: {e}")
+            self._send_error_response(404, "File not found")
+            return
+        
+        with f:
+            # 以打开后的文件为准，发布新作品替换文件不影响本次响应
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
             
-            # 发送响应
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Length', str(len(content.encode('utf-8'))))
-            self.end_headers()
+            cache_headers = self._cache_headers(file_path, stat)
+            cache_headers.update(extra_headers or {})
+            if self._not_modified(cache_headers.get('ETag'), stat.st_mtime):
+                self.send_response(304)
+                for name, value in cache_headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
             
-            self.wfile.write(content.encode('utf-8'))
+            range_header = self.headers.get('Range')
+            if range_header and not self._if_range_matches(cache_headers.get('ETag'), stat.st_mtime):
+                range_header = None
             
-        except Exception as e:
-            print(f"JSON文件服务错误: {e}")
-            self._send_error_response(500, "JSON serve failed")
+            try:
+                byte_range = parse_range_header(range_header, size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            
+            if byte_range is None:
+                start, end = 0, size - 1
+                self.send_response(200)
+            else:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            length = end - start + 1
+            
+            self.send_header('Content-Type', mime_type)
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            for name, value in cache_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            
+            if length > 0:
+                self._copy_file(f, start, length)
+    
+    def _cache_headers(self, file_path: Path, stat: os.stat_result) -> Dict[str, str]:
+        """缓存相关响应头：ETag、Last-Modified与Cache-Control（请求的版本号与当前内容一致时长期缓存）"""
+        headers = {'Last-Modified': formatdate(stat.st_mtime, usegmt=True)}
+        etag = self.server_instance.get_file_etag(file_path, stat) if self.server_instance else None
+        
+        immutable = False
+        if etag is not None:
+            headers['ETag'] = etag
+            requested = parse_qs(urlparse(self.path).query).get('v')
+            immutable = bool(requested) and requested[0] == etag_version(etag)
+        headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        return headers
+    
+    def _not_modified(self, etag: Optional[str], mtime: float) -> bool:
+        """按If-None-Match（优先）或If-Modified-Since判断客户端缓存是否仍然有效"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return etag is not None and etag_matches(if_none_match, etag)
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+    
+    def _if_range_matches(self, etag: Optional[str], mtime: float) -> bool:
+        """If-Range：客户端缓存的片段与当前文件一致时才按Range响应"""
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            # If-Range要求强比较
+            return etag is not None and if_range.strip() == etag
+        try:
+            return int(mtime) == int(parsedate_to_datetime(if_range).timestamp())
+        except (TypeError, ValueError):
+            return False
+    
+    def _asset_url(self, path: str) -> str:
+        """带内容版本号的作品链接，内容更新后链接随之改变"""
+        version = self.server_instance.asset_version(path.split('/')[-1]) if self.server_instance else None
+        return f"{path}?v={version}" if version else path
+    
+    def _copy_file(self, f, offset: int, length: int):
+        """发送文件区间：socket.sendfile在Linux/macOS上使用os.sendfile零拷贝，其他平台自动退回分块发送"""
+        try:
+            sent = self.connection.sendfile(f, offset, length)
+        except (AttributeError, io.UnsupportedOperation):
+            # 连接不是普通套接字（如被包装），分块写入
+            f.seek(offset)
+            sent = 0
+            while sent < length:
+                chunk = f.read(min(FILE_CHUNK_SIZE, length - sent))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                sent += len(chunk)
+        
+        if sent < length:
+            # 文件在发送期间被截断，Content-Length已无法兑现
+            self.close_connection = True
 
     def _send_json_response(self, data: Dict[str, Any], status_code: int = 200):
         """发送JSON响应"""
@@ -289,6 +575,7 @@ class CanalWebHandler(BaseHTTPRequestHandler):
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
         self.send_header('Content-Length', str(len(json_content.encode('utf-8'))))
+        self.send_header('Cache-Control', 'no-store')
         self.end_headers()
         
         self.wfile.write(json_content.encode('utf-8'))
@@ -358,6 +645,11 @@ class CanalWebHandler(BaseHTTPRequestHandler):
         except:
             server_ip = "localhost"
         
+        # 带版本号的作品链接
+        cover_url = self._asset_url('cover.png')
+        download_urls = {name: self._asset_url(f'download/{name}')
+                         for name in ('cover.png', 'loop.mp4', 'raw.wav', 'meta.json')}
+        
         html_template = f"""
 <!DOCTYPE html>
 <html lang="zh-CN">
@@ -636,7 +928,7 @@ class CanalWebHandler(BaseHTTPRequestHandler):
         <div class="artwork-section">
             <div class="artwork-grid">
                 <div class="artwork-display">
-                    <img src="cover.png" alt="水墨作品" class="artwork-image" onerror="this.style.display='none'">
+                    <img src="{cover_url}" alt="水墨作品" class="artwork-image" onerror="this.style.display='none'">
                     <h3>{content_text}</h3>
                     <p>风格：{style}</p>
                 </div>
@@ -731,25 +1023,31 @@ class CanalWebHandler(BaseHTTPRequestHandler):
                 <p>点击下方链接下载完整的艺术作品文件</p>
                 
                 <div class="download-grid">
-                    <a href="download/cover.png" class="download-item">
+                    <a href="{download_urls['cover.png']}" class="download-item">
                         <span class="download-icon">🖼️</span>
                         <strong>封面图像</strong>
                         <p>PNG格式高清图像</p>
                     </a>
                     
-                    <a href="download/loop.mp4" class="download-item">
+                    <a href="{download_urls['loop.mp4']}" class="download-item">
                         <span class="download-icon">🎬</span>
                         <strong>动画视频</strong>
                         <p>MP4格式动画视频</p>
                     </a>
                     
-                    <a href="download/raw.wav" class="download-item">
+                    <a href="loop" class="download-item">
+                        <span class="download-icon">🌀</span>
+                        <strong>动图</strong>
+                        <p>WebP/APNG轻量动图，适合手机保存</p>
+                    </a>
+                    
+                    <a href="{download_urls['raw.wav']}" class="download-item">
                         <span class="download-icon">🎵</span>
                         <strong>原始音频</strong>
                         <p>WAV格式环境声音</p>
                     </a>
                     
-                    <a href="download/meta.json" class="download-item">
+                    <a href="{download_urls['meta.json']}" class="download-item">
                         <span class="download-icon">📄</span>
                         <strong>元数据</strong>
                         <p>JSON格式详细信息</p>
@@ -845,12 +1143,45 @@ class CanalWebHandler(BaseHTTPRequestHandler):
 class WebServer:
     """运河水墨Web服务器"""
     
-    def __init__(self, port: int = 8000):
-        """初始化Web服务器"""
+    def __init__(self, port: int = 8000, config: Optional[Dict[str, Any]] = None,
+                 encoder_config: Optional[Dict[str, Any]] = None):
+        """初始化Web服务器（config为server配置，encoder_config为转码参数所在的generation配置）"""
         self.port = port
+        self.config = config or {}
+        self.encoder_config = encoder_config or {}
         self.running = False
         self.server = None
         self.app_instance = None
+        self.current_art = None
+        
+        self.www_dir = Path('www')
+        self.www_dir.mkdir(exist_ok=True)
+        
+        # 动画格式策略：animation_format为auto时按Accept协商，否则固定为该格式
+        self.animation_formats = [name for name in self.config.get('animation_formats', DEFAULT_ANIMATION_FORMATS)
+                                  if name in ANIMATION_FORMATS] or ['mp4']
+        self.animation_policy = self.config.get('animation_format', 'auto')
+        self.lazy_transcode = self.config.get('lazy_transcode', True)
+        
+        # 并发服务参数
+        self.max_workers = self.config.get('max_workers', DEFAULT_MAX_WORKERS)
+        self.max_connections = self.config.get('max_connections', DEFAULT_MAX_CONNECTIONS)
+        self.keepalive_timeout = self.config.get('keepalive_timeout', DEFAULT_KEEPALIVE_TIMEOUT)
+        self.transfer_timeout = self.config.get('transfer_timeout', DEFAULT_TRANSFER_TIMEOUT)
+        
+        # 文件名 -> ((大小, 修改时间), ETag)，发布作品时计算
+        self._etags: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._etag_lock = threading.Lock()
+        
+        # 发布作品（含封面细化后从渲染线程重新发布）逐次进行
+        self._publish_lock = threading.Lock()
+        
+        # 缺少的动画格式在发布作品时由单个后台线程从loop.mp4转码，请求线程从不等待转码；
+        # 转码完成前按loop.mp4提供，失败的格式在同一作品内不再重试
+        self._transcode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcode")
+        self._failed_formats: Dict[str, int] = {}  # 格式 -> 转码失败时的作品版本
+        self._content_version = 0
+        self._published_animation = None
         
         print(f"Web服务器初始化 - 端口: {port}")
     
@@ -864,15 +1195,14 @@ class WebServer:
             return
         
         try:
-            # 创建自定义处理器类
-            def handler_factory(*args, **kwargs):
-                return CanalWebHandler(*args, server_instance=self, **kwargs)
-            
-            # 创建HTTP服务器
-            self.server = HTTPServer(('0.0.0.0', self.port), handler_factory)  # 绑定所有接口
+            # 创建有界线程池HTTP服务器
+            self.server = BoundedThreadingHTTPServer(('0.0.0.0', self.port), self.handler_factory,  # 绑定所有接口
+                                                     self.max_workers, self.max_connections)
+            self.port = self.server.server_address[1]
             self.running = True
             
-            print(f"Web服务器启动成功 - http://0.0.0.0:{self.port}")
+            print(f"Web服务器启动成功 - http://0.0.0.0:{self.port} "
+                  f"({self.max_workers}个工作线程，最多{self.max_connections}个连接)")
             
             # 在单独线程中运行服务器，避免阻塞主线程
             self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
@@ -882,55 +1212,202 @@ class WebServer:
             print(f"Web服务器启动失败: {e}")
             self.running = False
     
+    def handler_factory(self, *args, **kwargs) -> CanalWebHandler:
+        """创建绑定到本服务器的请求处理器"""
+        return CanalWebHandler(*args, server_instance=self, **kwargs)
+    
     def stop(self):
         """停止Web服务器"""
         if self.server and self.running:
             self.server.shutdown()
             self.server.server_close()
             self.running = False
+            self._transcode_executor.shutdown(wait=False)
             # 等待服务器线程结束
             if hasattr(self, 'server_thread') and self.server_thread.is_alive():
                 self.server_thread.join(timeout=1.0)
             print("Web服务器已停止")
     
+    def select_animation_format(self, accept_header: Optional[str]) -> str:
+        """按配置策略选择动画格式"""
+        if self.animation_policy in ANIMATION_FORMATS:
+            return self.animation_policy
+        return negotiate_animation_format(accept_header, self.animation_formats)
+    
+    def get_animation_file(self, format: str) -> Optional[Path]:
+        """获取当前作品指定格式的动画文件，不存在（尚未转码完成或转码失败）时返回None"""
+        file_path = self.www_dir / f"loop{ANIMATION_FORMATS[format].extension}"
+        return file_path if file_path.exists() else None
+    
+    def _schedule_transcodes(self):
+        """为当前作品缺少的动画格式提交后台转码（在发布锁内调用）"""
+        source_path = self.www_dir / 'loop.mp4'
+        if not self.lazy_transcode or not source_path.exists() or not ffmpeg_available():
+            return
+        
+        version = self._content_version
+        for format in self.animation_formats:
+            if format == 'mp4' or self._failed_formats.get(format) == version:
+                continue
+            if not (self.www_dir / f"loop{ANIMATION_FORMATS[format].extension}").exists():
+                self._transcode_executor.submit(self._transcode, format, version)
+    
+    def _transcode(self, format: str, version: int):
+        """后台转码loop.mp4为指定格式：先转码到临时文件，作品未更新时才原子替换到位"""
+        name = f"loop{ANIMATION_FORMATS[format].extension}"
+        if version != self._content_version or (self.www_dir / name).exists():
+            return
+        
+        temp_path = self._temp_path(name)
+        try:
+            start = time.perf_counter()
+            transcode_animation(self.www_dir / 'loop.mp4', temp_path, EncoderSettings.from_config(self.encoder_config, format))
+            with self._publish_lock:
+                # 转码期间作品已更新：结果已过期
+                if version != self._content_version:
+                    return
+                os.replace(temp_path, self.www_dir / name)
+                self._record_etag(self.www_dir / name)
+            print(f"动画已转码为{format}: {name} ({time.perf_counter() - start:.1f} 秒)")
+        except Exception as e:
+            print(f"动画转码失败 ({format})，本作品不再重试该格式: {e}")
+            with self._publish_lock:
+                self._failed_formats[format] = version
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def _record_etag(self, file_path: Path) -> Optional[Tuple[Tuple[int, int], str]]:
+        """计算并登记文件的ETag，返回((大小, 修改时间), ETag)
+        
+        大小、修改时间与内容取自同一个打开的文件，文件在此期间被替换也不会登记错配的ETag
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                entry = ((stat.st_size, stat.st_mtime_ns), file_etag(f))
+        except OSError:
+            return None
+        with self._etag_lock:
+            self._etags[file_path.name] = entry
+        return entry
+    
+    def get_file_etag(self, file_path: Path, stat: os.stat_result) -> Optional[str]:
+        """获取www目录下文件的ETag，文件与登记时不一致（或未登记）时重新计算"""
+        # 路径均由www_dir拼接而来，只登记www目录下一级的文件
+        if file_path.parent != self.www_dir:
+            return None
+        entry = self._etags.get(file_path.name)
+        if entry is None or entry[0] != (stat.st_size, stat.st_mtime_ns):
+            entry = self._record_etag(file_path)
+        # 重新计算时文件已被新作品替换：不为旧内容返回新ETag
+        if entry is None or entry[0] != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return entry[1]
+    
+    def asset_version(self, name: str) -> Optional[str]:
+        """文件当前内容的版本号，文件不存在时返回None"""
+        file_path = self.www_dir / name
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        etag = self.get_file_etag(file_path, stat)
+        return etag_version(etag) if etag else None
+    
+    def _publish_etags(self):
+        """发布作品时计算各文件的ETag，请求时无需再读取文件内容"""
+        for name in PUBLISHED_FILES:
+            file_path = self.www_dir / name
+            if file_path.exists():
+                self._record_etag(file_path)
+    
+    def _remove_animation_files(self, keep=()):
+        """删除上一作品的各格式动画文件（含转码缓存），keep中的文件名保留（随后被原子替换）"""
+        for name in ['loop.png'] + [f"loop{fmt.extension}" for fmt in ANIMATION_FORMATS.values()]:
+            if name not in keep:
+                (self.www_dir / name).unlink(missing_ok=True)
+    
+    def _temp_path(self, name: str) -> Path:
+        """www目录内的临时文件（与目标同一文件系统，os.replace为原子操作）"""
+        return self.www_dir / f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    
+    def _publish_file(self, source: Path, name: str):
+        """复制文件到www目录：先写临时文件再原子替换，请求总是读到完整的旧文件或新文件"""
+        import shutil
+        
+        temp_path = self._temp_path(name)
+        try:
+            shutil.copy2(source, temp_path)
+            os.replace(temp_path, self.www_dir / name)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    def _publish_json(self, data: Dict[str, Any], name: str):
+        """写入JSON文件到www目录（原子替换）"""
+        temp_path = self._temp_path(name)
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.www_dir / name)
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
     def update_content(self, generated_art: GeneratedArt):
-        """更新Web内容"""
+        """更新Web内容（各文件原子替换；多个线程同时发布时逐次进行）"""
+        with self._publish_lock:
+            self._update_content_locked(generated_art)
+    
+    def _update_content_locked(self, generated_art: GeneratedArt):
         self.current_art = generated_art
         
         try:
-            import shutil
-            
             # 保存元数据到JSON文件
-            meta_path = self.www_dir / 'meta.json'
-            with open(meta_path, 'w', encoding='utf-8') as f:
-                json.dump(generated_art.metadata, f, ensure_ascii=False, indent=2)
+            self._publish_json(generated_art.metadata, 'meta.json')
             
             # 复制封面图像文件
             if generated_art.cover_image_path and Path(generated_art.cover_image_path).exists():
-                cover_dest = self.www_dir / 'cover.png'
-                shutil.copy2(generated_art.cover_image_path, cover_dest)
-                print(f"封面图像已复制: {generated_art.cover_image_path} -> {cover_dest}")
+                self._publish_file(Path(generated_art.cover_image_path), 'cover.png')
+                print(f"封面图像已复制: {generated_art.cover_image_path} -> {self.www_dir / 'cover.png'}")
             else:
                 print(f"警告: 封面图像文件不存在: {generated_art.cover_image_path}")
             
-            # 复制动画视频文件
+            # 动画文件：各格式按扩展名复制为loop.*，静态图像退化为loop.png
+            published = {}
             if generated_art.animation_video_path and Path(generated_art.animation_video_path).exists():
-                # 检查文件扩展名，如果是PNG则复制为loop.png，否则为loop.mp4
+                sources = dict(generated_art.animation_variants)
                 source_path = Path(generated_art.animation_video_path)
                 if source_path.suffix.lower() == '.png':
-                    video_dest = self.www_dir / 'loop.png'
-                else:
-                    video_dest = self.www_dir / 'loop.mp4'
-                shutil.copy2(generated_art.animation_video_path, video_dest)
-                print(f"动画文件已复制: {generated_art.animation_video_path} -> {video_dest}")
+                    published['loop.png'] = source_path
+                elif not sources:
+                    sources['mp4'] = str(source_path)
+                
+                for format, path in sources.items():
+                    if Path(path).exists():
+                        published[f"loop{ANIMATION_FORMATS[format].extension}"] = Path(path)
             else:
                 print(f"警告: 动画文件不存在: {generated_art.animation_video_path}")
             
+            # 同一作品（封面细化后重新发布）时保留已复制与已转码的文件；
+            # 新作品先删除不再提供的旧格式，再原子替换本作品的各格式，请求期间不会出现缺失的文件
+            same_animation = self._published_animation == generated_art.animation_video_path
+            if not same_animation:
+                self._content_version += 1
+                self._remove_animation_files(keep=published)
+                self._published_animation = generated_art.animation_video_path
+            
+            for name, path in published.items():
+                video_dest = self.www_dir / name
+                if not (same_animation and video_dest.exists()):
+                    self._publish_file(path, name)
+                    print(f"动画文件已复制: {path} -> {video_dest}")
+            
             # 如果有音频文件，复制到www目录
             if generated_art.audio_file_path and Path(generated_art.audio_file_path).exists():
-                shutil.copy2(generated_art.audio_file_path, self.www_dir / 'raw.wav')
+                self._publish_file(Path(generated_art.audio_file_path), 'raw.wav')
                 print(f"音频文件已复制: {generated_art.audio_file_path}")
             
+            self._publish_etags()
+            self._schedule_transcodes()
             print("Web内容更新完成")
             
         except Exception as e:
@@ -947,12 +1424,136 @@ class WebServer:
         except:
             return f"http://localhost:{self.port}"
 
+def benchmark_concurrent_clients(host: str, port: int, paths, clients: int = 50, requests_per_client: int = 20,
+                                 keepalive: bool = True, slow_path: Optional[str] = None) -> Dict[str, float]:
+    """压测：clients个并发客户端各发出requests_per_client个请求，返回吞吐量与延迟分位数
+
+    slow_path不为空时另有一个慢速客户端缓慢下载该文件，模拟网络较差的手机。
+    """
+    import http.client
+    
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_slow = threading.Event()
+    
+    def slow_client():
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            connection.request('GET', slow_path)
+            response = connection.getresponse()
+            while not stop_slow.is_set() and response.read(16 * 1024):
+                time.sleep(0.05)
+            connection.close()
+        except Exception:
+            pass
+    
+    def client(index: int):
+        connection = None
+        local_latencies = []
+        local_errors = 0
+        for i in range(requests_per_client):
+            path = paths[(index + i) % len(paths)]
+            start = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(host, port, timeout=30)
+                connection.request('GET', path, headers={} if keepalive else {'Connection': 'close'})
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+                if not keepalive or response.will_close:
+                    connection.close()
+                    connection = None
+            except Exception:
+                local_errors += 1
+                if connection is not None:
+                    connection.close()
+                connection = None
+            local_latencies.append(time.perf_counter() - start)
+        if connection is not None:
+            connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+    
+    slow_thread = None
+    if slow_path:
+        slow_thread = threading.Thread(target=slow_client, daemon=True)
+        slow_thread.start()
+        time.sleep(0.1)
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    stop_slow.set()
+    if slow_thread is not None:
+        slow_thread.join(timeout=5)
+    
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0
+    }
+
+def _run_load_test():
+    """对比原单线程服务器与有界线程池服务器（有/无keep-alive），含一个慢速下载客户端"""
+    import tempfile
+    
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.chdir(temp_dir)
+        try:
+            web_server = WebServer(0, {})
+            (web_server.www_dir / 'meta.json').write_text(json.dumps({'title': '水上书'}, ensure_ascii=False),
+                                                          encoding='utf-8')
+            (web_server.www_dir / 'cover.png').write_bytes(os.urandom(200 * 1024))
+            (web_server.www_dir / 'loop.mp4').write_bytes(os.urandom(4 * 1024 * 1024))
+            paths = ['/', '/meta.json', '/cover.png', '/api/status']
+            
+            cases = [
+                ("单线程HTTPServer", lambda: HTTPServer(('127.0.0.1', 0), web_server.handler_factory), False),
+                ("有界线程池", lambda: BoundedThreadingHTTPServer(('127.0.0.1', 0), web_server.handler_factory,
+                                                              web_server.max_workers, web_server.max_connections), False),
+                ("有界线程池+keep-alive", lambda: BoundedThreadingHTTPServer(('127.0.0.1', 0), web_server.handler_factory,
+                                                                          web_server.max_workers, web_server.max_connections), True),
+            ]
+            for label, factory, keepalive in cases:
+                http_server = factory()
+                thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+                thread.start()
+                try:
+                    result = benchmark_concurrent_clients('127.0.0.1', http_server.server_address[1], paths,
+                                                          keepalive=keepalive, slow_path='/loop.mp4')
+                finally:
+                    http_server.shutdown()
+                    http_server.server_close()
+                print(f"{label}: {result['requests']} 请求，{result['errors']} 错误，"
+                      f"{result['rps']:.0f} req/s，p50 {result['p50_ms']:.1f} ms，p99 {result['p99_ms']:.1f} ms")
+        finally:
+            os.chdir(original_dir)
+
 # 测试代码
 if __name__ == "__main__":
+    import sys
+    
+    if "--benchmark" in sys.argv:
+        _run_load_test()
+        sys.exit(0)
+    
     # 测试Web服务器
     config = {'port': 8000}
     
-    server = WebServer(config)
+    server = WebServer(config['port'], config)
     
     print("启动测试Web服务器...")
     print(f"访问地址: {server.get_server_url()}")
@@ -960,6 +1561,8 @@ if __name__ == "__main__":
     
     try:
         server.start()
+        while True:
+            time.sleep(1)
     except KeyboardInterrupt:
         print("\n停止服务器...")
         server.stop()
@@ -8,9 +8,27 @@
 import numpy as np
 import math
 from typing import List, Tuple, Dict, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from enum import Enum
 
+# 结构模板版本 - 修改模板参数或生成算法时递增，使磁盘上的场景缓存失效
+STRUCTURE_TEMPLATE_VERSION = 1
+
+# 音频调制阈值 - 低于该能量且粒子静止时视为未调制，渲染端可复用烘焙图层
+AUDIO_MODULATION_THRESHOLD = 0.002
+# 粒子静止判定的速度阈值（像素/帧）
+REST_VELOCITY_EPSILON = 1e-3
+# 粒子静止判定的位移阈值（像素）
+REST_OFFSET_EPSILON = 0.05
+# 音频调制相对静止状态的最大位移（像素）
+MAX_AUDIO_DISPLACEMENT = 8.0
+# 低频对大型结构尺寸的最大放大比例
+MAX_SIZE_MODULATION = 0.3
+# 每个参考步（1/60秒）保留的位移比例，其余回复到静止位置
+REST_RESTORE_FACTOR = 0.9
+# 每个参考步保留的速度比例
+VELOCITY_DECAY = 0.95
+
 class StructureType(Enum):
     """结构类型枚举"""
     TRADITIONAL_BUILDING = "traditional_building"  # 传统建筑
@@ -41,6 +59,93 @@ class StructuredParticle:
     local_y: float = 0.0
     local_z: float = 0.0
 
+# 结构类型的紧凑整数编码（数组存储使用）
+STRUCTURE_TYPE_ORDER = list(StructureType)
+STRUCTURE_TYPE_INDEX = {structure_type: i for i, structure_type in enumerate(STRUCTURE_TYPE_ORDER)}
+
+# 频段响应分组：0-低频影响大型结构，1-中频影响植被，2-高频影响船只和水榭，-1-不响应
+BAND_GROUP_BY_TYPE = {
+    StructureType.TRADITIONAL_BUILDING: 0,
+    StructureType.MODERN_BUILDING: 0,
+    StructureType.PAGODA: 0,
+    StructureType.TREE_CLUSTER: 1,
+    StructureType.WILLOW_TREE: 1,
+    StructureType.PINE_TREE: 1,
+    StructureType.BRIDGE_ARCH: -1,
+    StructureType.BOAT_STRUCTURE: 2,
+    StructureType.WATER_PAVILION: 2,
+}
+
+@dataclass
+class StructuredPointCloud:
+    """结构化点云（数组存储）
+    
+    每个属性是长度为N的数组，color为(N, 3)。rest_*保存生成时的静止状态，
+    音频调制始终相对静止状态计算，因此不会随运行时间累积漂移。
+    """
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    size: np.ndarray
+    color: np.ndarray
+    velocity_x: np.ndarray
+    velocity_y: np.ndarray
+    intensity: np.ndarray
+    structure_id: np.ndarray
+    structure_type: np.ndarray  # STRUCTURE_TYPE_ORDER中的索引
+    rest_x: np.ndarray
+    rest_y: np.ndarray
+    rest_size: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.x)
+    
+    @classmethod
+    def from_particles(cls, particles: List[StructuredParticle]) -> 'StructuredPointCloud':
+        """由粒子列表构建数组点云，粒子的particle_type为结构类型值"""
+        type_by_value = {structure_type.value: STRUCTURE_TYPE_INDEX[structure_type]
+                         for structure_type in STRUCTURE_TYPE_ORDER}
+        default_type = STRUCTURE_TYPE_INDEX[StructureType.TRADITIONAL_BUILDING]
+        
+        x = np.array([p.x for p in particles], dtype=np.float32)
+        y = np.array([p.y for p in particles], dtype=np.float32)
+        size = np.array([p.size for p in particles], dtype=np.float32)
+        
+        return cls(
+            x=x,
+            y=y,
+            z=np.array([p.z for p in particles], dtype=np.float32),
+            size=size,
+            color=np.array([p.color for p in particles], dtype=np.uint8).reshape(-1, 3),
+            velocity_x=np.array([p.velocity_x for p in particles], dtype=np.float32),
+            velocity_y=np.array([p.velocity_y for p in particles], dtype=np.float32),
+            intensity=np.zeros(len(particles), dtype=np.float32),
+            structure_id=np.array([p.structure_id for p in particles], dtype=np.int32),
+            structure_type=np.array([type_by_value.get(p.particle_type, default_type)
+                                     for p in particles], dtype=np.int8),
+            rest_x=x.copy(),
+            rest_y=y.copy(),
+            rest_size=size.copy()
+        )
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """导出为命名数组（用于磁盘缓存）"""
+        return {f"structured_{f.name}": getattr(self, f.name) for f in fields(self)}
+    
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'StructuredPointCloud':
+        """由命名数组恢复点云"""
+        return cls(**{f.name: arrays[f"structured_{f.name}"] for f in fields(cls)})
+    
+    def reset_to_rest(self):
+        """恢复到静止状态"""
+        self.x[:] = self.rest_x
+        self.y[:] = self.rest_y
+        self.size[:] = self.rest_size
+        self.velocity_x.fill(0.0)
+        self.velocity_y.fill(0.0)
+        self.intensity.fill(0.0)
+
 @dataclass
 class StructureTemplate:
     """结构模板"""
@@ -67,6 +172,18 @@ class StructuredPointCloudGenerator:
         self.structures = []
         self.structure_counter = 0
         
+        # 按结构类型索引的音频响应查找表
+        self._responsiveness = np.array(
+            [self.structure_templates[t].audio_responsiveness for t in STRUCTURE_TYPE_ORDER],
+            dtype=np.float32
+        )
+        self._band_group = np.array(
+            [BAND_GROUP_BY_TYPE[t] for t in STRUCTURE_TYPE_ORDER], dtype=np.int8
+        )
+        
+        # 上一次更新是否产生调制（用于在调制结束后再刷新一次烘焙图层）
+        self._last_modulated = False
+        
     def _init_structure_templates(self) -> Dict[StructureType, StructureTemplate]:
         """初始化结构模板库"""
         templates = {}
@@ -203,6 +320,10 @@ class StructuredPointCloudGenerator:
         elif structure_type == StructureType.WATER_PAVILION:
             particles = self._generate_water_pavilion(template, center_x, center_y, scale, structure_id)
         
+        # 标记粒子所属结构类型
+        for particle in particles:
+            particle.particle_type = structure_type.value
+        
         return particles
     
     def _generate_traditional_building(self, template: StructureTemplate, 
@@ -629,8 +750,8 @@ class StructuredPointCloudGenerator:
         
         return particles
     
-    def generate_canal_scene(self) -> List[StructuredParticle]:
-        """生成完整的运河场景结构化点云"""
+    def generate_canal_scene(self) -> StructuredPointCloud:
+        """生成完整的运河场景结构化点云（数组存储）"""
         all_particles = []
         
         # 左岸建筑群
@@ -683,63 +804,75 @@ class StructuredPointCloudGenerator:
             )
             all_particles.extend(boat_particles)
         
-        return all_particles
+        return StructuredPointCloud.from_particles(all_particles)
     
-    def update_particles_with_audio(self, particles: List[StructuredParticle], 
-                                  audio_energy: float, frequency_bands: np.ndarray):
-        """根据音频数据更新粒子"""
-        for particle in particles:
-            # 根据粒子类型获取对应的音频响应参数
-            structure_type_map = {
-                "traditional_building": StructureType.TRADITIONAL_BUILDING,
-                "modern_building": StructureType.MODERN_BUILDING,
-                "pagoda": StructureType.PAGODA,
-                "tree_cluster": StructureType.TREE_CLUSTER,
-                "willow_tree": StructureType.WILLOW_TREE,
-                "pine_tree": StructureType.PINE_TREE,
-                "bridge_arch": StructureType.BRIDGE_ARCH,
-                "boat_structure": StructureType.BOAT_STRUCTURE,
-                "water_pavilion": StructureType.WATER_PAVILION
-            }
-            
-            # 默认使用传统建筑的模板
-            structure_type = structure_type_map.get(
-                particle.particle_type, 
-                StructureType.TRADITIONAL_BUILDING
-            )
-            
-            template = self.structure_templates.get(
-                structure_type, 
-                self.structure_templates[StructureType.TRADITIONAL_BUILDING]
+    def update_particles_with_audio(self, cloud: StructuredPointCloud, audio_energy: float,
+                                    frequency_bands: np.ndarray, step_scale: float = 1.0) -> bool:
+        """根据音频数据更新点云（整体向量化），返回本次是否产生了可见的调制
+        
+        step_scale为本步相对参考步（1/60秒）的时长，速度扰动、位移积分、回复与衰减均按其缩放
+        """
+        if len(cloud) == 0:
+            return False
+        
+        modulated = audio_energy > AUDIO_MODULATION_THRESHOLD
+        if not modulated:
+            audio_energy = 0.0
+        
+        # 音频响应强度
+        cloud.intensity[:] = audio_energy * self._responsiveness[cloud.structure_type]
+        
+        # 尺寸始终相对静止状态计算
+        cloud.size[:] = cloud.rest_size
+        
+        # 根据频段调整粒子属性
+        if modulated and len(frequency_bands) >= 3:
+            band_group = self._band_group[cloud.structure_type]
+            count = len(cloud)
+            
+            # 低频影响大型结构（有界放大）
+            size_gain = MAX_SIZE_MODULATION * math.tanh(frequency_bands[0] * 0.3 / MAX_SIZE_MODULATION)
+            cloud.size[band_group == 0] *= 1 + size_gain
+            
+            # 中频影响植被
+            vegetation = (band_group == 1) * step_scale
+            cloud.velocity_x += vegetation * (frequency_bands[1] * 0.1 * np.random.uniform(-1, 1, count))
+            cloud.velocity_y += vegetation * (frequency_bands[1] * 0.05 * np.random.uniform(-1, 1, count))
+            
+            # 高频影响船只和水榭
+            waterside = (band_group == 2) * step_scale
+            cloud.velocity_x += waterside * (frequency_bands[2] * 0.2 * np.random.uniform(-1, 1, count))
+            cloud.velocity_y += waterside * (frequency_bands[2] * 0.1 * np.random.uniform(-1, 1, count))
+            
+            np.clip(cloud.velocity_x, -MAX_AUDIO_DISPLACEMENT, MAX_AUDIO_DISPLACEMENT, out=cloud.velocity_x)
+            np.clip(cloud.velocity_y, -MAX_AUDIO_DISPLACEMENT, MAX_AUDIO_DISPLACEMENT, out=cloud.velocity_y)
+        
+        # 位移相对静止状态积分，并逐渐回复到静止位置（按指数折算到本步时长，与模拟频率无关）
+        restore = REST_RESTORE_FACTOR ** step_scale
+        offset_x = np.clip((cloud.x - cloud.rest_x + cloud.velocity_x * step_scale) * restore,
+                           -MAX_AUDIO_DISPLACEMENT, MAX_AUDIO_DISPLACEMENT)
+        offset_y = np.clip((cloud.y - cloud.rest_y + cloud.velocity_y * step_scale) * restore,
+                           -MAX_AUDIO_DISPLACEMENT, MAX_AUDIO_DISPLACEMENT)
+        cloud.x[:] = cloud.rest_x + offset_x
+        cloud.y[:] = cloud.rest_y + offset_y
+        
+        # 速度衰减
+        decay = VELOCITY_DECAY ** step_scale
+        cloud.velocity_x *= decay
+        cloud.velocity_y *= decay
+        
+        if not modulated:
+            modulated = bool(
+                np.any(np.abs(cloud.velocity_x) > REST_VELOCITY_EPSILON) or
+                np.any(np.abs(cloud.velocity_y) > REST_VELOCITY_EPSILON) or
+                np.any(np.abs(offset_x) > REST_OFFSET_EPSILON) or
+                np.any(np.abs(offset_y) > REST_OFFSET_EPSILON)
             )
-            
-            # 音频响应
-            responsiveness = template.audio_responsiveness
-            particle.intensity = audio_energy * responsiveness
-            
-            # 根据频段调整粒子属性
-            if len(frequency_bands) >= 3:
-                # 低频影响大型结构
-                if particle.particle_type in ["traditional_building", "modern_building", "pagoda"]:
-                    particle.size *= (1 + frequency_bands[0] * 0.3)
-                
-                # 中频影响植被
-                elif particle.particle_type in ["tree_cluster", "willow_tree", "pine_tree"]:
-                    particle.velocity_x += frequency_bands[1] * 0.1 * np.random.uniform(-1, 1)
-                    particle.velocity_y += frequency_bands[1] * 0.05 * np.random.uniform(-1, 1)
-                
-                # 高频影响船只和水榭
-                elif particle.particle_type in ["boat_structure", "water_pavilion"]:
-                    particle.velocity_x += frequency_bands[2] * 0.2 * np.random.uniform(-1, 1)
-                    particle.velocity_y += frequency_bands[2] * 0.1 * np.random.uniform(-1, 1)
-            
-            # 更新粒子位置（基于速度）
-            particle.x += particle.velocity_x
-            particle.y += particle.velocity_y
-            
-            # 速度衰减
-            particle.velocity_x *= 0.95
-            particle.velocity_y *= 0.95
+        
+        # 调制结束的那一帧同样需要刷新，以清除残留的强度效果
+        changed = modulated or self._last_modulated
+        self._last_modulated = modulated
+        return changed
 
 if __name__ == "__main__":
     # 测试结构化点云生成器
@@ -750,11 +883,20 @@ if __name__ == "__main__":
     print(f"生成了 {len(scene_particles)} 个结构化粒子")
     
     # 统计各类型粒子数量
-    type_counts = {}
-    for particle in scene_particles:
-        ptype = particle.particle_type
-        type_counts[ptype] = type_counts.get(ptype, 0) + 1
+    type_counts = np.bincount(scene_particles.structure_type, minlength=len(STRUCTURE_TYPE_ORDER))
     
     print("粒子类型分布:")
-    for ptype, count in type_counts.items():
-        print(f"  {ptype}: {count}")
\ No newline at end of file
+    for structure_type, count in zip(STRUCTURE_TYPE_ORDER, type_counts):
+        if count > 0:
+            print(f"  {structure_type.value}: {count}")
+    
+    # 音频响应基准：模拟一段会话，验证尺寸与位移保持有界
+    import time
+    bands = np.array([5.0, 5.0, 5.0])
+    start = time.perf_counter()
+    for _ in range(600):
+        generator.update_particles_with_audio(scene_particles, 0.2, bands)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / 600
+    print(f"音频响应更新: {elapsed_ms:.3f} ms/帧 ({len(scene_particles)} 个粒子)")
+    print(f"最大尺寸比例: {np.max(scene_particles.size / scene_particles.rest_size):.2f}")
+    print(f"最大位移: {np.max(np.abs(scene_particles.x - scene_particles.rest_x)):.2f} px")
\ No newline at end of file
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+字体注册表与文字表面缓存
+全进程共享：每种字体/字号只加载一次，渲染好的文字表面按LRU缓存复用，
+缓存按表面占用字节数淘汰，并统计命中率
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple, Any
+
+import pygame
+
+# 默认书法字体
+DEFAULT_FONT_FILE = "墨趣古风体.ttf"
+
+# 文字表面缓存默认容量（字节）
+DEFAULT_TEXT_CACHE_BYTES = 16 * 1024 * 1024
+
+class FontRegistry:
+    """字体注册表 - 按(字体, 字号)缓存pygame字体对象"""
+
+    def __init__(self):
+        self._fonts: Dict[Tuple[str, Optional[str], int], pygame.font.Font] = {}
+        self._keys: Dict[int, Tuple[str, Optional[str], int]] = {}
+
+    def _register(self, key: Tuple[str, Optional[str], int], font: pygame.font.Font) -> pygame.font.Font:
+        self._fonts[key] = font
+        self._keys[id(font)] = key
+        return font
+
+    def get(self, path: Optional[str], size: int) -> pygame.font.Font:
+        """获取字体文件对应的字体，加载失败时回退到pygame默认字体"""
+        key = ('file', path, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        if not pygame.font.get_init():
+            pygame.font.init()
+        try:
+            font = pygame.font.Font(path, size)
+        except Exception as e:
+            print(f"字体加载失败 {path} ({size}): {e}，使用默认字体")
+            font = self.get(None, size) if path is not None else pygame.font.Font(None, size)
+        return self._register(key, font)
+
+    def get_sysfont(self, name: str, size: int) -> pygame.font.Font:
+        """获取系统字体"""
+        key = ('sys', name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self._register(key, pygame.font.SysFont(name, size))
+        return font
+
+    def try_get(self, path: str, size: int) -> Optional[pygame.font.Font]:
+        """尝试加载字体文件，失败时返回None（不回退）"""
+        key = ('file', path, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        if not pygame.font.get_init():
+            pygame.font.init()
+        try:
+            return self._register(key, pygame.font.Font(path, size))
+        except Exception:
+            return None
+
+    def key_of(self, font: pygame.font.Font) -> Optional[Tuple[str, Optional[str], int]]:
+        """查询字体对象在注册表中的键"""
+        return self._keys.get(id(font))
+
+class TextSurfaceCache:
+    """文字表面LRU缓存 - 键为(字体, 字号, 文字, 颜色, 抗锯齿, 背景色)
+
+    返回的表面为共享对象，调用方不得修改（如set_alpha），需要修改时先copy()。
+    """
+
+    def __init__(self, registry: FontRegistry, max_bytes: int = DEFAULT_TEXT_CACHE_BYTES):
+        self.registry = registry
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[pygame.Surface, int, Any]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _surface_bytes(surface: pygame.Surface) -> int:
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def render(self, font: pygame.font.Font, text: str, antialias: bool, color,
+               background=None) -> pygame.Surface:
+        """渲染文字（参数顺序与pygame.font.Font.render一致），命中缓存时直接复用"""
+        font_key = self.registry.key_of(font)
+        if font_key is None:
+            # 未注册的字体以对象标识区分，缓存条目持有字体引用，标识在条目存活期间不会被复用
+            font_key = ('object', id(font), font.get_height())
+        key = (font_key, text, tuple(color), bool(antialias),
+               tuple(background) if background is not None else None)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        if background is None:
+            surface = font.render(text, antialias, color)
+        else:
+            surface = font.render(text, antialias, color, background)
+
+        size = self._surface_bytes(surface)
+        if size <= self.max_bytes:
+            self._entries[key] = (surface, size, font)
+            self.current_bytes += size
+            self._evict()
+        return surface
+
+    def _evict(self):
+        """按LRU顺序淘汰，直到总字节数不超过上限"""
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / total if total else 0.0
+        }
+
+# 全局实例
+font_registry = FontRegistry()
+text_cache = TextSurfaceCache(font_registry)
+
+def get_font(path: Optional[str], size: int) -> pygame.font.Font:
+    """获取共享字体（path为None时为pygame默认字体）"""
+    return font_registry.get(path, size)
+
+def get_first_font(paths: Sequence[str], size: int) -> Tuple[Optional[str], pygame.font.Font]:
+    """按顺序尝试字体文件，返回(成功的路径, 字体)；全部失败时返回默认字体"""
+    for path in paths:
+        font = font_registry.try_get(path, size)
+        if font is not None:
+            return path, font
+    return None, font_registry.get(None, size)
+
+def render_text(font: pygame.font.Font, text: str, antialias: bool, color,
+                background=None) -> pygame.Surface:
+    """通过全局缓存渲染文字"""
+    return text_cache.render(font, text, antialias, color, background)
+
+def get_text_cache_stats() -> Dict[str, Any]:
+    """获取全局文字缓存统计信息"""
+    return text_cache.get_stats()
+
+if __name__ == "__main__":
+    import time
+
+    pygame.init()
+    font = get_font(None, 24)
+    labels = [f"音频强度: {i / 10:.2f}" for i in range(20)]
+
+    start = time.perf_counter()
+    for _ in range(200):
+        for label in labels:
+            font.render(label, True, (40, 40, 40))
+    uncached = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(200):
+        for label in labels:
+            render_text(font, label, True, (40, 40, 40))
+    cached = time.perf_counter() - start
+
+    print(f"直接渲染: {uncached * 1000:.1f} ms，缓存渲染: {cached * 1000:.1f} ms")
+    print(f"缓存统计: {get_text_cache_stats()}")
+    pygame.quit()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+流式视频编码器
+将逐帧生成的RGB画面直接通过管道送入ffmpeg子进程编码，不写临时PNG帧、不在内存中累积整段视频。
+帧先进入有界队列，由写入线程送入ffmpeg，画面生成与编码可以并行，内存占用不超过队列长度。
+除MP4外还支持动态WebP与APNG（手机下载用的轻量动图），并可将已有MP4转码为这两种格式。
+"""
+
+import dataclasses
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# 默认编码参数
+DEFAULT_VIDEO_CODEC = "libx264"
+DEFAULT_VIDEO_CRF = 23
+DEFAULT_VIDEO_PRESET = "veryfast"
+
+# 动图（WebP/APNG）默认参数：面向手机下载，缩小画面并降低帧率
+DEFAULT_WEBP_QUALITY = 75
+DEFAULT_ANIMATED_IMAGE_SCALE = 0.5
+DEFAULT_ANIMATED_IMAGE_FPS = 12
+
+# 等待写入ffmpeg的最大帧数
+DEFAULT_QUEUE_FRAMES = 8
+
+@dataclass(frozen=True)
+class AnimationFormat:
+    """动画输出格式"""
+    name: str
+    extension: str
+    mime_type: str
+    muxer: str
+
+ANIMATION_FORMATS: Dict[str, AnimationFormat] = {
+    'mp4': AnimationFormat('mp4', '.mp4', 'video/mp4', 'mp4'),
+    'webp': AnimationFormat('webp', '.webp', 'image/webp', 'webp'),
+    'apng': AnimationFormat('apng', '.apng', 'image/apng', 'apng'),
+}
+
+@dataclass(frozen=True)
+class EncoderSettings:
+    """视频编码参数（scale/fps为输出缩放比例与输出帧率，fps为0时与输入一致）"""
+    codec: str = DEFAULT_VIDEO_CODEC
+    crf: int = DEFAULT_VIDEO_CRF
+    preset: str = DEFAULT_VIDEO_PRESET
+    pix_fmt: str = "yuv420p"
+    format: str = "mp4"
+    webp_quality: int = DEFAULT_WEBP_QUALITY
+    scale: float = 1.0
+    fps: int = 0
+
+    @property
+    def animation_format(self) -> AnimationFormat:
+        return ANIMATION_FORMATS[self.format]
+
+    @classmethod
+    def from_config(cls, config: dict, format: str = "mp4") -> "EncoderSettings":
+        """从generation配置读取指定格式的编码参数"""
+        if format not in ANIMATION_FORMATS:
+            raise ValueError(f"不支持的动画格式: {format}")
+        if format == 'mp4':
+            return cls(
+                codec=config.get('video_codec', DEFAULT_VIDEO_CODEC),
+                crf=int(config.get('video_crf', DEFAULT_VIDEO_CRF)),
+                preset=config.get('video_preset', DEFAULT_VIDEO_PRESET)
+            )
+        return cls(
+            format=format,
+            webp_quality=int(config.get('webp_quality', DEFAULT_WEBP_QUALITY)),
+            scale=float(config.get('animated_image_scale', DEFAULT_ANIMATED_IMAGE_SCALE)),
+            fps=int(config.get('animated_image_fps', DEFAULT_ANIMATED_IMAGE_FPS))
+        )
+
+    def output_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """输出画面尺寸（保持偶数，满足yuv420p要求）"""
+        if self.scale == 1.0:
+            return tuple(size)
+        return max(2, int(size[0] * self.scale) // 2 * 2), max(2, int(size[1] * self.scale) // 2 * 2)
+
+    def output_args(self, size: Optional[Tuple[int, int]]) -> list:
+        """ffmpeg输出端参数（滤镜、编码器与封装格式），输入尺寸未知时按表达式缩放"""
+        args = []
+        filters = []
+        if self.fps:
+            filters.append(f"fps={self.fps}")
+        if self.scale != 1.0:
+            if size is None:
+                filters.append(f"scale=trunc(iw*{self.scale}/2)*2:-2:flags=area")
+            else:
+                width, height = self.output_size(size)
+                filters.append(f"scale={width}:{height}:flags=area")
+        if filters:
+            args += ["-vf", ",".join(filters)]
+
+        if self.format == 'webp':
+            args += ["-c:v", "libwebp_anim", "-lossless", "0", "-quality", str(self.webp_quality),
+                     "-compression_level", "4", "-loop", "0"]
+        elif self.format == 'apng':
+            args += ["-c:v", "apng", "-pred", "mixed", "-plays", "0", "-pix_fmt", "rgb24"]
+        else:
+            args += ["-c:v", self.codec, "-preset", self.preset, "-crf", str(self.crf),
+                     "-pix_fmt", self.pix_fmt, "-movflags", "+faststart"]
+        return args + ["-an", "-f", self.animation_format.muxer]
+
+def ffmpeg_available() -> bool:
+    """检查ffmpeg是否可用"""
+    return shutil.which("ffmpeg") is not None
+
+class StreamingVideoEncoder:
+    """ffmpeg管道编码器，用法：
+
+        with StreamingVideoEncoder(path, (960, 540), 24) as encoder:
+            for frame in frames:
+                encoder.write(frame)
+    """
+
+    def __init__(self, output_path: Union[str, Path], size: Tuple[int, int], fps: int,
+                 settings: EncoderSettings = EncoderSettings(), queue_frames: int = DEFAULT_QUEUE_FRAMES):
+        self.output_path = Path(output_path)
+        self.size = tuple(size)
+        self.fps = fps
+        self.settings = settings
+        self.frames_written = 0
+
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=queue_frames)
+        self._process: Optional[subprocess.Popen] = None
+        self._writer: Optional[threading.Thread] = None
+        self._write_error: Optional[BaseException] = None
+        self._temp_path = _temp_path_for(self.output_path)
+
+    def _command(self) -> list:
+        width, height = self.size
+        return [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(self.fps),
+            "-i", "-",
+            *self.settings.output_args(self.size),
+            str(self._temp_path)
+        ]
+
+    def open(self) -> "StreamingVideoEncoder":
+        """启动ffmpeg子进程与写入线程"""
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        self._process = subprocess.Popen(
+            self._command(), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        self._writer = threading.Thread(target=self._write_loop, name="video-encoder", daemon=True)
+        self._writer.start()
+        return self
+
+    def _write_loop(self):
+        try:
+            while True:
+                data = self._queue.get()
+                if data is None:
+                    break
+                self._process.stdin.write(data)
+        except BaseException as e:
+            self._write_error = e
+            # 继续取空队列，避免生产方阻塞在put上
+            while self._queue.get() is not None:
+                pass
+        finally:
+            try:
+                self._process.stdin.close()
+            except Exception:
+                pass
+
+    def write(self, frame) -> None:
+        """写入一帧（PIL图像或HxWx3的uint8数组），队列满时阻塞等待编码"""
+        if self._write_error is not None:
+            raise RuntimeError(f"视频编码写入失败: {self._write_error}")
+
+        if isinstance(frame, np.ndarray):
+            array = frame
+        else:
+            array = np.asarray(frame.convert('RGB') if frame.mode != 'RGB' else frame)
+        if array.shape[1] != self.size[0] or array.shape[0] != self.size[1]:
+            raise ValueError(f"帧尺寸 {array.shape[1]}x{array.shape[0]} 与编码尺寸 {self.size} 不一致")
+
+        self._queue.put(np.ascontiguousarray(array[:, :, :3], dtype=np.uint8).tobytes())
+        self.frames_written += 1
+
+    def close(self) -> str:
+        """结束编码，成功后将文件移动到目标路径并返回路径"""
+        self._queue.put(None)
+        self._writer.join()
+        stderr = self._process.stderr.read().decode('utf-8', errors='replace')
+        return_code = self._process.wait()
+
+        if self._write_error is not None or return_code != 0:
+            self._temp_path.unlink(missing_ok=True)
+            raise RuntimeError(f"ffmpeg编码失败 (返回码 {return_code}): {stderr.strip()[-500:] or self._write_error}")
+
+        os.replace(self._temp_path, self.output_path)
+        return str(self.output_path)
+
+    def abort(self):
+        """放弃编码并清理临时文件"""
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=1.0)
+        if self._process is not None:
+            self._process.wait()
+        self._temp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "StreamingVideoEncoder":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+def _temp_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.stem + ".part" + output_path.suffix)
+
+def animation_path_for(base_path: Union[str, Path], format: str) -> Path:
+    """同一动画不同格式的输出路径（仅扩展名不同）"""
+    return Path(base_path).with_suffix(ANIMATION_FORMATS[format].extension)
+
+def probe_size(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    """读取视频画面尺寸（需要ffprobe），失败返回None"""
+    if shutil.which("ffprobe") is None:
+        return None
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries", "stream=width,height",
+             "-of", "csv=p=0:s=x", str(path)],
+            capture_output=True, text=True, timeout=10
+        )
+        width, height = result.stdout.strip().split("x")
+        return int(width), int(height)
+    except Exception:
+        return None
+
+def transcode_animation(source_path: Union[str, Path], output_path: Union[str, Path],
+                        settings: EncoderSettings, timeout: float = 120.0) -> str:
+    """将已有动画（通常为MP4）转码为其他格式，先写临时文件再替换，返回输出路径"""
+    output_path = Path(output_path)
+    temp_path = _temp_path_for(output_path)
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-i", str(source_path),
+               *settings.output_args(probe_size(source_path)), str(temp_path)]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+    if result.returncode != 0:
+        temp_path.unlink(missing_ok=True)
+        stderr = result.stderr.decode('utf-8', errors='replace').strip()[-500:]
+        raise RuntimeError(f"动画转码失败 (返回码 {result.returncode}): {stderr}")
+    os.replace(temp_path, output_path)
+    return str(output_path)
+
+def negotiate_animation_format(accept_header: Optional[str], offered: Sequence[str]) -> str:
+    """按Accept请求头从提供的格式中选择（q值最高者；q值相同时按offered顺序）"""
+    if not offered:
+        raise ValueError("没有可提供的动画格式")
+    if not accept_header:
+        return offered[0]
+
+    # 解析媒体范围及q值
+    ranges: Dict[str, float] = {}
+    for part in accept_header.split(","):
+        fields = [field.strip() for field in part.split(";")]
+        media_range = fields[0].lower()
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        ranges[media_range] = max(quality, ranges.get(media_range, 0.0))
+
+    def quality_of(mime_type: str) -> float:
+        # 越具体的媒体范围优先
+        major = mime_type.split("/")[0]
+        for media_range in (mime_type, f"{major}/*", "*/*"):
+            if media_range in ranges:
+                return ranges[media_range]
+        return 0.0
+
+    best = max(offered, key=lambda name: (quality_of(ANIMATION_FORMATS[name].mime_type), -offered.index(name)))
+    return best if quality_of(ANIMATION_FORMATS[best].mime_type) > 0 else offered[-1]
+
+# 格式对比的目标画质（平均PSNR，dB）
+BENCHMARK_TARGET_PSNR = 38.0
+
+# 有损格式的画质参数：(EncoderSettings字段, 最差取值, 最好取值)
+QUALITY_KNOBS = {
+    'mp4': ('crf', 51, 0),
+    'webp': ('webp_quality', 0, 100),
+}
+
+def _benchmark_encode(frames: Sequence[np.ndarray], size: Tuple[int, int], fps: int,
+                      settings: EncoderSettings, output_path: Path) -> Dict[str, float]:
+    """编码一次并测量耗时、文件大小与画质"""
+    import time
+
+    start = time.perf_counter()
+    with StreamingVideoEncoder(output_path, size, fps, settings) as encoder:
+        for frame in frames:
+            encoder.write(frame)
+    return {
+        'seconds': time.perf_counter() - start,
+        'bytes': output_path.stat().st_size,
+        'psnr': _measure_psnr(output_path, frames, settings.output_size(size))
+    }
+
+def benchmark_animation_formats(formats: Sequence[str] = ('mp4', 'webp', 'apng'), fps: int = 12,
+                                duration: float = 7.0, scale: float = 0.5,
+                                target_psnr: float = BENCHMARK_TARGET_PSNR) -> Dict[str, Dict[str, float]]:
+    """在相同画面尺寸、帧率与画质下比较各格式的编码耗时与文件大小
+
+    有损格式（MP4按CRF、WebP按quality）二分查找达到target_psnr的最低画质设置，再比较该设置下的大小；
+    APNG为无损格式，直接编码。同时报告默认设置的画质，便于核对默认值是否合适。
+    """
+    from types import SimpleNamespace
+    from ink_wash_pygame import InkWashRenderer
+
+    renderer = InkWashRenderer()
+    params = SimpleNamespace(brush_thickness=0.6, ink_density=0.8, flywhite_intensity=0.4,
+                             ink_blur=0.3, ink_spread=0.2)
+    frames = list(renderer.iter_animation_frames("水", "行书", params, int(fps * duration)))
+    size = renderer.canvas_size
+    output_dir = Path("output") / "benchmark"
+
+    results = {}
+    for name in formats:
+        # 统一输出尺寸与帧率，仅编码格式与画质设置不同
+        base = dataclasses.replace(EncoderSettings(format=name), scale=scale, fps=0)
+        output_path = output_dir / f"formats{ANIMATION_FORMATS[name].extension}"
+        try:
+            default = _benchmark_encode(frames, size, fps, base, output_path)
+            knob = QUALITY_KNOBS.get(name)
+            if knob is None:
+                result, setting = default, "无损"
+            else:
+                field, worst, best = knob
+                result = _benchmark_encode(frames, size, fps, dataclasses.replace(base, **{field: best}), output_path)
+                if result['psnr'] < target_psnr:
+                    print(f"{name}: 最高画质 PSNR {result['psnr']:.1f} dB 未达到目标 {target_psnr:.1f} dB")
+                # 在(worst, best]之间二分查找达到目标画质的最低设置
+                while abs(best - worst) > 1 and result['psnr'] >= target_psnr:
+                    middle = (worst + best) // 2
+                    attempt = _benchmark_encode(frames, size, fps,
+                                                dataclasses.replace(base, **{field: middle}), output_path)
+                    if attempt['psnr'] >= target_psnr:
+                        best, result = middle, attempt
+                    else:
+                        worst = middle
+                setting = f"{field}={best}"
+        except Exception as e:
+            print(f"{name}: 编码失败 {e}")
+            continue
+
+        results[name] = dict(result, default_bytes=default['bytes'], default_psnr=default['psnr'])
+        print(f"{name}: 等画质({setting}) 编码 {result['seconds']:.2f} 秒，{result['bytes'] / 1024:.0f} KB，"
+              f"PSNR {result['psnr']:.1f} dB；默认设置 {default['bytes'] / 1024:.0f} KB，"
+              f"PSNR {default['psnr']:.1f} dB")
+
+    if 'mp4' in results:
+        for name, result in results.items():
+            print(f"{name}: 等画质大小为MP4的 {result['bytes'] / max(results['mp4']['bytes'], 1):.2f} 倍")
+    return results
+
+def _measure_psnr(path: Path, frames: Sequence[np.ndarray], size: Tuple[int, int]) -> float:
+    """解码输出文件并与（同样缩放后的）源帧比较平均PSNR"""
+    width, height = size
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", str(path), "-f", "rawvideo", "-pix_fmt", "rgb24", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    decoded = np.frombuffer(result.stdout, dtype=np.uint8)
+    frame_bytes = width * height * 3
+    if decoded.size < frame_bytes:
+        # ffmpeg不支持解码动态WebP时改用PIL
+        from PIL import Image, ImageSequence
+        with Image.open(path) as image:
+            decoded_frames = [np.asarray(frame.convert('RGB')) for frame in ImageSequence.Iterator(image)]
+    else:
+        decoded_frames = list(decoded[:decoded.size // frame_bytes * frame_bytes].reshape(-1, height, width, 3))
+
+    from PIL import Image
+    scores = []
+    for source, output in zip(frames, decoded_frames):
+        reference = np.asarray(Image.fromarray(source).resize((width, height), Image.BOX), dtype=np.float32)
+        mse = float(np.mean((reference - output.astype(np.float32)) ** 2))
+        scores.append(99.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse))
+    return float(np.mean(scores)) if scores else 0.0
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if not ffmpeg_available():
+        print("未找到ffmpeg")
+    elif "--benchmark" in sys.argv:
+        benchmark_animation_formats()
+    else:
+        width, height, fps, seconds = 960, 540, 24, 7
+        start = time.perf_counter()
+        with StreamingVideoEncoder("output/encoder_test.mp4", (width, height), fps) as encoder:
+            xs = np.arange(width)
+            for i in range(fps * seconds):
+                frame = np.empty((height, width, 3), dtype=np.uint8)
+                frame[:] = ((xs + i * 4) % 256).astype(np.uint8)[None, :, None]
+                encoder.write(frame)
+        print(f"编码 {fps * seconds} 帧用时 {time.perf_counter() - start:.2f} 秒")
@@ -17,6 +17,8 @@ import socket
 
 from canal_visualizer import CanalColors
 from generator import GeneratedArt
+from font_service import get_font_service
+from text_cache import render_text
 from local_calligraphy_generator import LocalCalligraphyGenerator
 
 class UIRenderer:
@@ -31,6 +33,9 @@ class UIRenderer:
         # 表面缓存
         self._surface_cache = {}
         
+        # 上一次E2覆盖层绘制的区域（用于局部刷新）
+        self.dirty_rects = []
+        
         # 加载字体
         self._load_fonts()
         
@@ -59,26 +64,12 @@ class UIRenderer:
         print("UI渲染器初始化完成")
     
     def _load_fonts(self):
-        """加载字体"""
-        try:
-            # 尝试加载中文字体
-            font_path = "墨趣古风体.ttf"
-            if Path(font_path).exists():
-                self.font_title = pygame.font.Font(font_path, 72)
-                self.font_large = pygame.font.Font(font_path, 48)
-                self.font_medium = pygame.font.Font(font_path, 32)
-                self.font_small = pygame.font.Font(font_path, 24)
-                print(f"中文字体加载成功: {font_path}")
-            else:
-                raise FileNotFoundError("中文字体文件不存在")
-        except Exception as e:
-            print(f"中文字体加载失败: {e}")
-            # 使用系统默认字体
-            self.font_title = pygame.font.Font(None, 72)
-            self.font_large = pygame.font.Font(None, 48)
-            self.font_medium = pygame.font.Font(None, 32)
-            self.font_small = pygame.font.Font(None, 24)
-            print("使用系统默认字体")
+        """从字体服务获取共享字体（无可用中文字体时为系统默认字体）"""
+        service = get_font_service()
+        self.font_title = service.pygame_font(72)
+        self.font_large = service.pygame_font(48)
+        self.font_medium = service.pygame_font(32)
+        self.font_small = service.pygame_font(24)
     
     def update_animation(self, dt: float):
         """更新动画状态"""
@@ -172,24 +163,24 @@ class UIRenderer:
         
         # 标题
         title_text = "水上书"
-        title_surface = self.font_title.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_title, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 3))
         
         # 标题阴影
-        shadow_surface = self.font_title.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_title, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 3, self.height // 3 + 3))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
         
         # 副标题
         subtitle_text = "运河环境声音艺术生成器"
-        subtitle_surface = self.font_large.render(subtitle_text, True, CanalColors.INK_MEDIUM)
+        subtitle_surface = render_text(self.font_large, subtitle_text, True, CanalColors.INK_MEDIUM)
         subtitle_rect = subtitle_surface.get_rect(center=(self.width // 2, self.height // 2))
         self.screen.blit(subtitle_surface, subtitle_rect)
         
         # 提示文字
         hint_text = "按任意键开始体验"
-        hint_surface = self.font_medium.render(hint_text, True, CanalColors.INK_LIGHT)
+        hint_surface = render_text(self.font_medium, hint_text, True, CanalColors.INK_LIGHT)
         hint_rect = hint_surface.get_rect(center=(self.width // 2, self.height // 2 + 80))
         self.screen.blit(hint_surface, hint_rect)
         
@@ -324,11 +315,11 @@ class UIRenderer:
         
         # 标题 - 使用传统墨色
         title_text = "聆听水上环境"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 4))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, self.height // 4 + 2))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -336,7 +327,7 @@ class UIRenderer:
         # 倒计时 - 使用运河蓝
         countdown = int(remaining_time) + 1
         countdown_text = f"{countdown}"
-        countdown_surface = self.font_large.render(countdown_text, True, CanalColors.CANAL_BLUE)
+        countdown_surface = render_text(self.font_large, countdown_text, True, CanalColors.CANAL_BLUE)
         countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height // 2))
         self.screen.blit(countdown_surface, countdown_rect)
         
@@ -356,7 +347,7 @@ class UIRenderer:
         line_spacing = 45  # 增加行间距
         for line in guide_lines:
             if line:
-                text_surface = self.font_small.render(line, True, CanalColors.INK_LIGHT)
+                text_surface = render_text(self.font_small, line, True, CanalColors.INK_LIGHT)
                 text_rect = text_surface.get_rect(center=(self.width // 2, y_offset))
                 self.screen.blit(text_surface, text_rect)
             y_offset += line_spacing
@@ -371,7 +362,7 @@ class UIRenderer:
         
         # 录制状态指示
         record_text = "正在采集运河环境声音..."
-        record_surface = self.font_medium.render(record_text, True, CanalColors.INK_BLACK)
+        record_surface = render_text(self.font_medium, record_text, True, CanalColors.INK_BLACK)
         record_rect = record_surface.get_rect(center=(self.width // 2, self.height // 4))
         
         # 添加背景框
@@ -406,7 +397,7 @@ class UIRenderer:
         # 时间显示
         remaining_time = max(0, 35 - int(progress * 35))
         time_text = f"剩余时间: {remaining_time}秒"
-        time_surface = self.font_small.render(time_text, True, CanalColors.INK_MEDIUM)
+        time_surface = render_text(self.font_small, time_text, True, CanalColors.INK_MEDIUM)
         time_rect = time_surface.get_rect(center=(self.width // 2, progress_y + 30))
         overlay.blit(time_surface, time_rect)
         
@@ -422,8 +413,14 @@ class UIRenderer:
         pygame.draw.circle(indicator_surface, indicator_color, (indicator_radius, indicator_radius), indicator_radius)
         overlay.blit(indicator_surface, (indicator_pos[0] - indicator_radius, indicator_pos[1] - indicator_radius))
         
-        # 混合到主屏幕
-        self.screen.blit(overlay, (0, 0))
+        # 只将覆盖层的内容区域混合到主屏幕，并记录为脏矩形
+        overlay_bounds = bg_rect.unionall([
+            progress_bg,
+            time_rect,
+            pygame.Rect(indicator_pos[0] - indicator_radius, indicator_pos[1] - indicator_radius,
+                        indicator_radius * 2, indicator_radius * 2)
+        ])
+        self.dirty_rects = [self.screen.blit(overlay, overlay_bounds.topleft, overlay_bounds)]
     
     def render_generate_screen(self, progress: float):
         """渲染E3生成状态界面 - 水墨风格进度指示器"""
@@ -433,11 +430,11 @@ class UIRenderer:
         
         # 主标题
         title_text = "正在采集运河环境声音"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 6))
         
         # 添加标题阴影效果
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 3, self.height // 6 + 3))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -462,7 +459,7 @@ class UIRenderer:
         # 进度百分比
         progress_percent = int(progress * 100)
         percent_text = f"{progress_percent}%"
-        percent_surface = self.font_medium.render(percent_text, True, CanalColors.INK_BLACK)
+        percent_surface = render_text(self.font_medium, percent_text, True, CanalColors.INK_BLACK)
         percent_rect = percent_surface.get_rect(center=(self.width // 2, progress_y + 50))
         self.screen.blit(percent_surface, percent_rect)
         
@@ -496,7 +493,7 @@ class UIRenderer:
                 # 完成标记
                 if i < current_step:
                     check_text = "完"
-                    check_surface = self.font_small.render(check_text, True, CanalColors.PAPER_WHITE)
+                    check_surface = render_text(self.font_small, check_text, True, CanalColors.PAPER_WHITE)
                     check_rect = check_surface.get_rect(center=(circle_x, step_y))
                     self.screen.blit(check_surface, check_rect)
                 else:
@@ -517,7 +514,7 @@ class UIRenderer:
             
             # 步骤文字
             text_color = CanalColors.INK_BLACK if i <= current_step else CanalColors.INK_LIGHT
-            step_surface = self.font_small.render(step, True, text_color)
+            step_surface = render_text(self.font_small, step, True, text_color)
             step_rect = step_surface.get_rect(left=circle_x + 30, centery=step_y)
             self.screen.blit(step_surface, step_rect)
         
@@ -561,11 +558,11 @@ class UIRenderer:
         
         # 标题
         title_text = "选择水墨风格"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 6))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, self.height // 6 + 2))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -594,24 +591,24 @@ class UIRenderer:
                 
                 # 选中标记
                 mark_text = "●"
-                mark_surface = self.font_medium.render(mark_text, True, CanalColors.CANAL_BLUE)
+                mark_surface = render_text(self.font_medium, mark_text, True, CanalColors.CANAL_BLUE)
                 mark_rect = mark_surface.get_rect(center=(self.width // 4 - 30, y))
                 self.screen.blit(mark_surface, mark_rect)
             
             # 风格名称
-            style_surface = self.font_medium.render(style, True, CanalColors.INK_BLACK)
+            style_surface = render_text(self.font_medium, style, True, CanalColors.INK_BLACK)
             style_rect = style_surface.get_rect(center=(self.width // 2, y - 15))
             self.screen.blit(style_surface, style_rect)
             
             # 风格描述
-            desc_surface = self.font_small.render(style_descriptions[style], True, CanalColors.INK_MEDIUM)
+            desc_surface = render_text(self.font_small, style_descriptions[style], True, CanalColors.INK_MEDIUM)
             desc_rect = desc_surface.get_rect(center=(self.width // 2, y + 15))
             self.screen.blit(desc_surface, desc_rect)
         
         # 倒计时
         countdown = int(remaining_time) + 1
         countdown_text = f"自动确认: {countdown}s"
-        countdown_surface = self.font_small.render(countdown_text, True, CanalColors.INK_LIGHT)
+        countdown_surface = render_text(self.font_small, countdown_text, True, CanalColors.INK_LIGHT)
         countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height - 120))
         self.screen.blit(countdown_surface, countdown_rect)
         
@@ -638,11 +635,11 @@ class UIRenderer:
         
         # 标题
         title_text = "水墨艺术作品"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, 60))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, 62))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -673,18 +670,18 @@ class UIRenderer:
         y_offset = info_y + 30
         for label, value in info_items:
             # 标签
-            label_surface = self.font_small.render(f"{label}:", True, CanalColors.INK_MEDIUM)
+            label_surface = render_text(self.font_small, f"{label}:", True, CanalColors.INK_MEDIUM)
             self.screen.blit(label_surface, (info_x + 20, y_offset))
             
             # 值
-            value_surface = self.font_small.render(str(value), True, CanalColors.INK_BLACK)
+            value_surface = render_text(self.font_small, str(value), True, CanalColors.INK_BLACK)
             self.screen.blit(value_surface, (info_x + 120, y_offset))
             
             y_offset += 40
         
         # 实时声音映射信息
         mapping_y = y_offset + 20
-        mapping_title = self.font_small.render("实时声音映射:", True, CanalColors.INK_MEDIUM)
+        mapping_title = render_text(self.font_small, "实时声音映射:", True, CanalColors.INK_MEDIUM)
         self.screen.blit(mapping_title, (info_x + 20, mapping_y))
         
         # 显示当前音频特征
@@ -698,7 +695,7 @@ class UIRenderer:
         ]
         
         for i, info in enumerate(audio_info):
-            info_surface = self.font_small.render(info, True, CanalColors.INK_LIGHT)
+            info_surface = render_text(self.font_small, info, True, CanalColors.INK_LIGHT)
             self.screen.blit(info_surface, (info_x + 30, mapping_y + 25 + i * 20))
         
         # 二维码（保持原有功能）
@@ -708,7 +705,7 @@ class UIRenderer:
         # 倒计时显示
         if remaining_time > 0:
             countdown_text = f"自动返回: {int(remaining_time)}秒"
-            countdown_surface = self.font_small.render(countdown_text, True, CanalColors.INK_MEDIUM)
+            countdown_surface = render_text(self.font_small, countdown_text, True, CanalColors.INK_MEDIUM)
             countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height - 80))
             self.screen.blit(countdown_surface, countdown_rect)
         
@@ -766,11 +763,11 @@ class UIRenderer:
         
         # 标题 - 使用传统墨色
         title_text = "聆听水上环境"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 4))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, self.height // 4 + 2))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -778,7 +775,7 @@ class UIRenderer:
         # 倒计时 - 使用运河蓝
         countdown = int(remaining_time) + 1
         countdown_text = f"{countdown}"
-        countdown_surface = self.font_large.render(countdown_text, True, CanalColors.CANAL_BLUE)
+        countdown_surface = render_text(self.font_large, countdown_text, True, CanalColors.CANAL_BLUE)
         countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height // 2))
         self.screen.blit(countdown_surface, countdown_rect)
         
@@ -798,7 +795,7 @@ class UIRenderer:
         line_spacing = 45  # 增加行间距
         for line in guide_lines:
             if line:
-                text_surface = self.font_small.render(line, True, CanalColors.INK_LIGHT)
+                text_surface = render_text(self.font_small, line, True, CanalColors.INK_LIGHT)
                 text_rect = text_surface.get_rect(center=(self.width // 2, y_offset))
                 self.screen.blit(text_surface, text_rect)
             y_offset += line_spacing
@@ -813,7 +810,7 @@ class UIRenderer:
         
         # 录制状态指示
         record_text = "正在采集运河环境声音..."
-        record_surface = self.font_medium.render(record_text, True, CanalColors.INK_BLACK)
+        record_surface = render_text(self.font_medium, record_text, True, CanalColors.INK_BLACK)
         record_rect = record_surface.get_rect(center=(self.width // 2, self.height // 4))
         
         # 添加背景框
@@ -848,7 +845,7 @@ class UIRenderer:
         # 时间显示
         remaining_time = max(0, 35 - int(progress * 35))
         time_text = f"剩余时间: {remaining_time}秒"
-        time_surface = self.font_small.render(time_text, True, CanalColors.INK_MEDIUM)
+        time_surface = render_text(self.font_small, time_text, True, CanalColors.INK_MEDIUM)
         time_rect = time_surface.get_rect(center=(self.width // 2, progress_y + 30))
         overlay.blit(time_surface, time_rect)
         
@@ -864,8 +861,14 @@ class UIRenderer:
         pygame.draw.circle(indicator_surface, indicator_color, (indicator_radius, indicator_radius), indicator_radius)
         overlay.blit(indicator_surface, (indicator_pos[0] - indicator_radius, indicator_pos[1] - indicator_radius))
         
-        # 混合到主屏幕
-        self.screen.blit(overlay, (0, 0))
+        # 只将覆盖层的内容区域混合到主屏幕，并记录为脏矩形
+        overlay_bounds = bg_rect.unionall([
+            progress_bg,
+            time_rect,
+            pygame.Rect(indicator_pos[0] - indicator_radius, indicator_pos[1] - indicator_radius,
+                        indicator_radius * 2, indicator_radius * 2)
+        ])
+        self.dirty_rects = [self.screen.blit(overlay, overlay_bounds.topleft, overlay_bounds)]
     
     def render_generate_screen(self, progress: float):
         """渲染E3生成状态界面 - 水墨风格进度指示器"""
@@ -875,11 +878,11 @@ class UIRenderer:
         
         # 主标题
         title_text = "正在采集运河环境声音"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 6))
         
         # 添加标题阴影效果
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 3, self.height // 6 + 3))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -904,7 +907,7 @@ class UIRenderer:
         # 进度百分比
         progress_percent = int(progress * 100)
         percent_text = f"{progress_percent}%"
-        percent_surface = self.font_medium.render(percent_text, True, CanalColors.INK_BLACK)
+        percent_surface = render_text(self.font_medium, percent_text, True, CanalColors.INK_BLACK)
         percent_rect = percent_surface.get_rect(center=(self.width // 2, progress_y + 50))
         self.screen.blit(percent_surface, percent_rect)
         
@@ -938,7 +941,7 @@ class UIRenderer:
                 # 完成标记
                 if i < current_step:
                     check_text = "完"
-                    check_surface = self.font_small.render(check_text, True, CanalColors.PAPER_WHITE)
+                    check_surface = render_text(self.font_small, check_text, True, CanalColors.PAPER_WHITE)
                     check_rect = check_surface.get_rect(center=(circle_x, step_y))
                     self.screen.blit(check_surface, check_rect)
                 else:
@@ -959,7 +962,7 @@ class UIRenderer:
             
             # 步骤文字
             text_color = CanalColors.INK_BLACK if i <= current_step else CanalColors.INK_LIGHT
-            step_surface = self.font_small.render(step, True, text_color)
+            step_surface = render_text(self.font_small, step, True, text_color)
             step_rect = step_surface.get_rect(left=circle_x + 30, centery=step_y)
             self.screen.blit(step_surface, step_rect)
         
@@ -1003,11 +1006,11 @@ class UIRenderer:
         
         # 标题
         title_text = "选择水墨风格"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 6))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, self.height // 6 + 2))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -1036,24 +1039,24 @@ class UIRenderer:
                 
                 # 选中标记
                 mark_text = "●"
-                mark_surface = self.font_medium.render(mark_text, True, CanalColors.CANAL_BLUE)
+                mark_surface = render_text(self.font_medium, mark_text, True, CanalColors.CANAL_BLUE)
                 mark_rect = mark_surface.get_rect(center=(self.width // 4 - 30, y))
                 self.screen.blit(mark_surface, mark_rect)
             
             # 风格名称
-            style_surface = self.font_medium.render(style, True, CanalColors.INK_BLACK)
+            style_surface = render_text(self.font_medium, style, True, CanalColors.INK_BLACK)
             style_rect = style_surface.get_rect(center=(self.width // 2, y - 15))
             self.screen.blit(style_surface, style_rect)
             
             # 风格描述
-            desc_surface = self.font_small.render(style_descriptions[style], True, CanalColors.INK_MEDIUM)
+            desc_surface = render_text(self.font_small, style_descriptions[style], True, CanalColors.INK_MEDIUM)
             desc_rect = desc_surface.get_rect(center=(self.width // 2, y + 15))
             self.screen.blit(desc_surface, desc_rect)
         
         # 倒计时
         countdown = int(remaining_time) + 1
         countdown_text = f"自动确认: {countdown}s"
-        countdown_surface = self.font_small.render(countdown_text, True, CanalColors.INK_LIGHT)
+        countdown_surface = render_text(self.font_small, countdown_text, True, CanalColors.INK_LIGHT)
         countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height - 120))
         self.screen.blit(countdown_surface, countdown_rect)
         
@@ -1080,11 +1083,11 @@ class UIRenderer:
         
         # 标题
         title_text = "水墨艺术作品"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, 60))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, 62))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -1115,18 +1118,18 @@ class UIRenderer:
         y_offset = info_y + 30
         for label, value in info_items:
             # 标签
-            label_surface = self.font_small.render(f"{label}:", True, CanalColors.INK_MEDIUM)
+            label_surface = render_text(self.font_small, f"{label}:", True, CanalColors.INK_MEDIUM)
             self.screen.blit(label_surface, (info_x + 20, y_offset))
             
             # 值
-            value_surface = self.font_small.render(str(value), True, CanalColors.INK_BLACK)
+            value_surface = render_text(self.font_small, str(value), True, CanalColors.INK_BLACK)
             self.screen.blit(value_surface, (info_x + 120, y_offset))
             
             y_offset += 40
         
         # 实时声音映射信息
         mapping_y = y_offset + 20
-        mapping_title = self.font_small.render("实时声音映射:", True, CanalColors.INK_MEDIUM)
+        mapping_title = render_text(self.font_small, "实时声音映射:", True, CanalColors.INK_MEDIUM)
         self.screen.blit(mapping_title, (info_x + 20, mapping_y))
         
         # 显示当前音频特征
@@ -1140,7 +1143,7 @@ class UIRenderer:
         ]
         
         for i, info in enumerate(audio_info):
-            info_surface = self.font_small.render(info, True, CanalColors.INK_LIGHT)
+            info_surface = render_text(self.font_small, info, True, CanalColors.INK_LIGHT)
             self.screen.blit(info_surface, (info_x + 30, mapping_y + 25 + i * 20))
         
         # 二维码（保持原有功能）
@@ -1150,7 +1153,7 @@ class UIRenderer:
         # 倒计时显示
         if remaining_time > 0:
             countdown_text = f"自动返回: {int(remaining_time)}秒"
-            countdown_surface = self.font_small.render(countdown_text, True, CanalColors.INK_MEDIUM)
+            countdown_surface = render_text(self.font_small, countdown_text, True, CanalColors.INK_MEDIUM)
             countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height - 80))
             self.screen.blit(countdown_surface, countdown_rect)
         
@@ -1208,11 +1211,11 @@ class UIRenderer:
         
         # 标题 - 使用传统墨色
         title_text = "聆听水上环境"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 4))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, self.height // 4 + 2))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -1220,7 +1223,7 @@ class UIRenderer:
         # 倒计时 - 使用运河蓝
         countdown = int(remaining_time) + 1
         countdown_text = f"{countdown}"
-        countdown_surface = self.font_large.render(countdown_text, True, CanalColors.CANAL_BLUE)
+        countdown_surface = render_text(self.font_large, countdown_text, True, CanalColors.CANAL_BLUE)
         countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height // 2))
         self.screen.blit(countdown_surface, countdown_rect)
         
@@ -1240,7 +1243,7 @@ class UIRenderer:
         line_spacing = 45  # 增加行间距
         for line in guide_lines:
             if line:
-                text_surface = self.font_small.render(line, True, CanalColors.INK_LIGHT)
+                text_surface = render_text(self.font_small, line, True, CanalColors.INK_LIGHT)
                 text_rect = text_surface.get_rect(center=(self.width // 2, y_offset))
                 self.screen.blit(text_surface, text_rect)
             y_offset += line_spacing
@@ -1255,7 +1258,7 @@ class UIRenderer:
         
         # 录制状态指示
         record_text = "正在采集运河环境声音..."
-        record_surface = self.font_medium.render(record_text, True, CanalColors.INK_BLACK)
+        record_surface = render_text(self.font_medium, record_text, True, CanalColors.INK_BLACK)
         record_rect = record_surface.get_rect(center=(self.width // 2, self.height // 4))
         
         # 添加背景框
@@ -1290,7 +1293,7 @@ class UIRenderer:
         # 时间显示
         remaining_time = max(0, 35 - int(progress * 35))
         time_text = f"剩余时间: {remaining_time}秒"
-        time_surface = self.font_small.render(time_text, True, CanalColors.INK_MEDIUM)
+        time_surface = render_text(self.font_small, time_text, True, CanalColors.INK_MEDIUM)
         time_rect = time_surface.get_rect(center=(self.width // 2, progress_y + 30))
         overlay.blit(time_surface, time_rect)
         
@@ -1306,8 +1309,14 @@ class UIRenderer:
         pygame.draw.circle(indicator_surface, indicator_color, (indicator_radius, indicator_radius), indicator_radius)
         overlay.blit(indicator_surface, (indicator_pos[0] - indicator_radius, indicator_pos[1] - indicator_radius))
         
-        # 混合到主屏幕
-        self.screen.blit(overlay, (0, 0))
+        # 只将覆盖层的内容区域混合到主屏幕，并记录为脏矩形
+        overlay_bounds = bg_rect.unionall([
+            progress_bg,
+            time_rect,
+            pygame.Rect(indicator_pos[0] - indicator_radius, indicator_pos[1] - indicator_radius,
+                        indicator_radius * 2, indicator_radius * 2)
+        ])
+        self.dirty_rects = [self.screen.blit(overlay, overlay_bounds.topleft, overlay_bounds)]
     
     def render_generate_screen(self, progress: float):
         """渲染E3生成状态界面 - 水墨风格进度指示器"""
@@ -1317,11 +1326,11 @@ class UIRenderer:
         
         # 主标题
         title_text = "正在采集运河环境声音"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 6))
         
         # 添加标题阴影效果
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 3, self.height // 6 + 3))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -1346,7 +1355,7 @@ class UIRenderer:
         # 进度百分比
         progress_percent = int(progress * 100)
         percent_text = f"{progress_percent}%"
-        percent_surface = self.font_medium.render(percent_text, True, CanalColors.INK_BLACK)
+        percent_surface = render_text(self.font_medium, percent_text, True, CanalColors.INK_BLACK)
         percent_rect = percent_surface.get_rect(center=(self.width // 2, progress_y + 50))
         self.screen.blit(percent_surface, percent_rect)
         
@@ -1380,7 +1389,7 @@ class UIRenderer:
                 # 完成标记
                 if i < current_step:
                     check_text = "完"
-                    check_surface = self.font_small.render(check_text, True, CanalColors.PAPER_WHITE)
+                    check_surface = render_text(self.font_small, check_text, True, CanalColors.PAPER_WHITE)
                     check_rect = check_surface.get_rect(center=(circle_x, step_y))
                     self.screen.blit(check_surface, check_rect)
                 else:
@@ -1401,7 +1410,7 @@ class UIRenderer:
             
             # 步骤文字
             text_color = CanalColors.INK_BLACK if i <= current_step else CanalColors.INK_LIGHT
-            step_surface = self.font_small.render(step, True, text_color)
+            step_surface = render_text(self.font_small, step, True, text_color)
             step_rect = step_surface.get_rect(left=circle_x + 30, centery=step_y)
             self.screen.blit(step_surface, step_rect)
         
@@ -1445,11 +1454,11 @@ class UIRenderer:
         
         # 标题
         title_text = "选择水墨风格"
-        title_surface = self.font_large.render(title_text, True, CanalColors.INK_BLACK)
+        title_surface = render_text(self.font_large, title_text, True, CanalColors.INK_BLACK)
         title_rect = title_surface.get_rect(center=(self.width // 2, self.height // 6))
         
         # 添加标题阴影
-        shadow_surface = self.font_large.render(title_text, True, CanalColors.INK_FAINT)
+        shadow_surface = render_text(self.font_large, title_text, True, CanalColors.INK_FAINT)
         shadow_rect = shadow_surface.get_rect(center=(self.width // 2 + 2, self.height // 6 + 2))
         self.screen.blit(shadow_surface, shadow_rect)
         self.screen.blit(title_surface, title_rect)
@@ -1478,23 +1487,23 @@ class UIRenderer:
                 
                 # 选中标记
                 mark_text = "●"
-                mark_surface = self.font_medium.render(mark_text, True, CanalColors.CANAL_BLUE)
+                mark_surface = render_text(self.font_medium, mark_text, True, CanalColors.CANAL_BLUE)
                 mark_rect = mark_surface.get_rect(center=(self.width // 4 - 30, y))
                 self.screen.blit(mark_surface, mark_rect)
             
             # 风格名称
-            style_surface = self.font_medium.render(style, True, CanalColors.INK_BLACK)
+            style_surface = render_text(self.font_medium, style, True, CanalColors.INK_BLACK)
             style_rect = style_surface.get_rect(center=(self.width // 2, y - 15))
             self.screen.blit(style_surface, style_rect)
             
             # 风格描述
-            desc_surface = self.font_small.render(style_descriptions[style], True, CanalColors.INK_MEDIUM)
+            desc_surface = render_text(self.font_small, style_descriptions[style], True, CanalColors.INK_MEDIUM)
             desc_rect = desc_surface.get_rect(center=(self.width // 2, y + 15))
             self.screen.blit(desc_surface, desc_rect)
         
         # 倒计时
         countdown = int(remaining_time) + 1
         countdown_text = f"自动确认: {countdown}s"
-        countdown_surface = self.font_small.render(countdown_text, True, CanalColors.INK_LIGHT)
+        countdown_surface = render_text(self.font_small, countdown_text, True, CanalColors.INK_LIGHT)
         countdown_rect = countdown_surface.get_rect(center=(self.width // 2, self.height - 120))
         self.screen.blit(countdown_surface, countdown_rect)
\ No newline at end of file